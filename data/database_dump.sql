@@ -3,6 +3,47 @@ CREATE SCHEMA IF NOT EXISTS content;
 
 ALTER SCHEMA content OWNER TO postgres;
 
+--
+-- Name: notify_etl_change(); Type: FUNCTION; Schema: content; Owner: postgres
+--
+
+CREATE FUNCTION content.notify_etl_change() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+DECLARE
+    changed record;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    IF TG_TABLE_NAME IN ('genre_film_work', 'person_film_work') THEN
+        PERFORM pg_notify('etl_changes', json_build_object('table', 'film_work', 'id', changed.film_work_id)::text);
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.film_work_id <> NEW.film_work_id THEN
+                PERFORM pg_notify('etl_changes', json_build_object('table', 'film_work', 'id', OLD.film_work_id)::text);
+            END IF;
+        END IF;
+    ELSE
+        PERFORM pg_notify('etl_changes', json_build_object('table', TG_TABLE_NAME, 'id', changed.id)::text);
+    END IF;
+    -- Фильмография человека меняется и тогда, когда его убрали из фильма
+    IF TG_TABLE_NAME = 'person_film_work' THEN
+        PERFORM pg_notify('etl_changes', json_build_object('table', 'person', 'id', changed.person_id)::text);
+        IF TG_OP = 'UPDATE' THEN
+            IF OLD.person_id <> NEW.person_id THEN
+                PERFORM pg_notify('etl_changes', json_build_object('table', 'person', 'id', OLD.person_id)::text);
+            END IF;
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+
+ALTER FUNCTION content.notify_etl_change() OWNER TO postgres;
+
 SET default_tablespace = '';
 
 SET default_table_access_method = heap;
@@ -14015,6 +14056,62 @@ CREATE UNIQUE INDEX film_work_genre_idx ON content.genre_film_work USING btree (
 CREATE UNIQUE INDEX film_work_person_role_idx ON content.person_film_work USING btree (film_work_id, person_id, role);
 
 
+--
+-- Name: film_work_modified_id_idx; Type: INDEX; Schema: content; Owner: postgres
+--
+
+CREATE INDEX film_work_modified_id_idx ON content.film_work USING btree (modified, id);
+
+
+--
+-- Name: genre_modified_id_idx; Type: INDEX; Schema: content; Owner: postgres
+--
+
+CREATE INDEX genre_modified_id_idx ON content.genre USING btree (modified, id);
+
+
+--
+-- Name: person_modified_id_idx; Type: INDEX; Schema: content; Owner: postgres
+--
+
+CREATE INDEX person_modified_id_idx ON content.person USING btree (modified, id);
+
+
+--
+-- Name: film_work film_work_notify_etl_change; Type: TRIGGER; Schema: content; Owner: postgres
+--
+
+CREATE TRIGGER film_work_notify_etl_change AFTER INSERT OR DELETE OR UPDATE ON content.film_work FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+
+--
+-- Name: genre genre_notify_etl_change; Type: TRIGGER; Schema: content; Owner: postgres
+--
+
+CREATE TRIGGER genre_notify_etl_change AFTER INSERT OR DELETE OR UPDATE ON content.genre FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+
+--
+-- Name: genre_film_work genre_film_work_notify_etl_change; Type: TRIGGER; Schema: content; Owner: postgres
+--
+
+CREATE TRIGGER genre_film_work_notify_etl_change AFTER INSERT OR DELETE OR UPDATE ON content.genre_film_work FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+
+--
+-- Name: person person_notify_etl_change; Type: TRIGGER; Schema: content; Owner: postgres
+--
+
+CREATE TRIGGER person_notify_etl_change AFTER INSERT OR DELETE OR UPDATE ON content.person FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+
+--
+-- Name: person_film_work person_film_work_notify_etl_change; Type: TRIGGER; Schema: content; Owner: postgres
+--
+
+CREATE TRIGGER person_film_work_notify_etl_change AFTER INSERT OR DELETE OR UPDATE ON content.person_film_work FOR EACH ROW EXECUTE FUNCTION content.notify_etl_change();
+
+
 --
 -- Name: auth_group_name_a6ea08ec_like; Type: INDEX; Schema: public; Owner: postgres
 --
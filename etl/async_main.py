@@ -0,0 +1,147 @@
+import asyncio
+import time
+from contextlib import nullcontext
+from functools import partial
+from typing import List, Mapping
+
+from core import metrics
+from core.config import ELASTIC_PAR, ETL_PAR, POSTGRES_PAR, REDIS_PAR
+from core.logger import logger
+from db.db import con_elastic_async, con_postgres, con_postgres_async, con_redis, con_redis_async
+from main import get_storage
+from models.models import Genre, Movie, Person
+from services.async_extract import AsyncPostgresExtractor
+from services.async_load import AsyncElasticLoader
+from services.async_transform import AsyncDataTransform
+from services.base import UpdatesNotFoundError
+from services.changes import AdaptivePoll
+from services.state import EXTRACT_STAGE, LOAD_STAGE, State
+
+
+async def run_etl(postgres: AsyncPostgresExtractor, data: AsyncDataTransform, elastic: AsyncElasticLoader,
+                  state: State):
+    """
+    Выполняет асинхронный ETL процесс с теми же водяными знаками, что и main.run_etl.
+
+    Пока одни bulk-запросы фильмов выполняются в Elasticsearch, из PostgreSQL уже выбираются
+    следующие пакеты.
+
+    :param postgres: Асинхронный экстрактор PostgreSQL.
+    :param data: Асинхронный объект для сбора идентификаторов фильмов.
+    :param elastic: Асинхронный загрузчик Elasticsearch.
+    :param state: Объект состояния для хранения водяных знаков таблиц.
+    :raises UpdatesNotFoundError: Если нет ни новых строк, ни незагруженных произведений.
+    """
+    start_stage = LOAD_STAGE if data.in_memory else EXTRACT_STAGE
+    updates = False
+    for table in postgres.TABLES:
+        async for rows in postgres.select_table(table, state.read_watermark(table, start_stage)):
+            updates = True
+            if table == 'genre':
+                await elastic.bulk_insert(Genre, rows)
+            if table == 'person':
+                for row in rows:
+                    await data.collector('person_ids', row['id'])
+            if table == 'film_work':
+                for person_id in await postgres.get_film_person_ids([row['id'] for row in rows]):
+                    await data.collector('person_ids', person_id)
+            film_ids = await postgres.get_film_work_ids(table, rows)
+            if not await update_movies(elastic, table, rows, film_ids):
+                for film_work_id in film_ids:
+                    await data.collector('movie_ids', film_work_id)
+            await data.flush()
+            await elastic.drain()
+            state.write_watermark(table, EXTRACT_STAGE, (rows[-1]['modified'], rows[-1]['id']))
+            metrics.observe_lag(table, rows[-1]['modified'])
+    async for movies in data.batcher('movie_ids'):
+        rows = await postgres.get_movie_documents(movies.keys())
+        await elastic.bulk_insert(Movie, rows, on_done=partial(data.acknowledge, 'movie_ids', list(movies)))
+        updates = True
+    async for persons in data.batcher('person_ids', template=dict):
+        rows = await postgres.get_person_documents(persons.keys())
+        await elastic.bulk_insert(Person, rows, on_done=partial(data.acknowledge, 'person_ids', list(persons)))
+        updates = True
+    await elastic.drain()
+    for table in postgres.TABLES:
+        state.write_watermark(table, LOAD_STAGE, state.read_watermark(table, EXTRACT_STAGE))
+    if not updates:
+        for table in postgres.TABLES:
+            metrics.observe_lag(table, None)
+        raise UpdatesNotFoundError
+
+
+async def update_movies(elastic: AsyncElasticLoader, table: str, rows: List[Mapping], film_ids: List[str]) -> bool:
+    """
+    Обновляет имена людей или названия жанров в уже загруженных фильмах частичным обновлением, если оно включено.
+
+    :param elastic: Асинхронный загрузчик Elasticsearch.
+    :param table: Таблица, из которой получены строки.
+    :param rows: Строки таблицы person или genre.
+    :param film_ids: Идентификаторы фильмов, связанных со строками в PostgreSQL.
+    :return: True, если все связанные фильмы обновлены и их не нужно пересобирать.
+    """
+    if not ETL_PAR.partial_updates or not rows or table not in {'person', 'genre'}:
+        return False
+    if not film_ids:
+        return True
+    if table == 'person':
+        return await elastic.update_movie_persons(rows, film_ids)
+    return await elastic.update_movie_genres(rows, film_ids)
+
+
+async def postgres_to_elastic(postgres, elasticsearch, redis, state: State):
+    """
+    Запускает асинхронный процесс передачи данных из PostgreSQL в Elasticsearch.
+
+    :param postgres: Пул соединений asyncpg.
+    :param elasticsearch: Асинхронный клиент Elasticsearch.
+    :param redis: Асинхронный клиент Redis.
+    :param state: Объект состояния для хранения водяных знаков таблиц.
+    :raises MappingMismatchError: Если маппинги индексов устарели и их нужно перестроить.
+    """
+    loader = AsyncElasticLoader(elasticsearch)
+    await loader.create_indices()
+    await loader.check_mappings()
+    poll = AdaptivePoll(ETL_PAR.poll_min_interval, ETL_PAR.poll_max_interval)
+    while True:
+        started = time.monotonic()
+        elastic = AsyncElasticLoader(
+            elasticsearch,
+            concurrency=ETL_PAR.bulk_concurrency,
+            dead_letter_file=ETL_PAR.dead_letter_file,
+        )
+        try:
+            await run_etl(
+                AsyncPostgresExtractor(postgres),
+                AsyncDataTransform(redis, in_memory=ETL_PAR.collector_in_memory),
+                elastic,
+                state,
+            )
+        except UpdatesNotFoundError:
+            logger.info('There are no updates.')
+            metrics.run_summary(started, False, elastic.summary(), ETL_PAR.metrics_file)
+            delay = poll.idle()
+        else:
+            logger.info('There are updates!')
+            metrics.run_summary(started, True, elastic.summary(), ETL_PAR.metrics_file)
+            delay = poll.busy()
+        logger.info('Repeat the request in {0:.1f} seconds.'.format(delay))
+        await asyncio.sleep(delay)
+
+
+async def main():
+    """
+    Устанавливает асинхронные соединения с базами данных и запускает процесс передачи данных.
+    """
+    metrics.start_metrics_server(ETL_PAR.metrics_port)
+    state_postgres = con_postgres(**POSTGRES_PAR) if ETL_PAR.state_storage == 'postgres' else nullcontext()
+    with state_postgres as state_postgres_conn, con_redis(**REDIS_PAR) as state_redis_conn:
+        state = State(get_storage(state_postgres_conn, state_redis_conn))
+        async with con_postgres_async(ETL_PAR.extract_workers, **POSTGRES_PAR) as postgres_pool:
+            async with con_redis_async(**REDIS_PAR) as redis_conn:
+                async with con_elastic_async(**ELASTIC_PAR) as elastic_conn:
+                    await postgres_to_elastic(postgres_pool, elastic_conn, redis_conn, state)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,407 @@
+"""
+Генератор синтетического каталога схемы content и экстрактор, читающий его из памяти.
+
+Распределения приближены к database_dump.sql: около 4 персон на фильм в справочнике, популярность
+персон и жанров убывает по степенному закону, число актеров фильма распределено логнормально.
+"""
+import bisect
+import io
+import random
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from psycopg2.extensions import connection
+
+from core import batching, metrics
+from services.extract import PostgresExtractor
+from services.base import Watermark
+
+GENRES = 26
+
+PERSONS_PER_FILM = 4.2
+
+POPULARITY_EXPONENT = 0.8
+
+START = datetime(2021, 6, 16)
+
+Changes = Dict[str, List[str]]
+
+
+def _cum_weights(size: int, exponent: float) -> List[float]:
+    """
+    Накопленные веса степенного распределения популярности.
+
+    :param size: Количество элементов.
+    :param exponent: Показатель степени.
+    :return: Накопленные веса для random.choices.
+    """
+    weights, total = [], 0.0
+    for rank in range(size):
+        total += 1 / (rank + 1) ** exponent
+        weights.append(total)
+    return weights
+
+
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+@dataclass
+class Catalogue(object):
+    """
+    Каталог в компактном виде: строки таблиц - списки, связи - индексы строк.
+
+    :param genres: Строки [id, name, description, modified].
+    :param persons: Строки [id, full_name, modified].
+    :param films: Строки [id, title, description, rating, modified].
+    :param film_genres: Индексы жанров каждого фильма.
+    :param film_persons: Роли и индексы персон каждого фильма.
+    """
+    genres: List[List[Any]]
+    persons: List[List[Any]]
+    films: List[List[Any]]
+    film_genres: List[List[int]]
+    film_persons: List[List[Tuple[str, int]]]
+    _film_index: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _indices: Dict[str, Dict[str, int]] = field(default_factory=dict, init=False, repr=False)
+    _person_films: Dict[int, List[int]] = field(default_factory=dict, init=False, repr=False)
+    _genre_films: Dict[int, List[int]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        self._film_index = {row[0]: index for index, row in enumerate(self.films)}
+        self._indices = {
+            'person': {row[0]: index for index, row in enumerate(self.persons)},
+            'genre': {row[0]: index for index, row in enumerate(self.genres)},
+        }
+        for film, links in enumerate(self.film_persons):
+            for _, person in links:
+                self._person_films.setdefault(person, []).append(film)
+        for film, genres in enumerate(self.film_genres):
+            for genre in genres:
+                self._genre_films.setdefault(genre, []).append(film)
+
+    @property
+    def size(self) -> Dict[str, int]:
+        """
+        Количество строк таблиц каталога.
+
+        :return: Количество строк по таблицам.
+        """
+        return {
+            'film_work': len(self.films),
+            'person': len(self.persons),
+            'genre': len(self.genres),
+            'person_film_work': sum(map(len, self.film_persons)),
+            'genre_film_work': sum(map(len, self.film_genres)),
+        }
+
+    def touch(self, fraction: float, modified: datetime, seed: int = 1) -> Changes:
+        """
+        Изменяет долю строк каждой таблицы, как это сделало бы редактирование каталога.
+
+        :param fraction: Доля изменяемых строк.
+        :param modified: Новое время изменения строк.
+        :param seed: Зерно генератора выбора строк.
+        :return: Идентификаторы измененных строк по таблицам.
+        """
+        rng = random.Random(seed)
+        changes: Changes = {}
+        for table, rows, name_column in (
+            ('film_work', self.films, 1), ('person', self.persons, 1), ('genre', self.genres, 2),
+        ):
+            sample = rng.sample(range(len(rows)), max(1, int(len(rows) * fraction)))
+            for index in sample:
+                rows[index][name_column] = '{0} (edited)'.format(rows[index][name_column])
+                rows[index][-1] = modified
+            changes[table] = [rows[index][0] for index in sample]
+        return changes
+
+    def film_ids(self, table: str, row_id: str) -> List[str]:
+        """
+        Идентификаторы фильмов, связанных со строкой таблицы.
+
+        :param table: Таблица 'person' или 'genre'.
+        :param row_id: Идентификатор строки.
+        :return: Идентификаторы фильмов.
+        """
+        index = self._indices[table][row_id]
+        films = (self._person_films if table == 'person' else self._genre_films).get(index, ())
+        return [self.films[film][0] for film in films]
+
+    def movie_row(self, film_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Агрегированная строка фильма в формате MOVIE_DOCUMENTS_QUERY.
+
+        :param film_id: Идентификатор фильма.
+        :return: Строка фильма или None, если фильма нет.
+        """
+        index = self._film_index.get(film_id)
+        if index is None:
+            return None
+        film_id, title, description, rating, _ = self.films[index]
+        genres = sorted((self.genres[genre] for genre in self.film_genres[index]), key=lambda genre: genre[1])
+        row = {
+            'id': film_id,
+            'title': title,
+            'description': description,
+            'imdb_rating': rating,
+            'genres': [{'id': genre[0], 'name': genre[1]} for genre in genres],
+            'genres_names': [genre[1] for genre in genres],
+        }
+        for role in ('director', 'actor', 'writer'):
+            persons = [self.persons[person] for person_role, person in self.film_persons[index] if person_role == role]
+            row['{0}s'.format(role)] = [{'id': person[0], 'name': person[1]} for person in persons]
+            row['{0}s_names'.format(role)] = [person[1] for person in persons]
+        return row
+
+    def person_row(self, person_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Агрегированная строка человека в формате PERSON_DOCUMENTS_QUERY.
+
+        :param person_id: Идентификатор человека.
+        :return: Строка человека или None, если человека нет.
+        """
+        index = self._indices['person'].get(person_id)
+        if index is None:
+            return None
+        films = []
+        for film in self._person_films.get(index, ()):
+            film_id, title, _, rating, _ = self.films[film]
+            roles = sorted({role for role, person in self.film_persons[film] if person == index})
+            films.append({'id': film_id, 'title': title, 'imdb_rating': rating, 'roles': roles})
+        films.sort(key=lambda film: film['id'])
+        return {'id': person_id, 'full_name': self.persons[index][1], 'films': films}
+
+    def film_person_ids(self, film_id: str) -> List[str]:
+        """
+        Идентификаторы людей, участвующих в фильме.
+
+        :param film_id: Идентификатор фильма.
+        :return: Идентификаторы людей.
+        """
+        index = self._film_index.get(film_id)
+        if index is None:
+            return []
+        return [self.persons[person][0] for _, person in self.film_persons[index]]
+
+
+def generate_catalogue(films: int, seed: int = 0) -> Catalogue:
+    """
+    Генерирует каталог заданного размера.
+
+    :param films: Количество фильмов.
+    :param seed: Зерно генератора.
+    :return: Каталог.
+    """
+    rng = random.Random(seed)
+    persons_count = max(1, int(films * PERSONS_PER_FILM))
+    person_weights = _cum_weights(persons_count, POPULARITY_EXPONENT)
+    genre_weights = _cum_weights(GENRES, POPULARITY_EXPONENT)
+    step = timedelta(seconds=1)
+    genres = [
+        [_uuid(rng), 'Genre {0}'.format(num), 'Description {0}'.format(num), START + num * step]
+        for num in range(GENRES)
+    ]
+    persons = [[_uuid(rng), 'Person {0}'.format(num), START + num * step] for num in range(persons_count)]
+    film_rows, film_genres, film_persons = [], [], []
+    for num in range(films):
+        film_rows.append([
+            _uuid(rng),
+            'Film {0}'.format(num),
+            'Description of film {0}'.format(num),
+            round(rng.uniform(1, 10), 1) if rng.random() < 0.95 else None,
+            START + num * step,
+        ])
+        film_genres.append(sorted(set(rng.choices(range(GENRES), cum_weights=genre_weights,
+                                                  k=min(5, 1 + int(rng.expovariate(0.9)))))))
+        cast: Dict[int, str] = {}
+        for role, count in (
+            ('director', 1 + (rng.random() < 0.1)),
+            ('writer', min(6, 1 + int(rng.expovariate(0.7)))),
+            ('actor', min(50, int(rng.lognormvariate(1.5, 0.6)))),
+        ):
+            for person in rng.choices(range(persons_count), cum_weights=person_weights, k=count):
+                cast.setdefault(person, role)
+        film_persons.append([(role, person) for person, role in cast.items()])
+    return Catalogue(genres, persons, film_rows, film_genres, film_persons)
+
+
+@dataclass
+class CatalogueExtractor(object):
+    """
+    Экстрактор с интерфейсом PostgresExtractor, который читает каталог из памяти.
+
+    Постраничный обход и поиск обновлений берутся из PostgresExtractor без изменений.
+
+    :param catalogue: Каталог.
+    """
+    catalogue: Catalogue
+    TABLES = PostgresExtractor.TABLES
+    get_updates = PostgresExtractor.get_updates
+    select_table = PostgresExtractor.select_table
+    _keys: Dict[str, List[Tuple[datetime, str]]] = field(default_factory=dict, init=False, repr=False)
+    _order: Dict[str, List[int]] = field(default_factory=dict, init=False, repr=False)
+
+    def refresh(self):
+        """
+        Перестраивает порядок строк по (modified, id) после изменения каталога.
+        """
+        for table, rows in self._tables().items():
+            order = sorted(range(len(rows)), key=lambda index: (rows[index][-1], rows[index][0]))
+            self._order[table] = order
+            self._keys[table] = [(rows[index][-1], rows[index][0]) for index in order]
+
+    def select_page(self, table: str, watermark: Watermark, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Выбирает страницу строк таблицы после водяного знака.
+
+        :param table: Название таблицы.
+        :param watermark: Пара (modified, id) последней обработанной строки.
+        :param limit: Максимальное количество строк на странице.
+        :return: Строки, отсортированные по (modified, id).
+        """
+        if not self._keys:
+            self.refresh()
+        controller = batching.EXTRACT if limit is None else None
+        limit = limit or batching.EXTRACT.size
+        rows = self._tables()[table]
+        with metrics.batch('extract', table) as batch:
+            start = bisect.bisect_right(self._keys[table], (watermark[0], str(watermark[1])))
+            page = [self._row(table, rows[index]) for index in self._order[table][start:start + limit]]
+            batch['rows'] = len(page)
+        if controller is not None:
+            controller.observe(batch['rows'], batch['seconds'])
+        return page
+
+    def select_rows(self, table: str, ids: Iterable[str]) -> List[Dict[str, Any]]:
+        """
+        Выбирает строки таблицы по идентификаторам.
+
+        :param table: Название таблицы.
+        :param ids: Идентификаторы строк.
+        :return: Строки, отсортированные по (modified, id); удаленных строк в результате нет.
+        """
+        wanted = set(map(str, ids))
+        rows = [self._row(table, row) for row in self._tables()[table] if row[0] in wanted]
+        return sorted(rows, key=lambda row: (row['modified'], row['id']))
+
+    def get_film_work_ids(self, table: str, data: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Идентификаторы фильмов, связанных со строками таблицы.
+
+        :param table: Название таблицы.
+        :param data: Строки таблицы.
+        :yield: Словари с идентификаторами фильмов.
+        """
+        if table not in {'person', 'genre'}:
+            yield from data
+            return
+        for row in data:
+            for film_id in self.catalogue.film_ids(table, row['id']):
+                yield {'id': film_id}
+
+    def get_movie_documents(self, film_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Агрегированные строки фильмов.
+
+        :param film_ids: Идентификаторы фильмов.
+        :return: Строки с полями модели Movie.
+        """
+        with metrics.batch('extract', 'movie_documents') as batch:
+            rows = [row for row in map(self.catalogue.movie_row, film_ids) if row is not None]
+            batch['rows'] = len(rows)
+        batching.MOVIES.observe(batch['rows'], batch['seconds'])
+        return rows
+
+    def get_person_documents(self, person_ids: Sequence[str]) -> List[Dict[str, Any]]:
+        """
+        Агрегированные строки людей с фильмографией.
+
+        :param person_ids: Идентификаторы людей.
+        :return: Строки с полями модели Person.
+        """
+        with metrics.batch('extract', 'person_documents') as batch:
+            rows = [row for row in map(self.catalogue.person_row, person_ids) if row is not None]
+            batch['rows'] = len(rows)
+        return rows
+
+    def get_film_person_ids(self, film_ids: Sequence[str]) -> List[str]:
+        """
+        Идентификаторы людей, участвующих в фильмах.
+
+        :param film_ids: Идентификаторы фильмов.
+        :return: Идентификаторы людей без повторов.
+        """
+        return list({person_id for film_id in film_ids for person_id in self.catalogue.film_person_ids(film_id)})
+
+    def _tables(self) -> Dict[str, List[List[Any]]]:
+        return {'film_work': self.catalogue.films, 'person': self.catalogue.persons, 'genre': self.catalogue.genres}
+
+    @staticmethod
+    def _row(table: str, row: List[Any]) -> Dict[str, Any]:
+        if table == 'film_work':
+            return {'id': row[0], 'modified': row[-1]}
+        if table == 'person':
+            return {'id': row[0], 'full_name': row[1], 'modified': row[-1]}
+        return {'id': row[0], 'name': row[1], 'description': row[2], 'modified': row[-1]}
+
+
+def copy_to_postgres(postgres: connection, catalogue: Catalogue):
+    """
+    Заменяет содержимое таблиц схемы content каталогом через COPY FROM.
+
+    Только для отдельной базы бенчмарка: таблицы очищаются.
+
+    :param postgres: Соединение с PostgreSQL.
+    :param catalogue: Каталог.
+    """
+    tables = {
+        'genre': ('id, name, description, created, modified', (
+            (row[0], row[1], row[2], row[3], row[3]) for row in catalogue.genres
+        )),
+        'person': ('id, full_name, created, modified', (
+            (row[0], row[1], row[2], row[2]) for row in catalogue.persons
+        )),
+        'film_work': ('id, title, description, rating, type, created, modified', (
+            (row[0], row[1], row[2], row[3], 'movie', row[4], row[4]) for row in catalogue.films
+        )),
+        'genre_film_work': ('id, film_work_id, genre_id, created', (
+            (str(uuid.uuid4()), catalogue.films[film][0], catalogue.genres[genre][0], START)
+            for film, genres in enumerate(catalogue.film_genres) for genre in genres
+        )),
+        'person_film_work': ('id, film_work_id, person_id, role, created', (
+            (str(uuid.uuid4()), catalogue.films[film][0], catalogue.persons[person][0], role, START)
+            for film, links in enumerate(catalogue.film_persons) for role, person in links
+        )),
+    }
+    with postgres.cursor() as curs:
+        curs.execute('TRUNCATE genre_film_work, person_film_work, film_work, person, genre;')
+        for table, (columns, rows) in tables.items():
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join('\\N' if value is None else str(value) for value in row) + '\n')
+            buffer.seek(0)
+            curs.copy_expert('COPY {0} ({1}) FROM STDIN'.format(table, columns), buffer)
+    postgres.commit()
+
+
+def touch_postgres(postgres: connection, changes: Changes, modified: datetime):
+    """
+    Повторяет в PostgreSQL изменения, сделанные Catalogue.touch.
+
+    :param postgres: Соединение с PostgreSQL.
+    :param changes: Идентификаторы измененных строк по таблицам.
+    :param modified: Новое время изменения строк.
+    """
+    names = {'film_work': 'title', 'person': 'full_name', 'genre': 'description'}
+    with postgres.cursor() as curs:
+        for table, ids in changes.items():
+            curs.execute(
+                "UPDATE {0} SET {1} = {1} || ' (edited)', modified = %s WHERE id = ANY(%s::uuid[]);".format(
+                    table, names[table],
+                ),
+                (modified, ids),
+            )
+    postgres.commit()
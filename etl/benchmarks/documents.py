@@ -0,0 +1,74 @@
+"""
+Сравнение построения документов фильмов через модель Movie и json.dumps клиента
+с компилированными построителями и сериализацией orjson.
+
+Запуск из каталога etl: python -m benchmarks.documents --films 10000 --persons 60 --genres 4
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List
+
+from elasticsearch.serializer import JSONSerializer
+
+from benchmarks.movie_rows import generate_film
+from models.models import Movie
+from services.documents import build_documents, encode
+
+
+def build_with_model(rows: List[Dict[str, Any]]) -> int:
+    """
+    Строит и сериализует документы так, как это делалось до построителей.
+
+    :param rows: Агрегированные строки фильмов.
+    :return: Суммарный размер тел документов в символах.
+    """
+    serializer = JSONSerializer()
+    return sum(len(serializer.dumps(Movie(**row).dict())) for row in rows)
+
+
+def build_compiled(rows: List[Dict[str, Any]]) -> int:
+    """
+    Строит документы построителями и сериализует их orjson.
+
+    :param rows: Агрегированные строки фильмов.
+    :return: Суммарный размер тел документов в символах.
+    """
+    return sum(len(encode(document)) for document in build_documents(Movie, rows, sample_rate=0))
+
+
+def run(films: int, persons: int, genres: int) -> Dict[str, Any]:
+    """
+    Выполняет сравнение и возвращает результаты.
+
+    :param films: Количество фильмов.
+    :param persons: Количество персон в каждом фильме.
+    :param genres: Количество жанров каждого фильма.
+    :return: Процессорное время построения и сериализации для обоих способов.
+    """
+    rows = [generate_film(persons, genres)[1] for _ in range(films)]
+    results: Dict[str, Any] = {'films': films, 'persons': persons, 'genres': genres}
+    for mode, build in (('model', build_with_model), ('compiled', build_compiled)):
+        started = time.process_time()
+        build(rows)
+        results[mode] = {'cpu_seconds': round(time.process_time() - started, 4)}
+    results['cpu_reduction'] = round(
+        results['model']['cpu_seconds'] / max(results['compiled']['cpu_seconds'], 1e-9), 1,
+    )
+    return results
+
+
+def main():
+    """
+    Разбирает аргументы командной строки и печатает результаты в формате JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--films', type=int, default=10000)
+    parser.add_argument('--persons', type=int, default=60)
+    parser.add_argument('--genres', type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.films, args.persons, args.genres), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""
+Сквозной бенчмарк ETL: холодная загрузка и инкрементальная дельта синтетического каталога через run_etl.
+
+Запуск из каталога etl: python -m benchmarks.etl --films 10000 --delta 0.01 --output baseline.json
+Сравнение с сохраненной базовой линией: python -m benchmarks.etl --films 10000 --baseline baseline.json
+
+По умолчанию PostgreSQL и Elasticsearch заменены каталогом в памяти и клиентом-заглушкой, поэтому
+измеряется собственная работа ETL. С --real каталог записывается в PostgreSQL из настроек окружения
+(таблицы схемы content очищаются - только для отдельного стенда), документы загружаются в Elasticsearch,
+очередь и хеши хранятся в Redis.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from prometheus_client import REGISTRY
+
+from benchmarks.catalogue import CatalogueExtractor, copy_to_postgres, generate_catalogue, touch_postgres
+from benchmarks.fakes import FakeElasticsearch
+from core.config import ELASTIC_PAR, ETL_PAR, POSTGRES_PAR, REDIS_PAR
+from db.db import con_elastic, con_postgres, con_redis
+from main import get_hash_store, get_transform, run_etl
+from services import extract, load, transform
+from services.state import JsonStorage, State
+
+COMPARED = ('docs_per_second',)
+
+
+def stage_seconds() -> Dict[str, float]:
+    """
+    Суммарное время пакетов по этапам ETL из гистограммы etl_batch_duration_seconds.
+
+    :return: Секунды по этапам.
+    """
+    seconds: Dict[str, float] = {}
+    for metric in REGISTRY.collect():
+        if metric.name != 'etl_batch_duration_seconds':
+            continue
+        for sample in metric.samples:
+            if sample.name.endswith('_sum'):
+                stage = sample.labels['stage']
+                seconds[stage] = seconds.get(stage, 0.0) + sample.value
+    return seconds
+
+
+def peak_rss_mb() -> float:
+    """
+    Пиковый размер резидентной памяти процесса.
+
+    :return: Мегабайты.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def run_scenario(make_etl: Callable[[], Tuple[Any, transform.DataTransform, load.ElasticLoader]],
+                 state: State) -> Dict[str, Any]:
+    """
+    Выполняет один проход run_etl и измеряет его.
+
+    :param make_etl: Функция, которая создает экстрактор, очередь и загрузчик прохода.
+    :param state: Состояние ETL с водяными знаками.
+    :return: Документы, время, документы в секунду, пиковая память и время этапов.
+    """
+    postgres, data, elastic = make_etl()
+    stages = stage_seconds()
+    started = time.perf_counter()
+    run_etl(postgres, data, elastic, state)
+    seconds = time.perf_counter() - started
+    documents = elastic.summary()
+    indexed = documents.get('indexed', 0)
+    return {
+        'documents': documents,
+        'seconds': round(seconds, 3),
+        'docs_per_second': round(indexed / seconds, 1) if seconds else 0.0,
+        'peak_rss_mb': peak_rss_mb(),
+        'stage_seconds': {
+            stage: round(value - stages.get(stage, 0.0), 3) for stage, value in sorted(stage_seconds().items())
+        },
+    }
+
+
+def run(films: int, delta: float, seed: int, real: bool, latency: float) -> Dict[str, Any]:
+    """
+    Генерирует каталог и выполняет сценарии холодной загрузки и инкрементальной дельты.
+
+    :param films: Количество фильмов каталога.
+    :param delta: Доля строк каждой таблицы, изменяемых перед инкрементальным проходом.
+    :param seed: Зерно генератора.
+    :param real: Использовать PostgreSQL, Elasticsearch и Redis из настроек окружения.
+    :param latency: Задержка заглушки Elasticsearch на документ в секундах.
+    :return: Результаты бенчмарка.
+    """
+    started = time.perf_counter()
+    catalogue = generate_catalogue(films, seed)
+    results: Dict[str, Any] = {
+        'films': films,
+        'delta': delta,
+        'seed': seed,
+        'real': real,
+        'bulk_mode': ETL_PAR.bulk_mode,
+        'catalogue': catalogue.size,
+        'generate_seconds': round(time.perf_counter() - started, 3),
+        'scenarios': {},
+    }
+    with ExitStack() as stack, tempfile.TemporaryDirectory() as directory:
+        state = State(JsonStorage(os.path.join(directory, 'state.json')))
+        if real:
+            postgres = stack.enter_context(con_postgres(**POSTGRES_PAR))
+            redis = stack.enter_context(con_redis(**REDIS_PAR))
+            elastic = stack.enter_context(con_elastic(**ELASTIC_PAR))
+            copy_to_postgres(postgres, catalogue)
+            hashes = get_hash_store(redis)
+            extractor = extract.PostgresExtractor(postgres)
+        else:
+            redis = None
+            elastic = FakeElasticsearch(latency=latency)
+            hashes = None
+            extractor = CatalogueExtractor(catalogue)
+
+        def make_etl():
+            return (
+                extractor,
+                get_transform(redis) if real else transform.DataTransform(redis, in_memory=True),
+                load.ElasticLoader(
+                    elastic,
+                    parallel=ETL_PAR.bulk_mode == 'parallel',
+                    thread_count=ETL_PAR.bulk_concurrency,
+                    dead_letter_file=os.path.join(directory, 'dead_letter.jsonl'),
+                    hashes=hashes,
+                ),
+            )
+
+        results['scenarios']['cold'] = run_scenario(make_etl, state)
+        modified = datetime.now()
+        changes = catalogue.touch(delta, modified, seed + 1)
+        if real:
+            touch_postgres(postgres, changes, modified)
+        else:
+            extractor.refresh()
+        results['scenarios']['incremental'] = run_scenario(make_etl, state)
+        results['scenarios']['incremental']['changed'] = {table: len(ids) for table, ids in changes.items()}
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """
+    Сравнивает результаты с базовой линией.
+
+    :param results: Текущие результаты.
+    :param baseline: Результаты базовой линии.
+    :param tolerance: Допустимое относительное снижение показателей.
+    :return: Описания регрессий.
+    """
+    regressions = []
+    for scenario, current in results['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(scenario)
+        if previous is None:
+            continue
+        for metric in COMPARED:
+            ratio = current[metric] / previous[metric] if previous[metric] else 1.0
+            current['{0}_vs_baseline'.format(metric)] = round(ratio, 3)
+            if ratio < 1 - tolerance:
+                regressions.append('{0} {1}: {2} < {3}'.format(scenario, metric, current[metric], previous[metric]))
+    return regressions
+
+
+def main():
+    """
+    Разбирает аргументы командной строки, печатает результаты в формате JSON и сравнивает их с базовой линией.
+    """
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--films', type=int, default=10000)
+    parser.add_argument('--delta', type=float, default=0.01)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--real', action='store_true')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--output')
+    parser.add_argument('--baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    args = parser.parse_args()
+    results = run(args.films, args.delta, args.seed, args.real, args.latency)
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        results['regressions'] = regressions
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Клиент Elasticsearch в памяти для бенчмарков: разбирает тела bulk-запросов и отвечает успехом.
+"""
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+import orjson
+from elasticsearch.serializer import JSONSerializer
+
+
+@dataclass
+class FakeIndices(object):
+    """
+    Часть API indices, которую использует загрузчик.
+    """
+    names: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def exists(self, index: str, **kwargs) -> bool:
+        return index in self.names or any(index in body.get('aliases', {}) for body in self.names.values())
+
+    def create(self, index: str, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        self.names[index] = body
+        return {'acknowledged': True, 'index': index}
+
+    def get(self, index: str, **kwargs) -> Dict[str, Any]:
+        return {name: body for name, body in self.names.items() if index in (name, *body.get('aliases', {}))}
+
+
+@dataclass
+class FakeTransport(object):
+    """
+    Транспорт, у которого helpers берут сериализатор действий.
+    """
+    serializer: JSONSerializer = field(default_factory=JSONSerializer)
+
+
+@dataclass
+class FakeElasticsearch(object):
+    """
+    Клиент Elasticsearch, который считает документы, удаления и байты bulk-запросов.
+
+    :param latency: Задержка ответа на каждый документ bulk-запроса в секундах.
+    """
+    latency: float = 0.0
+    indices: FakeIndices = field(default_factory=FakeIndices)
+    transport: FakeTransport = field(default_factory=FakeTransport)
+    documents: Counter = field(default_factory=Counter)
+    deleted: Counter = field(default_factory=Counter)
+    requests: int = 0
+    bytes: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def bulk(self, body: str, **kwargs) -> Dict[str, Any]:
+        lines = iter(body.splitlines())
+        items = []
+        for action_line in lines:
+            op_type, action = next(iter(orjson.loads(action_line).items()))
+            if op_type != 'delete':
+                next(lines)
+            status = 200 if op_type == 'delete' else 201
+            items.append({op_type: {'_index': action['_index'], '_id': action['_id'], 'status': status}})
+        with self._lock:
+            self.requests += 1
+            self.bytes += len(body)
+            for item in items:
+                op_type, result = next(iter(item.items()))
+                (self.deleted if op_type == 'delete' else self.documents)[result['_index']] += 1
+        if self.latency:
+            time.sleep(self.latency * len(items))
+        return {'errors': False, 'items': items}
+
+    def update_by_query(self, body: Dict[str, Any], **kwargs) -> Dict[str, Any]:
+        # Каталог бенчмарка не меняет связи, поэтому все связанные фильмы уже содержат людей и жанры
+        film_ids = body['query']['bool']['filter'][0]['terms']['id']
+        with self._lock:
+            self.requests += 1
+        return {'total': len(film_ids), 'updated': len(film_ids), 'version_conflicts': 0, 'failures': []}
@@ -0,0 +1,124 @@
+"""
+Сравнение выборки фильмов через LEFT JOIN (декартово произведение персон и жанров)
+с агрегированной выборкой (одна строка на фильм).
+
+Запуск из каталога etl: python -m benchmarks.movie_rows --films 1000 --persons 60 --genres 4
+"""
+import argparse
+import json
+import time
+import uuid
+from typing import Any, Dict, List, Tuple
+
+from models.models import Movie
+from services.documents import movie_template
+from services.transform import DataTransform
+
+ROLES = ('director', 'actor', 'writer')
+
+
+def generate_film(persons: int, genres: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Генерирует фильм в двух представлениях: строки LEFT JOIN и агрегированную строку.
+
+    :param persons: Количество персон в фильме.
+    :param genres: Количество жанров фильма.
+    :return: Кортеж из строк LEFT JOIN и агрегированной строки.
+    """
+    film = {'id': str(uuid.uuid4()), 'title': 'Film', 'description': 'Description', 'rating': 7.5}
+    cast = [(ROLES[num % len(ROLES)], str(uuid.uuid4()), 'Person {0}'.format(num)) for num in range(persons)]
+    genre_rows = [{'id': str(uuid.uuid4()), 'name': 'Genre {0}'.format(num)} for num in range(genres)]
+    joined = [
+        {
+            **film, 'role': role, 'person_id': person_id, 'full_name': full_name,
+            'genre_id': genre['id'], 'genre_name': genre['name'],
+        }
+        for role, person_id, full_name in cast
+        for genre in genre_rows
+    ]
+    aggregated = {
+        'id': film['id'],
+        'title': film['title'],
+        'description': film['description'],
+        'imdb_rating': film['rating'],
+        'genres': genre_rows,
+        'genres_names': [genre['name'] for genre in genre_rows],
+    }
+    for role in ROLES:
+        members = [(person_id, full_name) for cast_role, person_id, full_name in cast if cast_role == role]
+        aggregated['{0}s'.format(role)] = [{'id': person_id, 'name': full_name} for person_id, full_name in members]
+        aggregated['{0}s_names'.format(role)] = [full_name for _, full_name in members]
+    return joined, aggregated
+
+
+def transform_joined(films: List[List[Dict[str, Any]]]) -> int:
+    """
+    Собирает документы из строк LEFT JOIN так же, как это делает DataTransform.parser.
+
+    :param films: Строки LEFT JOIN для каждого фильма.
+    :return: Количество собранных документов.
+    """
+    data = DataTransform(redis=None)  # type: ignore[arg-type]
+    documents = 0
+    for rows in films:
+        movie = movie_template()
+        for row in rows:
+            data.parser(row, movie)
+        Movie(**movie).dict()
+        documents += 1
+    return documents
+
+
+def transform_aggregated(films: List[Dict[str, Any]]) -> int:
+    """
+    Собирает документы из агрегированных строк, которые сразу соответствуют модели Movie.
+
+    :param films: Агрегированные строки фильмов.
+    :return: Количество собранных документов.
+    """
+    documents = 0
+    for row in films:
+        Movie(**row).dict()
+        documents += 1
+    return documents
+
+
+def run(films: int, persons: int, genres: int) -> Dict[str, Any]:
+    """
+    Выполняет сравнение и возвращает результаты.
+
+    :param films: Количество фильмов.
+    :param persons: Количество персон в каждом фильме.
+    :param genres: Количество жанров каждого фильма.
+    :return: Количество строк и процессорное время трансформации для обоих режимов.
+    """
+    joined, aggregated = zip(*(generate_film(persons, genres) for _ in range(films)))
+    results: Dict[str, Any] = {'films': films, 'persons': persons, 'genres': genres}
+    for mode, transform, rows, rows_count in (
+        ('joined', transform_joined, joined, sum(map(len, joined))),
+        ('aggregated', transform_aggregated, aggregated, len(aggregated)),
+    ):
+        started = time.process_time()
+        transform(list(rows))
+        results[mode] = {'rows': rows_count, 'transform_cpu_seconds': round(time.process_time() - started, 4)}
+    results['rows_reduction'] = round(results['joined']['rows'] / results['aggregated']['rows'], 1)
+    results['cpu_reduction'] = round(
+        results['joined']['transform_cpu_seconds'] / max(results['aggregated']['transform_cpu_seconds'], 1e-9), 1,
+    )
+    return results
+
+
+def main():
+    """
+    Разбирает аргументы командной строки и печатает результаты в формате JSON.
+    """
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--films', type=int, default=1000)
+    parser.add_argument('--persons', type=int, default=60)
+    parser.add_argument('--genres', type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.films, args.persons, args.genres), indent=2))
+
+
+if __name__ == '__main__':
+    main()
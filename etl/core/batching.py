@@ -0,0 +1,106 @@
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core import metrics
+from core.config import BATCH_SIZE, ETL_PAR
+from core.logger import logger
+
+LATENCY_SMOOTHING = 0.3
+
+LATENCY_TOLERANCE = 0.25
+
+
+@dataclass
+class AdaptiveBatch(object):
+    """
+    Размер пакета этапа, который подбирается по принципу AIMD.
+
+    Пока время на одну строку не растет, размер увеличивается на step; если оно выросло больше чем на
+    LATENCY_TOLERANCE относительно сглаженного значения или получен сигнал перегрузки, размер
+    уменьшается в decrease раз. Размер остается в границах [min_size, max_size].
+
+    :param stage: Этап ETL, для которого подбирается размер.
+    :param size: Текущий размер пакета.
+    :param min_size: Нижняя граница размера.
+    :param max_size: Верхняя граница размера.
+    :param step: Шаг увеличения размера.
+    :param decrease: Коэффициент уменьшения размера.
+    """
+    stage: str
+    size: int = BATCH_SIZE
+    min_size: int = BATCH_SIZE
+    max_size: int = BATCH_SIZE
+    step: int = BATCH_SIZE
+    decrease: float = 0.5
+    _latency: Optional[float] = field(default=None, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    def __post_init__(self):
+        self.size = max(self.min_size, min(self.max_size, self.size))
+        metrics.BATCH_SIZE.labels(self.stage).set(self.size)
+
+    def observe(self, rows: int, seconds: float):
+        """
+        Учитывает время обработки пакета.
+
+        Пакеты меньше половины текущего размера не учитываются: их размер ограничивали данные, а не контроллер.
+
+        :param rows: Количество строк в пакете.
+        :param seconds: Время обработки пакета.
+        """
+        if not rows or rows < self.size // 2:
+            return
+        per_row = seconds / rows
+        with self._lock:
+            latency = self._latency
+            self._latency = per_row if latency is None else (
+                LATENCY_SMOOTHING * per_row + (1 - LATENCY_SMOOTHING) * latency
+            )
+            if latency is None or per_row <= latency:
+                self._resize(self.size + self.step, 'latency per row is {0:.6f} s'.format(per_row))
+            elif per_row > latency * (1 + LATENCY_TOLERANCE):
+                self._resize(int(self.size * self.decrease), 'latency per row rose to {0:.6f} s'.format(per_row))
+
+    def pressure(self, reason: str):
+        """
+        Уменьшает размер пакета после сигнала перегрузки, например ответа 429 от Elasticsearch.
+
+        :param reason: Причина уменьшения для лога.
+        """
+        with self._lock:
+            self._resize(int(self.size * self.decrease), reason)
+
+    def _resize(self, size: int, reason: str):
+        """
+        Устанавливает новый размер в границах и логирует изменение.
+
+        :param size: Желаемый размер.
+        :param reason: Причина изменения для лога.
+        """
+        size = max(self.min_size, min(self.max_size, size))
+        if size != self.size:
+            logger.info('Batch size of {0} is {1} -> {2}: {3}.'.format(self.stage, self.size, size, reason))
+            self.size = size
+            metrics.BATCH_SIZE.labels(self.stage).set(size)
+
+
+def adaptive_batch(stage: str) -> AdaptiveBatch:
+    """
+    Создает контроллер размера пакета этапа с границами из настроек ETL.
+
+    Если подбор размеров выключен, размер всегда равен BATCH_SIZE.
+
+    :param stage: Этап ETL.
+    :return: Контроллер размера пакета.
+    """
+    if not ETL_PAR.adaptive_batch:
+        return AdaptiveBatch(stage)
+    return AdaptiveBatch(stage, min_size=ETL_PAR.batch_min_size, max_size=ETL_PAR.batch_max_size)
+
+
+EXTRACT = adaptive_batch('extract')
+
+MOVIES = adaptive_batch('movies')
+
+LOAD = adaptive_batch('load')
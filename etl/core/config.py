@@ -1,17 +1,153 @@
 from typing import Type, Union
 
 from psycopg2.extras import DictRow
+from pydantic import BaseSettings, Field
 
 from db.db import ElasticSettings, PostgresSettings, RedisSettings
 from models.models import Genre, Movie, Person
 
+BATCH_SIZE = 100
+
+BATCH_MIN_SIZE = 10
+
+BATCH_MAX_SIZE = 2000
+
+COLLECTOR_FLUSH_SIZE = 5000
+
+COLLECTOR_FLUSH_INTERVAL = 1.0
+
+SADD_MEMBERS = 1000
+
+PIPELINE_QUEUE_SIZE = 4
+
+BULK_CONCURRENCY = 4
+
+BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+
+BULK_MAX_RETRIES = 5
+
+BULK_RETRY_DELAY = 0.5
+
+BULK_RETRY_MAX_DELAY = 30
+
+DEAD_LETTER_FILE = 'dead_letter.jsonl'
+
+HASH_FILE = 'hashes.db'
+
+CHANGES_CHANNEL = 'etl_changes'
+
+COALESCE_WINDOW = 0.5
+
+POLL_MIN_INTERVAL = 1.0
+
+POLL_MAX_INTERVAL = 60.0
+
+FORCEMERGE_TIMEOUT = 3600
+
+SNAPSHOT_WORKERS = 4
+
+SNAPSHOT_RANGES = 16
+
+STREAM_GROUP = 'etl'
+
+STREAM_CLAIM_IDLE = 300000
+
+STREAM_BLOCK = 5000
+
+STREAM_READ_COUNT = 10
+
+
+class EtlSettings(BaseSettings):
+    """
+    Настройки ETL процесса.
+
+    :param state_storage: Хранилище контрольных точек: 'json', 'redis' или 'postgres' (по умолчанию 'json').
+    :param state_file: Путь к JSON-файлу состояния (по умолчанию 'state.json').
+    :param movie_query: Режим выборки фильмов: 'aggregated' (одна строка на фильм) или 'joined'
+        (по умолчанию 'aggregated').
+    :param queue: Очередь фильмов в Redis: 'set' (множество) или 'stream' (поток с группой потребителей,
+        его разбирают несколько воркеров) (по умолчанию 'set').
+    :param stream_claim_idle: Время в миллисекундах, после которого неподтвержденный пакет другого воркера
+        забирается себе (по умолчанию STREAM_CLAIM_IDLE).
+    :param stream_block: Время в миллисекундах, которое воркер ждет новых пакетов (по умолчанию STREAM_BLOCK).
+    :param stream_read_count: Количество записей потока, которое забирается одним запросом к Redis
+        (по умолчанию STREAM_READ_COUNT).
+    :param adaptive_batch: Подбирать размеры пакетов этапов по задержке и отказам Elasticsearch (по умолчанию True).
+    :param batch_min_size: Нижняя граница размера пакета (по умолчанию BATCH_MIN_SIZE).
+    :param batch_max_size: Верхняя граница размера пакета (по умолчанию BATCH_MAX_SIZE).
+    :param snapshot_workers: Количество потоков, которые выгружают диапазоны идентификаторов в режиме снимка
+        (по умолчанию SNAPSHOT_WORKERS).
+    :param snapshot_ranges: Количество диапазонов идентификаторов, на которые делится каждая таблица в режиме снимка
+        (по умолчанию SNAPSHOT_RANGES).
+    :param collector_in_memory: Хранить очередь фильмов в памяти процесса вместо Redis (по умолчанию False).
+    :param pipeline: Загружать фильмы конвейером с параллельными этапами (по умолчанию False).
+    :param extract_workers: Количество потоков выборки фильмов из PostgreSQL (по умолчанию 2).
+    :param transform_workers: Количество потоков приведения документов к схеме (по умолчанию 2).
+    :param transform_processes: Размер пула процессов для приведения к схеме, 0 - без пула (по умолчанию 0).
+    :param load_workers: Количество потоков загрузки в Elasticsearch (по умолчанию 2).
+    :param pipeline_queue_size: Размер очереди между этапами конвейера в пакетах (по умолчанию PIPELINE_QUEUE_SIZE).
+    :param bulk_concurrency: Количество одновременных bulk-запросов (по умолчанию BULK_CONCURRENCY).
+    :param bulk_mode: Режим загрузки: 'parallel' (parallel_bulk с повтором неудавшихся документов) или 'simple'
+        (по умолчанию 'parallel').
+    :param dead_letter_file: Файл для документов, которые не удалось проиндексировать (по умолчанию DEAD_LETTER_FILE).
+    :param change_capture: Получать изменения только опросом ('poll') или еще и через LISTEN/NOTIFY ('listen')
+        (по умолчанию 'poll').
+    :param coalesce_window: Окно в секундах, за которое уведомления собираются в один пакет
+        (по умолчанию COALESCE_WINDOW).
+    :param poll_min_interval: Начальный интервал опроса при отсутствии обновлений (по умолчанию POLL_MIN_INTERVAL).
+    :param poll_max_interval: Максимальный интервал опроса при отсутствии обновлений (по умолчанию POLL_MAX_INTERVAL).
+    :param hash_storage: Хранилище хешей загруженных документов для пропуска неизмененных: 'redis', 'dbm' или 'none'
+        (по умолчанию 'none').
+    :param hash_file: Путь к файлу хешей для хранилища 'dbm' (по умолчанию HASH_FILE).
+    :param metrics_port: Порт HTTP-сервера метрик Prometheus, 0 - без сервера (по умолчанию 9108).
+    :param metrics_file: Файл, в который после каждого прохода записываются метрики Prometheus
+        (по умолчанию не задан).
+    :param partial_updates: Менять имена людей и названия жанров в фильмах update_by_query вместо пересборки фильмов
+        (по умолчанию False).
+    :param validate_sample_rate: Доля документов, которые сверяются с моделями pydantic, 0 - без проверки
+        (по умолчанию 0).
+    """
+    state_storage: str = Field(default='json', env='ETL_STATE_STORAGE')
+    state_file: str = Field(default='state.json', env='ETL_STATE_FILE')
+    movie_query: str = Field(default='aggregated', env='ETL_MOVIE_QUERY')
+    queue: str = Field(default='set', env='ETL_QUEUE')
+    stream_claim_idle: int = Field(default=STREAM_CLAIM_IDLE, env='ETL_STREAM_CLAIM_IDLE')
+    stream_block: int = Field(default=STREAM_BLOCK, env='ETL_STREAM_BLOCK')
+    stream_read_count: int = Field(default=STREAM_READ_COUNT, env='ETL_STREAM_READ_COUNT')
+    adaptive_batch: bool = Field(default=True, env='ETL_ADAPTIVE_BATCH')
+    batch_min_size: int = Field(default=BATCH_MIN_SIZE, env='ETL_BATCH_MIN_SIZE')
+    batch_max_size: int = Field(default=BATCH_MAX_SIZE, env='ETL_BATCH_MAX_SIZE')
+    snapshot_workers: int = Field(default=SNAPSHOT_WORKERS, env='ETL_SNAPSHOT_WORKERS')
+    snapshot_ranges: int = Field(default=SNAPSHOT_RANGES, env='ETL_SNAPSHOT_RANGES')
+    collector_in_memory: bool = Field(default=False, env='ETL_COLLECTOR_IN_MEMORY')
+    pipeline: bool = Field(default=False, env='ETL_PIPELINE')
+    extract_workers: int = Field(default=2, env='ETL_EXTRACT_WORKERS')
+    transform_workers: int = Field(default=2, env='ETL_TRANSFORM_WORKERS')
+    transform_processes: int = Field(default=0, env='ETL_TRANSFORM_PROCESSES')
+    load_workers: int = Field(default=2, env='ETL_LOAD_WORKERS')
+    pipeline_queue_size: int = Field(default=PIPELINE_QUEUE_SIZE, env='ETL_PIPELINE_QUEUE_SIZE')
+    bulk_concurrency: int = Field(default=BULK_CONCURRENCY, env='ETL_BULK_CONCURRENCY')
+    bulk_mode: str = Field(default='parallel', env='ETL_BULK_MODE')
+    dead_letter_file: str = Field(default=DEAD_LETTER_FILE, env='ETL_DEAD_LETTER_FILE')
+    change_capture: str = Field(default='poll', env='ETL_CHANGE_CAPTURE')
+    coalesce_window: float = Field(default=COALESCE_WINDOW, env='ETL_COALESCE_WINDOW')
+    poll_min_interval: float = Field(default=POLL_MIN_INTERVAL, env='ETL_POLL_MIN_INTERVAL')
+    poll_max_interval: float = Field(default=POLL_MAX_INTERVAL, env='ETL_POLL_MAX_INTERVAL')
+    hash_storage: str = Field(default='none', env='ETL_HASH_STORAGE')
+    hash_file: str = Field(default=HASH_FILE, env='ETL_HASH_FILE')
+    metrics_port: int = Field(default=9108, env='ETL_METRICS_PORT')
+    metrics_file: str = Field(default='', env='ETL_METRICS_FILE')
+    partial_updates: bool = Field(default=False, env='ETL_PARTIAL_UPDATES')
+    validate_sample_rate: float = Field(default=0, env='ETL_VALIDATE_SAMPLE_RATE')
+
+
 ELASTIC_PAR = ElasticSettings(_env_file='.env').dict()
 
 POSTGRES_PAR = PostgresSettings(_env_file='.env').dict()
 
 REDIS_PAR = RedisSettings(_env_file='.env').dict()
 
-BATCH_SIZE = 100
+ETL_PAR = EtlSettings(_env_file='.env')
 
 PostgresRow = DictRow
 
@@ -1,8 +1,10 @@
+import asyncio
 import time
 from functools import wraps
 from typing import Any, Callable, Tuple
 
 from core.logger import logger
+from core.metrics import BACKOFF_RETRIES
 
 
 def backoff(errors: Tuple, start_sleep_time=0.1, factor=2, border_sleep_time=10) -> Callable:
@@ -25,6 +27,7 @@ def backoff(errors: Tuple, start_sleep_time=0.1, factor=2, border_sleep_time=10)
                     conn = func(*args, **kwargs)
                 except errors as message:
                     logger.error('There is no connection: {0}!'.format(message))
+                    BACKOFF_RETRIES.labels(func.__qualname__).inc()
                     if delay < border_sleep_time:
                         delay *= factor  # Увеличиваем задержку на основе фактора
                     logger.error('Reconnecting via {0}.'.format(delay))
@@ -35,3 +38,36 @@ def backoff(errors: Tuple, start_sleep_time=0.1, factor=2, border_sleep_time=10)
         return wrapper
 
     return decorator
+
+
+def async_backoff(errors: Tuple, start_sleep_time=0.1, factor=2, border_sleep_time=10) -> Callable:
+    """
+    Декоратор для корутин с повторными попытками, не блокирующий цикл событий.
+
+    :param errors: Кортеж исключений, при возникновении которых будет выполняться повторная попытка.
+    :param start_sleep_time: Начальное время задержки между попытками (по умолчанию 0.1 секунд).
+    :param factor: Коэффициент увеличения времени задержки после каждой неудачной попытки (по умолчанию 2).
+    :param border_sleep_time: Максимальное время задержки (по умолчанию 10 секунд).
+    :return: Декоратор, который оборачивает корутину и добавляет логику повторных попыток.
+    """
+
+    def decorator(func) -> Callable:
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Any:
+            delay = start_sleep_time
+            while True:
+                try:
+                    conn = await func(*args, **kwargs)
+                except errors as message:
+                    logger.error('There is no connection: {0}!'.format(message))
+                    BACKOFF_RETRIES.labels(func.__qualname__).inc()
+                    if delay < border_sleep_time:
+                        delay *= factor
+                    logger.error('Reconnecting via {0}.'.format(delay))
+                    await asyncio.sleep(delay)
+                else:
+                    return conn
+
+        return wrapper
+
+    return decorator
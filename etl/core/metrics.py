@@ -0,0 +1,111 @@
+import json
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server, write_to_textfile
+
+from core.logger import logger
+
+BATCH_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+ROWS = Counter(
+    'etl_rows', 'Строки и документы, обработанные этапом ETL.', ('stage', 'table'),
+)
+BATCH_SECONDS = Histogram(
+    'etl_batch_duration_seconds', 'Время обработки одного пакета этапом ETL.', ('stage', 'table'),
+    buckets=BATCH_BUCKETS,
+)
+LAG_SECONDS = Gauge(
+    'etl_lag_seconds', 'Отставание индекса: время от изменения последней загруженной строки до ее обработки.',
+    ('table',),
+)
+DOCUMENTS = Counter(
+    'etl_documents', 'Документы, отправленные в Elasticsearch, по результату.', ('index', 'result'),
+)
+BULK_ERRORS = Counter(
+    'etl_bulk_errors', 'Ошибки отдельных документов в bulk-ответах Elasticsearch.', ('index', 'status'),
+)
+BACKOFF_RETRIES = Counter(
+    'etl_backoff_retries', 'Повторные попытки после ошибок соединения.', ('function',),
+)
+RUNS = Counter(
+    'etl_runs', 'Проходы ETL по результату.', ('result',),
+)
+BATCH_SIZE = Gauge(
+    'etl_batch_size', 'Текущий размер пакета этапа ETL.', ('stage',),
+)
+LAST_RUN_SECONDS = Gauge(
+    'etl_last_run_duration_seconds', 'Длительность последнего прохода ETL.',
+)
+LAST_RUN_TIMESTAMP = Gauge(
+    'etl_last_run_timestamp_seconds', 'Время завершения последнего прохода ETL.',
+)
+
+
+@contextmanager
+def batch(stage: str, table: str) -> Iterator[Dict[str, Any]]:
+    """
+    Измеряет время обработки пакета и количество его строк.
+
+    Количество строк записывается в словарь, который возвращает контекстный менеджер,
+    под ключом 'rows'; после выхода из блока в нем же оказывается длительность под ключом 'seconds'.
+
+    :param stage: Этап ETL ('extract', 'snapshot', 'collect', 'queue', 'transform' или 'load').
+    :param table: Таблица PostgreSQL или индекс Elasticsearch.
+    :yield: Словарь для количества строк пакета.
+    """
+    result: Dict[str, Any] = {'rows': 0}
+    started = time.perf_counter()
+    yield result
+    result['seconds'] = time.perf_counter() - started
+    BATCH_SECONDS.labels(stage, table).observe(result['seconds'])
+    ROWS.labels(stage, table).inc(result['rows'])
+
+
+def observe_lag(table: str, modified: Optional[datetime]):
+    """
+    Записывает отставание индекса по времени изменения последней обработанной строки.
+
+    :param table: Таблица PostgreSQL.
+    :param modified: Время изменения строки; None - отставания нет.
+    """
+    if modified is None:
+        LAG_SECONDS.labels(table).set(0)
+        return
+    now = datetime.now(timezone.utc) if modified.tzinfo else datetime.now()
+    LAG_SECONDS.labels(table).set(max((now - modified).total_seconds(), 0))
+
+
+def run_summary(started: float, updates: bool, documents: Dict[str, int],
+                metrics_file: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Фиксирует итоги прохода ETL в метриках и в логе.
+
+    :param started: Время начала прохода по time.monotonic.
+    :param updates: Были ли в проходе обновления.
+    :param documents: Счетчики документов загрузчика.
+    :param metrics_file: Файл для записи метрик в текстовом формате Prometheus.
+    :return: Итоги прохода.
+    """
+    duration = time.monotonic() - started
+    RUNS.labels('updates' if updates else 'idle').inc()
+    LAST_RUN_SECONDS.set(duration)
+    LAST_RUN_TIMESTAMP.set_to_current_time()
+    summary = {'updates': updates, 'duration_seconds': round(duration, 3), **documents}
+    logger.info('Run summary: {0}'.format(json.dumps(summary)))
+    if metrics_file:
+        write_to_textfile(metrics_file, REGISTRY)
+    return summary
+
+
+def start_metrics_server(port: int):
+    """
+    Запускает HTTP-сервер с метриками в формате Prometheus.
+
+    :param port: Порт сервера; 0 - сервер не запускается.
+    """
+    if port:
+        start_http_server(port)
+        logger.info('Metrics are exposed on port {0}.'.format(port))
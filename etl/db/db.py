@@ -1,12 +1,16 @@
-from contextlib import contextmanager
-from typing import Iterator
+import json
+from contextlib import asynccontextmanager, contextmanager
+from typing import AsyncIterator, Iterator
 
 import psycopg2
 from psycopg2.extensions import connection as _connection
 from psycopg2.extras import DictCursor
+from psycopg2.pool import ThreadedConnectionPool
 
-from elasticsearch import Elasticsearch
+import asyncpg
+from elasticsearch import AsyncElasticsearch, Elasticsearch
 from redis import Redis
+from redis.asyncio import Redis as AsyncRedis
 from pydantic import BaseSettings, Field
 
 
@@ -21,6 +25,17 @@ def con_elastic(host: str, port: int) -> Elasticsearch:
     return Elasticsearch(host=host, port=port)
 
 
+def con_elastic_async(host: str, port: int) -> AsyncElasticsearch:
+    """
+    Создает асинхронное соединение с Elasticsearch.
+
+    :param host: Хост Elasticsearch.
+    :param port: Порт Elasticsearch.
+    :return: Объект AsyncElasticsearch.
+    """
+    return AsyncElasticsearch(hosts=[{'host': host, 'port': port}])
+
+
 class ElasticSettings(BaseSettings):
     """
     Настройки для подключения к Elasticsearch.
@@ -46,6 +61,48 @@ def con_postgres(**dsn) -> Iterator[_connection]:
     conn.close()
 
 
+@contextmanager
+def con_postgres_pool(size: int, **dsn) -> Iterator[ThreadedConnectionPool]:
+    """
+    Контекстный менеджер для пула соединений с PostgreSQL, разделяемого между потоками.
+
+    :param size: Максимальное количество соединений в пуле.
+    :param dsn: Параметры подключения к базе данных PostgreSQL.
+    :yield: Пул соединений с базой данных PostgreSQL.
+    """
+    pool = ThreadedConnectionPool(1, size, cursor_factory=DictCursor, **dsn)
+    yield pool
+    pool.closeall()
+
+
+@asynccontextmanager
+async def con_postgres_async(size: int, dbname: str, options: str, **dsn) -> AsyncIterator[asyncpg.Pool]:
+    """
+    Асинхронный контекстный менеджер для пула соединений asyncpg с PostgreSQL.
+
+    Столбцы json декодируются в объекты Python, как это делает psycopg2.
+
+    :param size: Максимальное количество соединений в пуле.
+    :param dbname: Имя базы данных.
+    :param options: Параметры подключения вида '-c search_path=content'.
+    :param dsn: Остальные параметры подключения к базе данных PostgreSQL.
+    :yield: Пул соединений asyncpg.
+    """
+    async def init(conn: asyncpg.Connection):
+        await conn.set_type_codec('json', encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+
+    server_settings = dict(
+        option.split('=', 1) for option in options.replace('-c', ' ').split() if '=' in option
+    )
+    pool = await asyncpg.create_pool(
+        database=dbname, server_settings=server_settings, max_size=size, min_size=1, init=init, **dsn,
+    )
+    try:
+        yield pool
+    finally:
+        await pool.close()
+
+
 class PostgresSettings(BaseSettings):
     """
     Настройки для подключения к PostgreSQL.
@@ -77,6 +134,18 @@ def con_redis(db: int, host: str, port: int) -> Redis:
     return Redis(db=db, host=host, port=port)
 
 
+def con_redis_async(db: int, host: str, port: int) -> AsyncRedis:
+    """
+    Создает асинхронное соединение с Redis.
+
+    :param db: Номер базы данных Redis.
+    :param host: Хост Redis.
+    :param port: Порт Redis.
+    :return: Объект redis.asyncio.Redis.
+    """
+    return AsyncRedis(db=db, host=host, port=port)
+
+
 class RedisSettings(BaseSettings):
     """
     Настройки для подключения к Redis.
@@ -10,4 +10,4 @@ while ! nc -z $ELASTICSEARCH_HOST $ELASTICSEARCH_PORT; do
       sleep 1
 done
 
-python main.py
\ No newline at end of file
+python ${ETL_SCRIPT:-main.py}
\ No newline at end of file
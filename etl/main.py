@@ -1,75 +1,402 @@
 import time
-from datetime import datetime
+from contextlib import nullcontext
+from functools import partial
+from typing import Dict, Iterable, List, Mapping, Optional, Set
 
-from pytz import timezone
+from psycopg2.pool import AbstractConnectionPool
 
-from core.config import ELASTIC_PAR, POSTGRES_PAR, REDIS_PAR
+from core import metrics
+from core.config import BATCH_SIZE, ELASTIC_PAR, ETL_PAR, POSTGRES_PAR, REDIS_PAR, PostgresRow
 from core.logger import logger
-from db.db import con_elastic, con_postgres, con_redis
+from db.db import con_elastic, con_postgres, con_postgres_pool, con_redis
 from models.models import Genre, Movie, Person
-from services import extract, load, transform
-from services.state import State, JsonStorage
+from services import changes, extract, indices, load, pipeline, stream_transform, transform
+from services.base import Watermark
+from services.changes import Changes
+from services.hashes import BaseHashStore, DbmHashStore, RedisHashStore
+from services.state import EXTRACT_STAGE, LOAD_STAGE, BaseStorage, JsonStorage, PostgresStorage, RedisStorage, State
+
+DOCUMENT_SCHEMAS = {'film_work': Movie, 'person': Person, 'genre': Genre}
 
 
 def run_etl(postgres: extract.PostgresExtractor, data: transform.DataTransform, elastic: load.ElasticLoader,
-            state: State):
+            state: State, postgres_pool: Optional[AbstractConnectionPool] = None,
+            loaded: Optional[Dict[str, Set[Watermark]]] = None):
     """
     Выполняет ETL процесс: извлечение данных из PostgreSQL, трансформацию и загрузку в Elasticsearch.
 
+    Водяные знаки фиксируются после каждого успешно обработанного пакета, поэтому после сбоя
+    процесс продолжается с последнего сохраненного пакета.
+
     :param postgres: Экстрактор для получения обновлений из PostgreSQL.
     :param data: Объект для трансформации данных.
     :param elastic: Загрузчик для отправки данных в Elasticsearch.
-    :param state: Объект состояния для отслеживания времени последнего обновления.
-    """
-    timestamp = state.read_state('last_updated', datetime.min)
-    for table, rows in postgres.get_updates(timestamp):
-        if table == 'genre':
-            elastic.bulk_insert(Genre, rows)
-        if table == 'person':
-            elastic.bulk_insert(Person, rows)
-        for row in postgres.get_film_work_ids(table, rows):
-            data.collector('movie_ids', row['id'])
+    :param state: Объект состояния для хранения водяных знаков таблиц.
+    :param postgres_pool: Пул соединений PostgreSQL; если задан, фильмы загружаются конвейером.
+    :param loaded: Пары (modified, id) строк, уже загруженных по уведомлениям; они пропускаются.
+    :raises UpdatesNotFoundError: Если нет ни новых строк, ни незагруженных произведений.
+    """
+    # Очередь в памяти процесса не переживает сбой, поэтому в этом режиме
+    # извлечение продолжается с водяного знака загрузки.
+    start_stage = LOAD_STAGE if data.in_memory else EXTRACT_STAGE
+    watermarks = {table: state.read_watermark(table, start_stage) for table in postgres.TABLES}
+    try:
+        for table, rows in postgres.get_updates(watermarks):
+            skipped = (loaded or {}).get(table, set())
+            collect_rows(postgres, data, elastic, table, [
+                row for row in rows if (row['modified'], str(row['id'])) not in skipped
+            ])
+            data.flush()
+            state.write_watermark(table, EXTRACT_STAGE, (rows[-1]['modified'], rows[-1]['id']))
+            metrics.observe_lag(table, rows[-1]['modified'])
+    except extract.UpdatesNotFoundError:
+        updates = False
+        for table in postgres.TABLES:
+            metrics.observe_lag(table, None)
+    else:
+        updates = True
+    if postgres_pool is not None:
+        updates = load_movies_pipeline(postgres_pool, data, elastic) or updates
+    else:
+        updates = load_movies(postgres, data, elastic) or updates
+    updates = load_persons(postgres, data, elastic) or updates
+    for table in postgres.TABLES:
+        state.write_watermark(table, LOAD_STAGE, state.read_watermark(table, EXTRACT_STAGE))
+    if not updates:
+        raise extract.UpdatesNotFoundError
+
+
+def run_changes(postgres: extract.PostgresExtractor, data: transform.DataTransform, elastic: load.ElasticLoader,
+                changes: Changes, postgres_pool: Optional[AbstractConnectionPool] = None) -> Dict[str, Set[Watermark]]:
+    """
+    Загружает строки, о которых сообщили уведомления PostgreSQL, не дожидаясь опроса по водяным знакам.
+
+    Документы строк, которых уже нет в PostgreSQL, удаляются из индексов. Водяные знаки не меняются:
+    следующий опрос пропускает строки с возвращенными парами (modified, id) и загружает строки,
+    уведомления о которых пропущены. У удалений и связующих таблиц водяных знаков нет, поэтому
+    пропущенное уведомление о них опрос не восстанавливает: такое изменение попадает в индексы
+    со следующим изменением фильма или человека либо при переиндексации.
+
+    :param postgres: Экстрактор для получения данных из PostgreSQL.
+    :param data: Объект для трансформации данных.
+    :param elastic: Загрузчик для отправки данных в Elasticsearch.
+    :param changes: Идентификаторы измененных строк по таблицам.
+    :param postgres_pool: Пул соединений PostgreSQL; если задан, фильмы загружаются конвейером.
+    :return: Пары (modified, id) загруженных строк по таблицам.
+    """
+    loaded: Dict[str, Set[Watermark]] = {}
+    for table in postgres.TABLES:
+        ids = sorted(changes.get(table, ()))
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = ids[start:start + BATCH_SIZE]
+            rows = postgres.select_rows(table, batch)
+            deleted = set(batch) - {str(row['id']) for row in rows}
+            if deleted:
+                elastic.delete_documents(DOCUMENT_SCHEMAS[table], deleted)
+            loaded.setdefault(table, set()).update((row['modified'], str(row['id'])) for row in rows)
+            collect_rows(postgres, data, elastic, table, rows)
+    data.flush()
+    if postgres_pool is not None:
+        load_movies_pipeline(postgres_pool, data, elastic)
+    else:
+        load_movies(postgres, data, elastic)
+    load_persons(postgres, data, elastic)
+    return loaded
+
+
+def collect_rows(postgres: extract.PostgresExtractor, data: transform.DataTransform, elastic: load.ElasticLoader,
+                 table: str, rows: List[PostgresRow]):
+    """
+    Обрабатывает измененные строки таблицы: загружает жанры и ставит в очередь связанные фильмы и людей.
+
+    :param postgres: Экстрактор для получения данных из PostgreSQL.
+    :param data: Объект для трансформации данных.
+    :param elastic: Загрузчик для отправки данных в Elasticsearch.
+    :param table: Таблица, из которой получены строки.
+    :param rows: Строки таблицы.
+    """
+    if not rows:
+        return
+    if table == 'genre':
+        elastic.bulk_insert(Genre, rows)
+    collect_person_ids(postgres, data, table, rows)
+    film_ids = get_film_ids(postgres, table, rows)
+    if not update_movies(elastic, table, rows, film_ids):
+        for film_id in film_ids:
+            data.collector('movie_ids', film_id)
+
+
+def collect_person_ids(postgres: extract.PostgresExtractor, data: transform.DataTransform, table: str,
+                       rows: List[PostgresRow]):
+    """
+    Собирает людей, документы которых нужно пересобрать: измененных людей и участников измененных фильмов.
+
+    :param postgres: Экстрактор для получения данных из PostgreSQL.
+    :param data: Объект для трансформации данных.
+    :param table: Таблица, из которой получены строки.
+    :param rows: Строки таблицы.
+    """
+    if table == 'person':
+        person_ids = [row['id'] for row in rows]
+    elif table == 'film_work':
+        person_ids = postgres.get_film_person_ids([row['id'] for row in rows])
+    else:
+        return
+    for person_id in person_ids:
+        data.collector('person_ids', person_id)
+
+
+def get_film_ids(postgres: extract.PostgresExtractor, table: str, rows: List[PostgresRow]) -> List[str]:
+    """
+    Получает идентификаторы фильмов, связанных со строками таблицы, без повторов.
+
+    :param postgres: Экстрактор для получения данных из PostgreSQL.
+    :param table: Таблица, из которой получены строки.
+    :param rows: Строки таблицы.
+    :return: Идентификаторы фильмов.
+    """
+    return list(dict.fromkeys(str(row['id']) for row in postgres.get_film_work_ids(table, rows)))
+
+
+def update_movies(elastic: load.ElasticLoader, table: str, rows: List[PostgresRow], film_ids: List[str]) -> bool:
+    """
+    Обновляет имена людей или названия жанров в уже загруженных фильмах частичным обновлением, если оно включено.
+
+    :param elastic: Загрузчик для отправки данных в Elasticsearch.
+    :param table: Таблица, из которой получены строки.
+    :param rows: Строки таблицы person или genre.
+    :param film_ids: Идентификаторы фильмов, связанных со строками в PostgreSQL.
+    :return: True, если все связанные фильмы обновлены и их не нужно пересобирать.
+    """
+    if not ETL_PAR.partial_updates or not rows or table not in {'person', 'genre'}:
+        return False
+    if not film_ids:
+        return True
+    if table == 'person':
+        return elastic.update_movie_persons(rows, film_ids)
+    return elastic.update_movie_genres(rows, film_ids)
+
+
+def load_movies(postgres: extract.PostgresExtractor, data: transform.DataTransform,
+                elastic: load.ElasticLoader) -> bool:
+    """
+    Последовательно загружает накопленные фильмы: выборка, трансформация и загрузка пакета по очереди.
+
+    :param postgres: Экстрактор для получения данных фильмов из PostgreSQL.
+    :param data: Объект для трансформации данных.
+    :param elastic: Загрузчик для отправки данных в Elasticsearch.
+    :return: True, если был загружен хотя бы один пакет.
+    """
+    loaded = False
     for movies in data.batcher('movie_ids'):
+        elastic.bulk_insert(Movie, get_movies(postgres, data, movies))
+        data.acknowledge('movie_ids', movies.keys())
+        loaded = True
+    return loaded
+
+
+def load_persons(postgres: extract.PostgresExtractor, data: transform.DataTransform,
+                 elastic: load.ElasticLoader) -> bool:
+    """
+    Загружает накопленных людей вместе с фильмографией, собранной в PostgreSQL.
+
+    :param postgres: Экстрактор для получения данных людей из PostgreSQL.
+    :param data: Объект для трансформации данных.
+    :param elastic: Загрузчик для отправки данных в Elasticsearch.
+    :return: True, если был загружен хотя бы один пакет.
+    """
+    loaded = False
+    for persons in data.batcher('person_ids', template=dict):
+        elastic.bulk_insert(Person, postgres.get_person_documents(persons.keys()))
+        data.acknowledge('person_ids', persons.keys())
+        loaded = True
+    return loaded
+
+
+def load_movies_pipeline(postgres_pool: AbstractConnectionPool, data: transform.DataTransform,
+                         elastic: load.ElasticLoader) -> bool:
+    """
+    Загружает накопленные фильмы конвейером: выборка, приведение к схеме и загрузка выполняются
+    одновременно в отдельных потоках, связанных ограниченными очередями.
+
+    :param postgres_pool: Пул соединений PostgreSQL для потоков выборки.
+    :param data: Объект для трансформации данных.
+    :param elastic: Загрузчик для отправки данных в Elasticsearch.
+    :return: True, если был загружен хотя бы один пакет.
+    """
+    def extract_movies(movies: Dict[str, Dict]) -> transform.MovieBatch:
+        conn = postgres_pool.getconn()
+        try:
+            rows = get_movies(extract.PostgresExtractor(conn), data, movies)
+            return list(movies.keys()), [dict(row) for row in rows]
+        finally:
+            postgres_pool.putconn(conn)
+
+    def load_movies_batch(batch: transform.MovieBatch):
+        movie_ids, documents = batch
+        elastic.bulk_documents(Movie, documents)
+        data.acknowledge('movie_ids', movie_ids)
+
+    movies_pipeline = pipeline.Pipeline(
+        [
+            pipeline.Stage('extract', extract_movies, ETL_PAR.extract_workers),
+            pipeline.Stage(
+                'transform',
+                partial(transform.build_documents, Movie),
+                ETL_PAR.transform_workers,
+                ETL_PAR.transform_processes,
+            ),
+            pipeline.Stage('load', load_movies_batch, ETL_PAR.load_workers),
+        ],
+        queue_size=ETL_PAR.pipeline_queue_size,
+    )
+    return bool(movies_pipeline.run(data.batcher('movie_ids')))
+
+
+def get_movies(postgres: extract.PostgresExtractor, data: transform.DataTransform,
+               movies: Dict[str, Dict]) -> Iterable[Mapping]:
+    """
+    Собирает документы фильмов пакета в режиме, выбранном в настройках ETL.
+
+    :param postgres: Экстрактор для получения данных фильмов из PostgreSQL.
+    :param data: Объект для трансформации данных.
+    :param movies: Пакет из батчера: идентификаторы фильмов и их пустые шаблоны.
+    :return: Документы фильмов для загрузки в Elasticsearch.
+    """
+    if ETL_PAR.movie_query == 'joined':
         for row in postgres.get_movie_data(movies.keys()):
             data.parser(row, movies.get(row['id']))
-        elastic.bulk_insert(Movie, movies.values())
+        return movies.values()
+    return postgres.get_movie_documents(movies.keys())
+
 
+def get_storage(postgres, redis) -> BaseStorage:
+    """
+    Создает хранилище контрольных точек, выбранное в настройках ETL.
 
-def postgres_to_elastic(postgres, elasticsearch, redis):
+    :param postgres: Соединение с PostgreSQL.
+    :param redis: Соединение с Redis.
+    :return: Хранилище состояния.
+    """
+    if ETL_PAR.state_storage == 'redis':
+        return RedisStorage(redis)
+    if ETL_PAR.state_storage == 'postgres':
+        return PostgresStorage(postgres)
+    return JsonStorage(ETL_PAR.state_file)
+
+
+def get_transform(redis, block: Optional[int] = None) -> transform.DataTransform:
+    """
+    Создает очередь фильмов, выбранную в настройках ETL.
+
+    :param redis: Соединение с Redis.
+    :param block: Время в миллисекундах, которое батчер потока ждет новых записей; None - не ждать.
+    :return: Объект для трансформации данных.
+    """
+    if ETL_PAR.queue == 'stream':
+        return stream_transform.StreamDataTransform(
+            redis,
+            in_memory=ETL_PAR.collector_in_memory,
+            claim_idle=ETL_PAR.stream_claim_idle,
+            read_count=ETL_PAR.stream_read_count,
+            block=block,
+        )
+    return transform.DataTransform(redis, in_memory=ETL_PAR.collector_in_memory)
+
+
+def get_hash_store(redis) -> Optional[BaseHashStore]:
+    """
+    Создает хранилище хешей загруженных документов, выбранное в настройках ETL.
+
+    :param redis: Соединение с Redis.
+    :return: Хранилище хешей или None, если пропуск неизмененных документов выключен.
+    """
+    if ETL_PAR.hash_storage == 'redis':
+        return RedisHashStore(redis)
+    if ETL_PAR.hash_storage == 'dbm':
+        return DbmHashStore(ETL_PAR.hash_file)
+    return None
+
+
+def postgres_to_elastic(postgres, elasticsearch, redis, postgres_pool=None, listener=None):
     """
     Запускает процесс передачи данных из PostgreSQL в Elasticsearch с использованием Redis для состояния.
 
+    Пока проход находит обновления, следующий начинается сразу; без обновлений интервал опроса
+    растет до poll_max_interval. Между опросами уведомления слушателя загружаются сразу после
+    окна объединения.
+
     :param postgres: Соединение с PostgreSQL.
     :param elasticsearch: Соединение с Elasticsearch.
     :param redis: Соединение с Redis для хранения состояния.
+    :param postgres_pool: Пул соединений PostgreSQL для конвейерной загрузки фильмов.
+    :param listener: Слушатель уведомлений PostgreSQL или None для режима только опроса.
+    :raises MappingMismatchError: Если маппинги индексов устарели и их нужно перестроить.
     """
-    state = State(JsonStorage('state.json'))
+    indices.check_mappings(elasticsearch)
+    state = State(get_storage(postgres, redis))
+    hashes = get_hash_store(redis)
+    poll = changes.AdaptivePoll(ETL_PAR.poll_min_interval, ETL_PAR.poll_max_interval)
+
+    def make_etl():
+        return (
+            extract.PostgresExtractor(postgres),
+            get_transform(redis),
+            load.ElasticLoader(
+                elasticsearch,
+                parallel=ETL_PAR.bulk_mode == 'parallel',
+                thread_count=ETL_PAR.bulk_concurrency,
+                dead_letter_file=ETL_PAR.dead_letter_file,
+                hashes=hashes,
+            ),
+        )
+
+    loaded: Dict[str, Set[Watermark]] = {}
     while True:
+        started = time.monotonic()
+        postgres_extractor, data, elastic = make_etl()
         try:
-            run_etl(
-                extract.PostgresExtractor(postgres),
-                transform.DataTransform(redis),
-                load.ElasticLoader(elasticsearch),
-                state,
-            )
+            run_etl(postgres_extractor, data, elastic, state, postgres_pool, loaded)
         except extract.UpdatesNotFoundError:
             logger.info('There are no updates.')
+            metrics.run_summary(started, False, elastic.summary(), ETL_PAR.metrics_file)
+            delay = poll.idle()
         else:
             logger.info('There are updates!')
-            state.write_state('last_updated', datetime.now(tz=timezone('Europe/Moscow')))
-        finally:
-            logger.info('Repeat the request in 1 minute.')
-            time.sleep(60)
+            metrics.run_summary(started, True, elastic.summary(), ETL_PAR.metrics_file)
+            delay = poll.busy()
+        loaded.clear()
+        logger.info('Repeat the request in {0:.1f} seconds.'.format(delay))
+        deadline = time.monotonic() + delay
+        while (timeout := deadline - time.monotonic()) > 0:
+            if listener is None or not listener.active:
+                time.sleep(timeout)
+                break
+            if received := listener.wait(timeout):
+                logger.info('Received changes: {0}.'.format(
+                    ', '.join('{0} {1}'.format(len(ids), table) for table, ids in received.items())
+                ))
+                started = time.monotonic()
+                postgres_extractor, data, elastic = make_etl()
+                for table, keys in run_changes(postgres_extractor, data, elastic, received, postgres_pool).items():
+                    loaded.setdefault(table, set()).update(keys)
+                metrics.run_summary(started, True, elastic.summary(), ETL_PAR.metrics_file)
 
 
 def main():
     """
     Основная функция, которая устанавливает соединения с базами данных и запускает процесс передачи данных.
     """
-    with con_postgres(**POSTGRES_PAR) as postgres_conn:
+    metrics.start_metrics_server(ETL_PAR.metrics_port)
+    pool = con_postgres_pool(ETL_PAR.extract_workers, **POSTGRES_PAR) if ETL_PAR.pipeline else nullcontext()
+    listen = con_postgres(**POSTGRES_PAR) if ETL_PAR.change_capture == 'listen' else nullcontext()
+    with con_postgres(**POSTGRES_PAR) as postgres_conn, pool as postgres_pool, listen as listen_conn:
+        listener = None
+        if listen_conn is not None:
+            listener = changes.ChangeListener(listen_conn, coalesce_window=ETL_PAR.coalesce_window)
         with con_redis(**REDIS_PAR) as redis_conn:
             with con_elastic(**ELASTIC_PAR) as elastic_conn:
-                postgres_to_elastic(postgres_conn, elastic_conn, redis_conn)
+                postgres_to_elastic(postgres_conn, elastic_conn, redis_conn, postgres_pool, listener)
 
 
 if __name__ == '__main__':
@@ -25,13 +25,37 @@ class Genre(UUIDMix):
     _index: ClassVar[str] = 'genres'
 
 
+class MovieGenre(UUIDMix):
+    """
+    Жанр в документе фильма.
+
+    :param name: Название жанра.
+    """
+    name: str
+
+
+class PersonFilm(UUIDMix):
+    """
+    Фильм в фильмографии человека.
+
+    :param title: Название фильма.
+    :param imdb_rating: Рейтинг фильма.
+    :param roles: Роли человека в фильме.
+    """
+    title: str
+    imdb_rating: Optional[float]
+    roles: List[str]
+
+
 class Person(UUIDMix):
     """
     Модель человека.
 
     :param full_name: Полное имя человека.
+    :param films: Фильмография человека; в документах фильмов не используется.
     """
     full_name: str = Field(alias='name')
+    films: List[PersonFilm] = []
     _index: ClassVar[str] = 'persons'
 
     class Config(object):
@@ -42,7 +66,8 @@ class Person(UUIDMix):
 class Movie(UUIDMix):
     """Модель фильма."""
     imdb_rating: Optional[float]
-    genres: List[str]
+    genres: List[MovieGenre]
+    genres_names: List[str]
     title: str
     description: Optional[str]
     directors_names: List[str]
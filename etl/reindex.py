@@ -0,0 +1,76 @@
+from datetime import datetime
+from typing import Dict
+
+from core.config import ELASTIC_PAR, ETL_PAR, POSTGRES_PAR, REDIS_PAR
+from core.logger import logger
+from db.db import con_elastic, con_postgres, con_redis
+from main import get_storage
+from models.models import Genre, Movie, Person
+from services import extract, load
+from services.base import MIN_UUID, Watermark
+from services.indices import Reindexer
+from services.state import EXTRACT_STAGE, LOAD_STAGE, State
+
+
+def reindex(postgres: extract.PostgresExtractor, elastic: load.ElasticLoader, reindexer: Reindexer,
+            state: State):
+    """
+    Перестраивает все индексы в новых версиях и переключает на них псевдонимы.
+
+    Инкрементальный ETL продолжает писать в старые индексы, пока строятся новые. После переключения
+    водяные знаки откатываются к последним строкам, прочитанным переиндексацией, чтобы изменения,
+    сделанные во время перестроения, повторно попали в новые индексы.
+
+    :param postgres: Экстрактор для получения данных из PostgreSQL.
+    :param elastic: Загрузчик, который пишет в новые версии индексов.
+    :param reindexer: Объект, управляющий версиями индексов и псевдонимами.
+    :param state: Объект состояния инкрементального ETL.
+    """
+    watermarks: Dict[str, Watermark] = {}
+    try:
+        for table in postgres.TABLES:
+            watermark: Watermark = (datetime.min, MIN_UUID)
+            for rows in postgres.select_table(table, watermark):
+                if table == 'genre':
+                    elastic.bulk_insert(Genre, rows)
+                if table == 'person':
+                    elastic.bulk_insert(Person, postgres.get_person_documents([row['id'] for row in rows]))
+                if table == 'film_work':
+                    elastic.bulk_insert(Movie, postgres.get_movie_documents([row['id'] for row in rows]))
+                watermark = (rows[-1]['modified'], str(rows[-1]['id']))
+            watermarks[table] = watermark
+            logger.info('Table {0} is reindexed.'.format(table))
+        reindexer.publish()
+    except BaseException:
+        reindexer.abort()
+        raise
+    for table, watermark in watermarks.items():
+        for stage in (EXTRACT_STAGE, LOAD_STAGE):
+            if state.read_watermark(table, stage) > watermark:
+                state.write_watermark(table, stage, watermark)
+
+
+def main():
+    """
+    Устанавливает соединения с базами данных и выполняет полную переиндексацию.
+    """
+    with con_postgres(**POSTGRES_PAR) as postgres_conn:
+        with con_redis(**REDIS_PAR) as redis_conn:
+            with con_elastic(**ELASTIC_PAR) as elastic_conn:
+                reindexer = Reindexer(elastic_conn)
+                reindex(
+                    extract.PostgresExtractor(postgres_conn),
+                    load.ElasticLoader(
+                        elastic_conn,
+                        parallel=ETL_PAR.bulk_mode == 'parallel',
+                        thread_count=ETL_PAR.bulk_concurrency,
+                        dead_letter_file=ETL_PAR.dead_letter_file,
+                        indices=reindexer.create(),
+                    ),
+                    reindexer,
+                    State(get_storage(postgres_conn, redis_conn)),
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+from datetime import timezone
+from typing import AsyncIterator, Iterable, List, Optional
+
+import asyncpg
+from pydantic.dataclasses import dataclass
+
+from core import batching, metrics
+from core.decorators import async_backoff
+from services.base import Config, Watermark
+from services.extract import FILM_PERSON_IDS_QUERY, MOVIE_DOCUMENTS_QUERY, PERSON_DOCUMENTS_QUERY, PostgresExtractor
+
+POSTGRES_ERRORS = (OSError, asyncpg.InterfaceError, asyncpg.PostgresConnectionError)
+
+
+@dataclass(config=Config)
+class AsyncPostgresExtractor(object):
+    postgres: asyncpg.Pool
+    TABLES = PostgresExtractor.TABLES
+    COLUMNS = PostgresExtractor.COLUMNS
+
+    @async_backoff(errors=POSTGRES_ERRORS)
+    async def select_page(self, table: str, watermark: Watermark, limit: Optional[int] = None) -> List[asyncpg.Record]:
+        """
+        Выбирает одну страницу строк таблицы, следующих за водяным знаком (keyset-пагинация).
+
+        :param table: Название таблицы для выборки данных.
+        :param watermark: Пара (modified, id) последней уже обработанной строки.
+        :param limit: Максимальное количество строк на странице; по умолчанию размер пакета выборки batching.EXTRACT.
+        :return: Список строк, отсортированных по (modified, id).
+        """
+        controller = batching.EXTRACT if limit is None else None
+        limit = limit or batching.EXTRACT.size
+        modified, row_id = watermark
+        if modified.tzinfo is not None:
+            modified = modified.astimezone(timezone.utc).replace(tzinfo=None)
+        query = """
+            SELECT {columns}
+            FROM {table}
+            WHERE (modified, id) > ($1, $2::uuid)
+            ORDER BY modified, id
+            LIMIT $3;
+        """.format(columns=', '.join(self.COLUMNS[table]), table=table)
+        with metrics.batch('extract', table) as batch:
+            rows = await self.postgres.fetch(query, modified, str(row_id), limit)
+            batch['rows'] = len(rows)
+        if controller is not None:
+            controller.observe(batch['rows'], batch['seconds'])
+        return rows
+
+    async def select_table(self, table: str, watermark: Watermark) -> AsyncIterator[List[asyncpg.Record]]:
+        """
+        Постранично выбирает данные из указанной таблицы, следующие за водяным знаком.
+
+        :param table: Название таблицы для выборки данных.
+        :param watermark: Пара (modified, id), после которой данные будут выбраны.
+        :yield: Страницы строк размером не больше текущего размера пакета выборки.
+        """
+        while rows := await self.select_page(table, watermark):
+            yield rows
+            watermark = (rows[-1]['modified'], str(rows[-1]['id']))
+
+    @async_backoff(errors=POSTGRES_ERRORS)
+    async def get_film_work_ids(self, table: str, data: List[asyncpg.Record]) -> List[str]:
+        """
+        Получает идентификаторы фильмов для указанных строк таблицы.
+
+        :param table: Название таблицы ('film_work', 'person' или 'genre').
+        :param data: Строки, содержащие идентификаторы.
+        :return: Идентификаторы фильмов, связанные с указанными данными.
+        """
+        ids = [str(row['id']) for row in data]
+        if table not in {'person', 'genre'}:
+            return ids
+        query = """
+            SELECT DISTINCT link.film_work_id
+            FROM {table}_film_work link
+            WHERE link.{table}_id = ANY($1::uuid[]);
+        """.format(table=table)
+        return [str(row['film_work_id']) for row in await self.postgres.fetch(query, ids)]
+
+    @async_backoff(errors=POSTGRES_ERRORS)
+    async def get_movie_documents(self, film_ids: Iterable[str]) -> List[asyncpg.Record]:
+        """
+        Получает агрегированные данные фильмов: одна строка на фильм.
+
+        :param film_ids: Идентификаторы фильмов для выборки данных.
+        :return: Строки с полями модели Movie.
+        """
+        query = MOVIE_DOCUMENTS_QUERY.replace('%(film_ids)s', '$1')
+        with metrics.batch('extract', 'movie_documents') as batch:
+            rows = await self.postgres.fetch(query, list(film_ids))
+            batch['rows'] = len(rows)
+        batching.MOVIES.observe(batch['rows'], batch['seconds'])
+        return rows
+
+    @async_backoff(errors=POSTGRES_ERRORS)
+    async def get_person_documents(self, person_ids: Iterable[str]) -> List[asyncpg.Record]:
+        """
+        Получает людей с фильмографией: одна строка на человека.
+
+        :param person_ids: Идентификаторы людей.
+        :return: Строки с полями модели Person.
+        """
+        query = PERSON_DOCUMENTS_QUERY.replace('%(person_ids)s', '$1')
+        with metrics.batch('extract', 'person_documents') as batch:
+            rows = await self.postgres.fetch(query, [str(person_id) for person_id in person_ids])
+            batch['rows'] = len(rows)
+        return rows
+
+    @async_backoff(errors=POSTGRES_ERRORS)
+    async def get_film_person_ids(self, film_ids: Iterable[str]) -> List[str]:
+        """
+        Получает идентификаторы людей, участвующих в фильмах.
+
+        :param film_ids: Идентификаторы фильмов.
+        :return: Идентификаторы людей.
+        """
+        query = FILM_PERSON_IDS_QUERY.replace('%(film_ids)s', '$1')
+        return [str(row['id']) for row in await self.postgres.fetch(query, [str(film_id) for film_id in film_ids])]
@@ -0,0 +1,243 @@
+import asyncio
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Set
+
+from elasticsearch import AsyncElasticsearch, helpers
+from elasticsearch.exceptions import ConnectionError, NotFoundError, TransportError
+
+from core import batching, metrics
+from core.config import (
+    BULK_CONCURRENCY,
+    BULK_MAX_RETRIES,
+    BULK_RETRY_DELAY,
+    BULK_RETRY_MAX_DELAY,
+    DEAD_LETTER_FILE,
+    Schemas,
+)
+from core.decorators import async_backoff
+from core.logger import logger
+from models.models import Movie
+from services.documents import build_documents, encode, movie_genres_update, movie_persons_update
+from services.elasticsearch_index_definitions import INDEX
+from services.indices import MappingMismatchError, index_body, indices_drift, versioned_name
+from services.load import write_dead_letter
+
+
+@dataclass
+class AsyncElasticLoader(object):
+    """
+    Асинхронный загрузчик, который держит в работе несколько bulk-запросов одновременно.
+
+    :param elastic: Асинхронный клиент Elasticsearch.
+    :param concurrency: Максимальное количество одновременно выполняемых bulk-запросов.
+    :param max_retries: Количество повторов документов, отклоненных с 429.
+    :param dead_letter_file: Файл для документов, которые не удалось проиндексировать.
+    """
+    elastic: AsyncElasticsearch
+    concurrency: int = BULK_CONCURRENCY
+    max_retries: int = BULK_MAX_RETRIES
+    dead_letter_file: str = DEAD_LETTER_FILE
+    _semaphore: asyncio.Semaphore = field(init=False, repr=False)
+    _tasks: Set[asyncio.Task] = field(default_factory=set, init=False, repr=False)
+    _errors: List[BaseException] = field(default_factory=list, init=False, repr=False)
+    stats: Counter = field(default_factory=Counter, init=False)
+
+    def __post_init__(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    @async_backoff(errors=(ConnectionError,))
+    async def create_indices(self):
+        """
+        Создает индексы в Elasticsearch, если они еще не существуют.
+        """
+        for alias in INDEX:
+            if not await self.elastic.indices.exists(index=alias):
+                body = index_body(alias)
+                body['aliases'] = {alias: {}}
+                await self.elastic.indices.create(index=versioned_name(alias), body=body)
+
+    @async_backoff(errors=(ConnectionError,))
+    async def check_mappings(self):
+        """
+        Проверяет, что маппинги существующих индексов совпадают с INDEX.
+
+        :raises MappingMismatchError: Если индекс нужно перестроить reindex.py или snapshot.py.
+        """
+        mappings = {}
+        for alias in INDEX:
+            try:
+                mappings[alias] = await self.elastic.indices.get_mapping(index=alias)
+            except NotFoundError:
+                continue
+        drift = indices_drift(mappings)
+        if drift:
+            raise MappingMismatchError(drift)
+
+    async def bulk_insert(self, schema: Schemas, data: Iterable[Mapping],
+                          on_done: Optional[Callable[[], Awaitable]] = None):
+        """
+        Приводит данные к схеме и ставит их массовую вставку в работу, не дожидаясь ответа.
+
+        Если в работе уже concurrency запросов, метод ждет освобождения места.
+
+        :param schema: Схема, определяющая индекс и структуру данных для вставки.
+        :param data: Строки, содержащие документы для вставки.
+        :param on_done: Корутина, которая вызывается после успешной вставки.
+        """
+        if self._errors:
+            raise self._errors[0]
+        documents = build_documents(schema, data)
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._send(schema, documents, on_done))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def update_movie_persons(self, rows: List[Mapping], film_ids: List[str]) -> bool:
+        """
+        Обновляет имена людей во вложенных полях фильмов без пересборки документов фильмов.
+
+        :param rows: Строки таблицы person.
+        :param film_ids: Идентификаторы фильмов, связанных с людьми в PostgreSQL.
+        :return: True, если все фильмы обновлены; False, если фильмы нужно пересобрать целиком.
+        """
+        return await self._update_movies(movie_persons_update(rows, film_ids), len(film_ids))
+
+    async def update_movie_genres(self, rows: List[Mapping], film_ids: List[str]) -> bool:
+        """
+        Обновляет названия жанров в фильмах без пересборки документов фильмов.
+
+        :param rows: Строки таблицы genre.
+        :param film_ids: Идентификаторы фильмов, связанных с жанрами в PostgreSQL.
+        :return: True, если все фильмы обновлены; False, если фильмы нужно пересобрать целиком.
+        """
+        return await self._update_movies(movie_genres_update(rows, film_ids), len(film_ids))
+
+    @async_backoff(errors=(ConnectionError,))
+    async def _update_movies(self, body: Dict[str, Any], expected: int) -> bool:
+        """
+        Выполняет частичное обновление фильмов запросом update_by_query.
+
+        Фильмы, которые еще не содержат связь (новый человек или жанр фильма), запросом не находятся,
+        поэтому при расхождении количества найденных фильмов с ожидаемым фильмы пересобираются.
+
+        :param body: Тело запроса update_by_query.
+        :param expected: Количество связанных фильмов в PostgreSQL.
+        :return: True, если все фильмы обновлены.
+        """
+        try:
+            response = await self.elastic.update_by_query(
+                index=Movie._index,
+                body=body,
+                conflicts='proceed',
+                slices='auto',
+            )
+        except ConnectionError:
+            raise
+        except TransportError as error:
+            logger.error('Partial update of movies failed: {0}'.format(error))
+            return False
+        if response.get('failures'):
+            logger.error('Partial update of movies failed: {0}'.format(response['failures']))
+            return False
+        if response.get('version_conflicts'):
+            logger.warning('Partial update of movies skipped {0} documents on version conflicts.'.format(
+                response['version_conflicts'],
+            ))
+            return False
+        if response.get('total', 0) != expected:
+            logger.info('Partial update matched {0} of {1} movies, movies are rebuilt.'.format(
+                response.get('total', 0), expected,
+            ))
+            return False
+        return True
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Возвращает счетчики загруженных документов.
+
+        :return: Счетчики документов с момента создания загрузчика.
+        """
+        return dict(self.stats)
+
+    async def drain(self):
+        """
+        Дожидается завершения всех bulk-запросов.
+
+        :raises BaseException: Первая ошибка, возникшая при вставке.
+        """
+        while self._tasks:
+            await asyncio.gather(*self._tasks)
+        if self._errors:
+            raise self._errors[0]
+
+    async def _send(self, schema: Schemas, documents: List[Dict], on_done: Optional[Callable[[], Awaitable]]):
+        """
+        Выполняет вставку и вызывает on_done; ошибки сохраняются для drain.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param documents: Документы для вставки.
+        :param on_done: Корутина, которая вызывается после успешной вставки.
+        """
+        try:
+            with metrics.batch('load', schema._index) as batch:
+                dead = await self._bulk(schema, documents)
+                batch['rows'] = len(documents)
+            batching.LOAD.observe(batch['rows'], batch['seconds'])
+            self.stats['indexed'] += len(documents) - len(dead)
+            metrics.DOCUMENTS.labels(schema._index, 'indexed').inc(len(documents) - len(dead))
+            if dead:
+                self.stats['failed'] += len(dead)
+                metrics.DOCUMENTS.labels(schema._index, 'failed').inc(len(dead))
+            if on_done is not None:
+                await on_done()
+        except Exception as error:
+            self._errors.append(error)
+        finally:
+            self._semaphore.release()
+
+    @async_backoff(errors=(ConnectionError,))
+    async def _bulk(self, schema: Schemas, documents: List[Dict]) -> Set[str]:
+        """
+        Отправляет документы через async_streaming_bulk.
+
+        Документы, отклоненные с 429, helpers повторяет до max_retries раз с экспоненциальной
+        задержкой; остальные ошибки и исчерпавшие попытки документы записываются в dead-letter
+        файл, как в синхронном загрузчике. При потере соединения пакет повторяется целиком.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param documents: Документы для вставки.
+        :return: Идентификаторы документов, записанных в dead-letter файл.
+        """
+        by_id = {str(document['id']): document for document in documents}
+        actions = (
+            {
+                '_index': schema._index,
+                '_id': document_id,
+                '_source': encode(document),
+            } for document_id, document in by_id.items()
+        )
+        dead = set()
+        rejected = 0
+        results = helpers.async_streaming_bulk(
+            self.elastic,
+            actions,
+            chunk_size=batching.LOAD.size,
+            max_retries=self.max_retries,
+            initial_backoff=BULK_RETRY_DELAY,
+            max_backoff=BULK_RETRY_MAX_DELAY,
+            raise_on_error=False,
+        )
+        async for ok, result in results:
+            if ok:
+                continue
+            item = next(iter(result.values()))
+            document_id = str(item.get('_id'))
+            metrics.BULK_ERRORS.labels(schema._index, str(item.get('status'))).inc()
+            if item.get('status') == 429:
+                rejected += 1
+            write_dead_letter(self.dead_letter_file, schema, by_id[document_id], item)
+            dead.add(document_id)
+        if rejected:
+            batching.LOAD.pressure('{0} documents were rejected'.format(rejected))
+        return dead
@@ -0,0 +1,92 @@
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, Iterable
+
+from redis.asyncio import Redis
+from redis.exceptions import ConnectionError
+
+from core import batching, metrics
+from core.config import SADD_MEMBERS
+from core.decorators import async_backoff
+from services.documents import movie_template
+from services.transform import DataTransform
+
+
+@dataclass
+class AsyncDataTransform(DataTransform):
+    """Асинхронный вариант DataTransform поверх redis.asyncio с тем же буфером и контрактом батчера."""
+    redis: Redis
+
+    async def collector(self, key: str, film_work_id: str):  # type: ignore[override]
+        """
+        Собирает идентификатор произведения в буфер без повторов.
+
+        Буфер сбрасывается в Redis по тем же порогам размера и времени, что и в DataTransform.
+
+        :param key: Ключ, под которым будет храниться множество идентификаторов.
+        :param film_work_id: Идентификатор произведения для добавления.
+        """
+        buffer = self._buffer.setdefault(key, set())
+        buffer.add(str(film_work_id))
+        if len(buffer) >= self.flush_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+            await self.flush()
+
+    @async_backoff(errors=(ConnectionError,))
+    async def flush(self):  # type: ignore[override]
+        """
+        Сбрасывает буфер идентификаторов конвейером многоэлементных SADD в Redis или в память процесса.
+        """
+        if self.in_memory:
+            for key, buffer in self._buffer.items():
+                self._memory.setdefault(key, set()).update(buffer)
+        elif any(self._buffer.values()):
+            with metrics.batch('collect', 'redis') as batch:
+                async with self.redis.pipeline(transaction=False) as pipeline:
+                    for key, buffer in self._buffer.items():
+                        members = list(buffer)
+                        batch['rows'] += len(members)
+                        for start in range(0, len(members), SADD_MEMBERS):
+                            pipeline.sadd(key, *members[start:start + SADD_MEMBERS])
+                    await pipeline.execute()
+        self._buffer.clear()
+        self._flushed_at = time.monotonic()
+
+    async def batcher(  # type: ignore[override]
+        self, key: str, template: Callable[[], Dict[str, Any]] = movie_template,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Генерирует пакеты идентификаторов произведений из множества Redis или памяти процесса.
+
+        :param key: Ключ множества идентификаторов в Redis.
+        :param template: Функция, создающая пустой шаблон документа для идентификатора.
+        :return: Асинхронный итератор словарей с идентификаторами произведений и их свойствами.
+        """
+        await self.flush()
+        if self.in_memory:
+            for movies in self._memory_batcher(key, template):
+                yield movies
+            return
+        cursor = 0
+        while True:
+            with metrics.batch('queue', 'redis') as batch:
+                cursor, data = await self.redis.sscan(key, cursor=cursor, count=batching.MOVIES.size)
+                batch['rows'] = len(data)
+            if data:
+                yield {
+                    movie_id.decode(): template() for movie_id in data
+                }
+            if cursor == 0:
+                break
+
+    @async_backoff(errors=(ConnectionError,))
+    async def acknowledge(self, key: str, film_work_ids: Iterable[str]):  # type: ignore[override]
+        """
+        Удаляет из множества идентификаторы успешно загруженных произведений.
+
+        :param key: Ключ множества идентификаторов в Redis.
+        :param film_work_ids: Идентификаторы загруженных произведений.
+        """
+        if self.in_memory:
+            self._memory.get(key, set()).difference_update(film_work_ids)
+        else:
+            await self.redis.srem(key, *film_work_ids)
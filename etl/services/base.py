@@ -1,3 +1,11 @@
+from datetime import datetime
+from typing import Tuple
+
+MIN_UUID = '00000000-0000-0000-0000-000000000000'
+
+Watermark = Tuple[datetime, str]
+
+
 class Config(object):
     arbitrary_types_allowed = True
 
@@ -0,0 +1,110 @@
+import json
+import select
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Set
+
+from psycopg2 import InterfaceError, OperationalError, sql
+from psycopg2.extensions import connection
+
+from core.config import CHANGES_CHANNEL, COALESCE_WINDOW, POLL_MAX_INTERVAL, POLL_MIN_INTERVAL
+from core.logger import logger
+
+Changes = Dict[str, Set[str]]
+
+
+@dataclass
+class ChangeListener(object):
+    """
+    Получает уведомления триггеров content.notify_etl_change через LISTEN/NOTIFY.
+
+    Каждое уведомление содержит таблицу и идентификатор строки; изменения связующих таблиц
+    приходят как изменения film_work, а изменения person_film_work - еще и как изменения person
+    (прежнего и нового), чтобы пересобрать фильмографию и того, кого из фильма убрали.
+    Уведомления, пришедшие за окно coalesce_window после первого, объединяются в один пакет.
+
+    :param postgres: Отдельное соединение с PostgreSQL, которое используется только для LISTEN.
+    :param channel: Канал уведомлений.
+    :param coalesce_window: Окно объединения уведомлений в секундах.
+    """
+    postgres: connection
+    channel: str = CHANGES_CHANNEL
+    coalesce_window: float = COALESCE_WINDOW
+    active: bool = field(default=True, init=False)
+
+    def __post_init__(self):
+        self.postgres.autocommit = True
+        with self.postgres.cursor() as curs:
+            curs.execute(sql.SQL('LISTEN {channel};').format(channel=sql.Identifier(self.channel)))
+
+    def wait(self, timeout: float) -> Changes:
+        """
+        Ждет уведомлений не дольше timeout и собирает их в пакет.
+
+        Если соединение потеряно, слушатель выключается, а ETL продолжает работать опросом.
+
+        :param timeout: Максимальное время ожидания первого уведомления в секундах.
+        :return: Идентификаторы измененных строк по таблицам; пустой словарь, если уведомлений не было.
+        """
+        changes: Changes = {}
+        try:
+            if self._receive(timeout, changes):
+                deadline = time.monotonic() + self.coalesce_window
+                while (remaining := deadline - time.monotonic()) > 0 and self._receive(remaining, changes):
+                    pass
+        except (InterfaceError, OperationalError) as error:
+            logger.error('Change listener is stopped, falling back to polling: {0}'.format(error))
+            self.active = False
+        return changes
+
+    def _receive(self, timeout: float, changes: Changes) -> bool:
+        """
+        Ждет готовности соединения и добавляет полученные уведомления в пакет.
+
+        :param timeout: Максимальное время ожидания в секундах.
+        :param changes: Пакет изменений, который дополняется уведомлениями.
+        :return: True, если были получены уведомления.
+        """
+        if not self.postgres.notifies and not select.select([self.postgres], [], [], timeout)[0]:
+            return False
+        self.postgres.poll()
+        received = bool(self.postgres.notifies)
+        while self.postgres.notifies:
+            payload = json.loads(self.postgres.notifies.pop(0).payload)
+            changes.setdefault(payload['table'], set()).add(payload['id'])
+        return received
+
+
+@dataclass
+class AdaptivePoll(object):
+    """
+    Интервал опроса PostgreSQL, который растет при простое и сбрасывается при обновлениях.
+
+    :param min_interval: Интервал после первого прохода без обновлений.
+    :param max_interval: Предельный интервал опроса.
+    """
+    min_interval: float = POLL_MIN_INTERVAL
+    max_interval: float = POLL_MAX_INTERVAL
+    _interval: float = field(default=0, init=False, repr=False)
+
+    def __post_init__(self):
+        self._interval = self.min_interval
+
+    def busy(self) -> float:
+        """
+        Сбрасывает интервал: пока есть необработанные данные, опрос повторяется сразу.
+
+        :return: Задержка до следующего опроса.
+        """
+        self._interval = self.min_interval
+        return 0
+
+    def idle(self) -> float:
+        """
+        Возвращает текущий интервал и удваивает следующий, не превышая max_interval.
+
+        :return: Задержка до следующего опроса.
+        """
+        interval = self._interval
+        self._interval = min(self.max_interval, interval * 2)
+        return interval
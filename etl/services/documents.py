@@ -0,0 +1,272 @@
+import random
+from typing import Any, Callable, Dict, Iterable, List, Mapping
+
+import orjson
+
+from core import metrics
+from core.config import ETL_PAR, Schemas
+from core.logger import logger
+from models.models import Genre, Movie, Person
+
+MOVIE_TEMPLATE = Movie.properties()
+
+PERSON_ROLES = ('directors', 'actors', 'writers')
+
+
+MOVIE_PERSONS_SCRIPT = """
+    boolean changed = false;
+    for (String role : params.roles) {
+        List persons = ctx._source[role];
+        if (persons == null) {
+            continue;
+        }
+        List names = new ArrayList();
+        for (Map person : persons) {
+            String name = params.names[person['id']];
+            if (name != null && !name.equals(person['name'])) {
+                person['name'] = name;
+                changed = true;
+            }
+            names.add(person['name']);
+        }
+        ctx._source[role + '_names'] = names;
+    }
+    if (!changed) {
+        ctx.op = 'noop';
+    }
+"""
+
+MOVIE_GENRES_SCRIPT = """
+    boolean changed = false;
+    List genres = ctx._source.genres;
+    List names = new ArrayList();
+    if (genres != null) {
+        for (Map genre : genres) {
+            String name = params.names[genre['id']];
+            if (name != null && !name.equals(genre['name'])) {
+                genre['name'] = name;
+                changed = true;
+            }
+            names.add(genre['name']);
+        }
+    }
+    ctx._source.genres_names = names;
+    if (!changed) {
+        ctx.op = 'noop';
+    }
+"""
+
+
+def movie_template() -> Dict[str, Any]:
+    """
+    Возвращает пустой документ фильма из шаблона, построенного по схеме Movie один раз при импорте.
+
+    :return: Словарь полей фильма с начальными значениями.
+    """
+    return {field: value.copy() if isinstance(value, list) else value for field, value in MOVIE_TEMPLATE.items()}
+
+
+def build_genre(row: Mapping) -> Dict[str, Any]:
+    """
+    Строит документ жанра из строки PostgreSQL.
+
+    :param row: Строка таблицы genre.
+    :return: Документ индекса genres.
+    """
+    return {'id': str(row['id']), 'name': row['name'], 'description': row['description']}
+
+
+def build_person(row: Mapping) -> Dict[str, Any]:
+    """
+    Строит документ человека из агрегированной строки PostgreSQL.
+
+    :param row: Строка PERSON_DOCUMENTS_QUERY с фильмографией.
+    :return: Документ индекса persons.
+    """
+    return {
+        'id': str(row['id']),
+        'full_name': row['full_name'],
+        'films': [build_person_film(film) for film in row['films']],
+    }
+
+
+def build_person_film(film: Mapping) -> Dict[str, Any]:
+    """
+    Приводит фильм из фильмографии человека к виду документа.
+
+    :param film: Словарь из json_agg с идентификатором, названием, рейтингом и ролями.
+    :return: Фильм фильмографии.
+    """
+    rating = film['imdb_rating']
+    return {
+        'id': str(film['id']),
+        'title': film['title'],
+        'imdb_rating': None if rating is None else float(rating),
+        'roles': list(film['roles']),
+    }
+
+
+def build_movie(row: Mapping) -> Dict[str, Any]:
+    """
+    Строит документ фильма из агрегированной строки или из словаря, собранного DataTransform.parser.
+
+    :param row: Строка с полями модели Movie.
+    :return: Документ индекса movies.
+    """
+    rating = row['imdb_rating']
+    document = {
+        'id': str(row['id']),
+        'imdb_rating': None if rating is None else float(rating),
+        'genres': [build_movie_genre(genre) for genre in row['genres']],
+        'genres_names': list(row['genres_names']),
+        'title': row['title'],
+        'description': row['description'],
+    }
+    for role in PERSON_ROLES:
+        document['{0}_names'.format(role)] = list(row['{0}_names'.format(role)])
+        document[role] = [build_movie_person(person) for person in row[role]]
+    return document
+
+
+def build_movie_genre(genre: Mapping) -> Dict[str, str]:
+    """
+    Приводит жанр фильма к виду {'id', 'name'}.
+
+    :param genre: Словарь из DataTransform.add_genre или из json_agg.
+    :return: Словарь с идентификатором и названием жанра.
+    """
+    return {'id': str(genre['id']), 'name': genre['name']}
+
+
+def build_movie_person(person: Any) -> Dict[str, str]:
+    """
+    Приводит участника фильма к виду {'id', 'name'}.
+
+    :param person: Объект Person из DataTransform.parser или словарь из json_agg.
+    :return: Словарь с идентификатором и именем человека.
+    """
+    if isinstance(person, Person):
+        return {'id': str(person.id), 'name': person.full_name}
+    return {'id': str(person['id']), 'name': person['name']}
+
+
+BUILDERS: Dict[Any, Callable[[Mapping], Dict[str, Any]]] = {
+    Genre: build_genre,
+    Person: build_person,
+    Movie: build_movie,
+}
+
+
+def build_documents(schema: Schemas, rows: Iterable[Mapping],
+                    sample_rate: float = ETL_PAR.validate_sample_rate) -> List[Dict[str, Any]]:
+    """
+    Строит документы индекса без создания моделей pydantic.
+
+    Доля sample_rate документов дополнительно сверяется с результатом модели схемы.
+
+    :param schema: Схема, определяющая индекс документов.
+    :param rows: Строки PostgreSQL или словари фильмов.
+    :param sample_rate: Доля документов для проверки моделью (0 - без проверки).
+    :return: Документы для загрузки в Elasticsearch.
+    """
+    build = BUILDERS[schema]
+    documents = []
+    with metrics.batch('transform', schema._index) as batch:
+        for row in rows:
+            document = build(row)
+            if sample_rate and random.random() < sample_rate:
+                validate(schema, row, document)
+            documents.append(document)
+        batch['rows'] = len(documents)
+    return documents
+
+
+def validate(schema: Schemas, row: Mapping, document: Dict[str, Any]):
+    """
+    Сверяет документ с результатом модели схемы и логирует расхождение.
+
+    :param schema: Схема, определяющая структуру документа.
+    :param row: Исходная строка.
+    :param document: Построенный документ.
+    """
+    expected = orjson.loads(encode(schema(**dict(row)).dict()))
+    if orjson.loads(encode(document)) != expected:
+        logger.error('Document {0} differs from {1} model: {2} != {3}'.format(
+            document['id'], schema.__name__, document, expected,
+        ))
+
+
+def encode(document: Dict[str, Any]) -> str:
+    """
+    Сериализует документ в JSON для тела bulk-запроса.
+
+    Клиент Elasticsearch передает строки в тело запроса без повторной сериализации.
+
+    :param document: Документ индекса.
+    :return: JSON-строка документа.
+    """
+    return orjson.dumps(document).decode()
+
+
+def movie_persons_update(rows: Iterable[Mapping], film_ids: List[str]) -> Dict[str, Any]:
+    """
+    Формирует тело update_by_query, которое меняет имена людей во вложенных полях фильмов.
+
+    Обновляются только связанные с людьми фильмы, где эти люди уже встречаются, и только их имена
+    и массивы *_names.
+
+    :param rows: Строки таблицы person.
+    :param film_ids: Идентификаторы фильмов, связанных с людьми в PostgreSQL.
+    :return: Тело запроса update_by_query к индексу фильмов.
+    """
+    names = {str(row['id']): row['full_name'] for row in rows}
+    return {
+        'query': {
+            'bool': {
+                'filter': [{'terms': {'id': film_ids}}],
+                'should': [
+                    {
+                        'nested': {
+                            'path': role,
+                            'query': {'terms': {'{0}.id'.format(role): list(names)}},
+                        },
+                    } for role in PERSON_ROLES
+                ],
+                'minimum_should_match': 1,
+            },
+        },
+        'script': {
+            'source': MOVIE_PERSONS_SCRIPT,
+            'lang': 'painless',
+            'params': {'roles': list(PERSON_ROLES), 'names': names},
+        },
+    }
+
+
+def movie_genres_update(rows: Iterable[Mapping], film_ids: List[str]) -> Dict[str, Any]:
+    """
+    Формирует тело update_by_query, которое меняет названия жанров в фильмах.
+
+    Обновляются только связанные с жанрами фильмы, где эти жанры уже есть; если название не изменилось,
+    документ не переписывается.
+
+    :param rows: Строки таблицы genre.
+    :param film_ids: Идентификаторы фильмов, связанных с жанрами в PostgreSQL.
+    :return: Тело запроса update_by_query к индексу фильмов.
+    """
+    names = {str(row['id']): row['name'] for row in rows}
+    return {
+        'query': {
+            'bool': {
+                'filter': [
+                    {'terms': {'id': film_ids}},
+                    {'terms': {'genres.id': list(names)}},
+                ],
+            },
+        },
+        'script': {
+            'source': MOVIE_GENRES_SCRIPT,
+            'lang': 'painless',
+            'params': {'names': names},
+        },
+    }
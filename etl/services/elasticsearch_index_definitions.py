@@ -31,7 +31,15 @@ INDEX = {
     'movies': {
         "id": {"type": "keyword"},
         "imdb_rating": {"type": "float"},
-        "genres": {"type": "keyword"},
+        "genres": {
+            "type": "object",
+            "dynamic": "strict",
+            "properties": {
+                "id": {"type": "keyword"},
+                "name": {"type": "keyword"},
+            },
+        },
+        "genres_names": {"type": "keyword"},
         "title": {
             "type": "text",
             "analyzer": "ru_en",
@@ -73,6 +81,16 @@ INDEX = {
             'analyzer': 'ru_en',
             'fields': {'raw': {'type': 'keyword'}}
         },
+        'films': {
+            'type': 'object',
+            'dynamic': 'strict',
+            'properties': {
+                'id': {'type': 'keyword'},
+                'title': {'type': 'text', 'analyzer': 'ru_en'},
+                'imdb_rating': {'type': 'float'},
+                'roles': {'type': 'keyword'},
+            },
+        },
     },
     'genres': {
         'id': {'type': 'keyword'},
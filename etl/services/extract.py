@@ -1,56 +1,179 @@
-from datetime import datetime
-from typing import Iterator, List, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
-from psycopg2 import InterfaceError, OperationalError
-from psycopg2.extensions import connection, cursor
+from psycopg2 import InterfaceError, OperationalError, sql
+from psycopg2.extensions import connection
 from psycopg2.extras import DictRow
 from pydantic.dataclasses import dataclass
 
-from core.config import BATCH_SIZE
+from core import batching, metrics
 from core.decorators import backoff
-from services.base import Config, UpdatesNotFoundError
+from services.base import Config, UpdatesNotFoundError, Watermark
+
+MOVIE_DOCUMENTS_SELECT = """
+    SELECT
+        fw.id,
+        fw.title,
+        fw.description,
+        fw.rating AS imdb_rating,
+        COALESCE(g.genres, '[]') AS genres,
+        COALESCE(g.genres_names, '{}') AS genres_names,
+        COALESCE(p.directors, '[]') AS directors,
+        COALESCE(p.directors_names, '{}') AS directors_names,
+        COALESCE(p.actors, '[]') AS actors,
+        COALESCE(p.actors_names, '{}') AS actors_names,
+        COALESCE(p.writers, '[]') AS writers,
+        COALESCE(p.writers_names, '{}') AS writers_names
+    FROM film_work fw
+    LEFT JOIN LATERAL (
+        SELECT
+            json_agg(json_build_object('id', g.id, 'name', g.name) ORDER BY g.name) AS genres,
+            array_agg(g.name ORDER BY g.name) AS genres_names
+        FROM genre_film_work gfw
+        JOIN genre g ON g.id = gfw.genre_id
+        WHERE gfw.film_work_id = fw.id
+    ) g ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT
+            json_agg(json_build_object('id', p.id, 'name', p.full_name))
+                FILTER (WHERE pfw.role = 'director') AS directors,
+            array_agg(p.full_name) FILTER (WHERE pfw.role = 'director') AS directors_names,
+            json_agg(json_build_object('id', p.id, 'name', p.full_name))
+                FILTER (WHERE pfw.role = 'actor') AS actors,
+            array_agg(p.full_name) FILTER (WHERE pfw.role = 'actor') AS actors_names,
+            json_agg(json_build_object('id', p.id, 'name', p.full_name))
+                FILTER (WHERE pfw.role = 'writer') AS writers,
+            array_agg(p.full_name) FILTER (WHERE pfw.role = 'writer') AS writers_names
+        FROM person_film_work pfw
+        JOIN person p ON p.id = pfw.person_id
+        WHERE pfw.film_work_id = fw.id
+    ) p ON TRUE
+"""
+
+MOVIE_DOCUMENTS_QUERY = MOVIE_DOCUMENTS_SELECT + """    WHERE fw.id = ANY(%(film_ids)s::uuid[]);
+"""
+
+PERSON_DOCUMENTS_SELECT = """
+    SELECT
+        p.id,
+        p.full_name,
+        COALESCE(f.films, '[]') AS films
+    FROM person p
+    LEFT JOIN LATERAL (
+        SELECT json_agg(
+            json_build_object('id', fw.id, 'title', fw.title, 'imdb_rating', fw.rating, 'roles', pf.roles)
+            ORDER BY fw.id
+        ) AS films
+        FROM (
+            SELECT pfw.film_work_id, array_agg(DISTINCT pfw.role ORDER BY pfw.role) AS roles
+            FROM person_film_work pfw
+            WHERE pfw.person_id = p.id
+            GROUP BY pfw.film_work_id
+        ) pf
+        JOIN film_work fw ON fw.id = pf.film_work_id
+    ) f ON TRUE
+"""
+
+PERSON_DOCUMENTS_QUERY = PERSON_DOCUMENTS_SELECT + """    WHERE p.id = ANY(%(person_ids)s::uuid[]);
+"""
+
+FILM_PERSON_IDS_QUERY = """
+    SELECT DISTINCT pfw.person_id AS id
+    FROM person_film_work pfw
+    WHERE pfw.film_work_id = ANY(%(film_ids)s::uuid[]);
+"""
 
 
 @dataclass(config=Config)
 class PostgresExtractor(object):
     postgres: connection
     TABLES = ('film_work', 'person', 'genre')
+    COLUMNS = {
+        'film_work': ('id', 'modified'),
+        'person': ('id', 'full_name', 'modified'),
+        'genre': ('id', 'name', 'description', 'modified'),
+    }
 
     @backoff(errors=(InterfaceError, OperationalError))
-    def select_table(self, table: str, timestamp: datetime) -> cursor:
+    def select_page(self, table: str, watermark: Watermark, limit: Optional[int] = None) -> List[DictRow]:
         """
-        Выбирает данные из указанной таблицы, измененные после заданной метки времени.
+        Выбирает одну страницу строк таблицы, следующих за водяным знаком (keyset-пагинация).
 
         :param table: Название таблицы для выборки данных.
-        :param timestamp: Время, после которого данные будут выбраны.
-        :return: Курсор с результатами выборки.
+        :param watermark: Пара (modified, id) последней уже обработанной строки.
+        :param limit: Максимальное количество строк на странице; по умолчанию размер пакета выборки batching.EXTRACT.
+        :return: Список строк, отсортированных по (modified, id).
         """
-        curs = self.postgres.cursor()
-        query = """
-            SELECT *
+        controller = batching.EXTRACT if limit is None else None
+        limit = limit or batching.EXTRACT.size
+        query = sql.SQL("""
+            SELECT {columns}
             FROM {table}
-            WHERE modified > TIMESTAMP '{timestamp}'
-            ORDER BY modified;
-        """
-        curs.execute(query.format(table=table, timestamp=timestamp))
-        return curs
+            WHERE (modified, id) > (%s, %s::uuid)
+            ORDER BY modified, id
+            LIMIT %s;
+        """).format(
+            columns=sql.SQL(', ').join(map(sql.Identifier, self.COLUMNS[table])),
+            table=sql.Identifier(table),
+        )
+        with metrics.batch('extract', table) as batch, self.postgres.cursor() as curs:
+            curs.execute(query, (*watermark, limit))
+            rows = curs.fetchall()
+            batch['rows'] = len(rows)
+        if controller is not None:
+            controller.observe(batch['rows'], batch['seconds'])
+        return rows
 
     @backoff(errors=(InterfaceError, OperationalError))
-    def get_updates(self, timestamp: datetime) -> Iterator[Tuple[str, List]]:
+    def select_rows(self, table: str, ids: Iterable[str]) -> List[DictRow]:
+        """
+        Выбирает строки таблицы по идентификаторам.
+
+        :param table: Название таблицы для выборки данных.
+        :param ids: Идентификаторы строк.
+        :return: Список найденных строк; удаленные строки в него не попадают.
+        """
+        query = sql.SQL("""
+            SELECT {columns}
+            FROM {table}
+            WHERE id = ANY(%s::uuid[])
+            ORDER BY modified, id;
+        """).format(
+            columns=sql.SQL(', ').join(map(sql.Identifier, self.COLUMNS[table])),
+            table=sql.Identifier(table),
+        )
+        with self.postgres.cursor() as curs:
+            curs.execute(query, (list(ids),))
+            return curs.fetchall()
+
+    def select_table(self, table: str, watermark: Watermark) -> Iterator[List[DictRow]]:
+        """
+        Постранично выбирает данные из указанной таблицы, следующие за водяным знаком.
+
+        В памяти одновременно находится не больше одной страницы, независимо от размера дельты.
+
+        :param table: Название таблицы для выборки данных.
+        :param watermark: Пара (modified, id), после которой данные будут выбраны.
+        :yield: Страницы строк размером не больше текущего размера пакета выборки.
+        """
+        while rows := self.select_page(table, watermark):
+            yield rows
+            watermark = (rows[-1]['modified'], str(rows[-1]['id']))
+
+    def get_updates(self, watermarks: Dict[str, Watermark]) -> Iterator[Tuple[str, List]]:
         """
-        Получает обновления из всех таблиц после заданной метки времени.
+        Получает обновления из всех таблиц после их водяных знаков.
 
-        :param timestamp: Время, после которого будут выбраны обновления.
+        :param watermarks: Водяные знаки (modified, id) для каждой таблицы.
         :yield: Кортеж, содержащий название таблицы и данные обновлений.
         :raises UpdatesNotFoundError: Если обновления не найдены.
         """
-        updates = {table: self.select_table(table, timestamp) for table in self.TABLES}
-        if not any(curs.rowcount for curs in updates.values()):
+        found = False
+        for table in self.TABLES:
+            for rows in self.select_table(table, watermarks[table]):
+                found = True
+                yield (table, rows)
+        if not found:
             raise UpdatesNotFoundError
-        for table, curs in updates.items():
-            while data := curs.fetchmany(BATCH_SIZE):
-                yield (table, data)
-            curs.close()
 
     @backoff(errors=(InterfaceError, OperationalError))
     def get_film_work_ids(self, table: str, data: List[DictRow]) -> Iterator[DictRow]:
@@ -95,6 +218,7 @@ class PostgresExtractor(object):
                     pfw.role,
                     p.id as person_id,
                     p.full_name,
+                    g.id as genre_id,
                     g.name as genre_name
                 FROM film_work fw
                 LEFT JOIN person_film_work pfw ON pfw.film_work_id = fw.id
@@ -105,3 +229,47 @@ class PostgresExtractor(object):
             """
             curs.execute(query.format(film_ids=', '.join(film_ids)))
             yield from curs
+
+    @backoff(errors=(InterfaceError, OperationalError))
+    def get_movie_documents(self, film_ids: Iterable[str]) -> List[DictRow]:
+        """
+        Получает агрегированные данные фильмов: одна строка на фильм.
+
+        Персоны и жанры агрегируются в PostgreSQL по ролям, поэтому строка содержит готовые
+        поля модели Movie и не требует дедупликации на стороне ETL.
+
+        :param film_ids: Идентификаторы фильмов для выборки данных.
+        :return: Строки с полями модели Movie.
+        """
+        with metrics.batch('extract', 'movie_documents') as batch, self.postgres.cursor() as curs:
+            curs.execute(MOVIE_DOCUMENTS_QUERY, {'film_ids': list(film_ids)})
+            rows = curs.fetchall()
+            batch['rows'] = len(rows)
+        batching.MOVIES.observe(batch['rows'], batch['seconds'])
+        return rows
+
+    @backoff(errors=(InterfaceError, OperationalError))
+    def get_person_documents(self, person_ids: Iterable[str]) -> List[DictRow]:
+        """
+        Получает людей с фильмографией: одна строка на человека, фильмы с ролями агрегированы в PostgreSQL.
+
+        :param person_ids: Идентификаторы людей.
+        :return: Строки с полями модели Person.
+        """
+        with metrics.batch('extract', 'person_documents') as batch, self.postgres.cursor() as curs:
+            curs.execute(PERSON_DOCUMENTS_QUERY, {'person_ids': list(person_ids)})
+            rows = curs.fetchall()
+            batch['rows'] = len(rows)
+        return rows
+
+    @backoff(errors=(InterfaceError, OperationalError))
+    def get_film_person_ids(self, film_ids: Iterable[str]) -> List[str]:
+        """
+        Получает идентификаторы людей, участвующих в фильмах, чтобы обновить их фильмографии.
+
+        :param film_ids: Идентификаторы фильмов.
+        :return: Идентификаторы людей.
+        """
+        with self.postgres.cursor() as curs:
+            curs.execute(FILM_PERSON_IDS_QUERY, {'film_ids': [str(film_id) for film_id in film_ids]})
+            return [str(row['id']) for row in curs]
@@ -0,0 +1,156 @@
+import dbm
+import hashlib
+import threading
+from abc import abstractmethod
+from typing import Dict, List, Optional, Sequence
+
+from pydantic.dataclasses import dataclass
+from redis import Redis
+from redis.exceptions import ConnectionError
+
+from core.decorators import backoff
+from services.base import Config
+
+
+def content_hash(source: str) -> str:
+    """
+    Вычисляет хеш сериализованного документа.
+
+    :param source: JSON-строка документа.
+    :return: Шестнадцатеричный хеш содержимого.
+    """
+    return hashlib.blake2b(source.encode(), digest_size=16).hexdigest()
+
+
+@dataclass(config=Config)
+class BaseHashStore(object):
+    @abstractmethod
+    def get_many(self, index: str, ids: Sequence[str]) -> List[Optional[str]]:
+        """
+        Возвращает хеши последних загруженных версий документов.
+
+        :param index: Индекс документов.
+        :param ids: Идентификаторы документов.
+        :return: Хеши в порядке идентификаторов; None для документов, которые еще не загружались.
+        """
+        ...
+
+    @abstractmethod
+    def set_many(self, index: str, hashes: Dict[str, str]) -> None:
+        """
+        Сохраняет хеши загруженных документов.
+
+        :param index: Индекс документов.
+        :param hashes: Хеши по идентификаторам документов.
+        """
+        ...
+
+    @abstractmethod
+    def delete_many(self, index: str, ids: Sequence[str]) -> None:
+        """
+        Удаляет хеши документов, чтобы следующая версия документа была загружена.
+
+        :param index: Индекс документов.
+        :param ids: Идентификаторы документов.
+        """
+        ...
+
+
+@dataclass(config=Config)
+class RedisHashStore(BaseHashStore):
+    redis: Redis
+    key: str = 'etl_hashes'
+
+    @backoff(errors=(ConnectionError,))
+    def get_many(self, index: str, ids: Sequence[str]) -> List[Optional[str]]:
+        """
+        Возвращает хеши документов из хеша Redis индекса.
+
+        :param index: Индекс документов.
+        :param ids: Идентификаторы документов.
+        :return: Хеши в порядке идентификаторов; None для документов, которые еще не загружались.
+        """
+        if not ids:
+            return []
+        return [value.decode() if value else None for value in self.redis.hmget(self._key(index), ids)]
+
+    @backoff(errors=(ConnectionError,))
+    def set_many(self, index: str, hashes: Dict[str, str]) -> None:
+        """
+        Сохраняет хеши документов в хеш Redis индекса.
+
+        :param index: Индекс документов.
+        :param hashes: Хеши по идентификаторам документов.
+        """
+        if hashes:
+            self.redis.hset(self._key(index), mapping=hashes)
+
+    @backoff(errors=(ConnectionError,))
+    def delete_many(self, index: str, ids: Sequence[str]) -> None:
+        """
+        Удаляет хеши документов из хеша Redis индекса.
+
+        :param index: Индекс документов.
+        :param ids: Идентификаторы документов.
+        """
+        if ids:
+            self.redis.hdel(self._key(index), *ids)
+
+    def _key(self, index: str) -> str:
+        return '{0}:{1}'.format(self.key, index)
+
+
+@dataclass(config=Config)
+class DbmHashStore(BaseHashStore):
+    file_path: str
+
+    def __post_init__(self):
+        """
+        Открывает файл хешей, создавая его при необходимости.
+        """
+        self._db = dbm.open(self.file_path, 'c')
+        self._lock = threading.Lock()
+
+    def get_many(self, index: str, ids: Sequence[str]) -> List[Optional[str]]:
+        """
+        Возвращает хеши документов из файла.
+
+        :param index: Индекс документов.
+        :param ids: Идентификаторы документов.
+        :return: Хеши в порядке идентификаторов; None для документов, которые еще не загружались.
+        """
+        with self._lock:
+            values = [self._db.get(self._key(index, document_id)) for document_id in ids]
+        return [value.decode() if value else None for value in values]
+
+    def set_many(self, index: str, hashes: Dict[str, str]) -> None:
+        """
+        Сохраняет хеши документов в файл.
+
+        :param index: Индекс документов.
+        :param hashes: Хеши по идентификаторам документов.
+        """
+        with self._lock:
+            for document_id, value in hashes.items():
+                self._db[self._key(index, document_id)] = value
+            if hasattr(self._db, 'sync'):
+                self._db.sync()
+
+    def delete_many(self, index: str, ids: Sequence[str]) -> None:
+        """
+        Удаляет хеши документов из файла.
+
+        :param index: Индекс документов.
+        :param ids: Идентификаторы документов.
+        """
+        with self._lock:
+            for document_id in ids:
+                key = self._key(index, document_id)
+                if key in self._db:
+                    del self._db[key]
+            if hasattr(self._db, 'sync'):
+                self._db.sync()
+
+    @staticmethod
+    def _key(index: str, document_id: str) -> str:
+        return '{0}:{1}'.format(index, document_id)
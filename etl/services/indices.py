@@ -0,0 +1,246 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Sequence
+
+from elasticsearch import Elasticsearch
+from elasticsearch.exceptions import ConnectionError, NotFoundError
+
+from core.config import FORCEMERGE_TIMEOUT
+from core.decorators import backoff
+from core.logger import logger
+from services.elasticsearch_index_definitions import INDEX, SETTINGS
+
+DEFAULT_REPLICAS = 1
+
+
+class MappingMismatchError(Exception):
+    """
+    Маппинг существующего индекса отстал от INDEX: индекс нужно перестроить reindex.py или snapshot.py.
+
+    :param drift: Поля, которых нет в индексе или у которых другой тип, по индексам.
+    """
+
+    def __init__(self, drift: Dict[str, List[str]]):
+        self.drift = drift
+        super().__init__('Mappings are out of date ({0}); run reindex.py or snapshot.py first.'.format(
+            '; '.join('{0}: {1}'.format(index, ', '.join(fields)) for index, fields in drift.items())
+        ))
+
+
+def versioned_name(alias: str) -> str:
+    """
+    Формирует имя версии индекса для псевдонима.
+
+    :param alias: Псевдоним, через который индекс читают API и ETL.
+    :return: Имя индекса с отметкой времени создания.
+    """
+    return '{0}_{1}'.format(alias, datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f'))
+
+
+def index_body(alias: str, **settings: Any) -> Dict[str, Any]:
+    """
+    Формирует тело запроса создания индекса.
+
+    :param alias: Псевдоним, для которого создается индекс.
+    :param settings: Настройки, которые заменяют значения из SETTINGS.
+    :return: Настройки и маппинг индекса.
+    """
+    return {
+        'settings': {**SETTINGS, **settings},
+        'mappings': {
+            'dynamic': 'strict',
+            'properties': INDEX[alias],
+        },
+    }
+
+
+def mapping_drift(expected: Dict[str, Any], current: Dict[str, Any], prefix: str = '') -> List[str]:
+    """
+    Находит поля маппинга, которых нет в индексе или у которых другой тип.
+
+    :param expected: Свойства маппинга из INDEX.
+    :param current: Свойства маппинга существующего индекса.
+    :param prefix: Путь к вложенным свойствам.
+    :return: Пути отличающихся полей.
+    """
+    drift = []
+    for name, definition in expected.items():
+        path = prefix + name
+        current_field = current.get(name)
+        if current_field is None or current_field.get('type', 'object') != definition.get('type', 'object'):
+            drift.append(path)
+        elif 'properties' in definition:
+            drift.extend(mapping_drift(definition['properties'], current_field.get('properties', {}), path + '.'))
+    return drift
+
+
+def indices_drift(mappings: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+    """
+    Сравнивает маппинги существующих индексов с INDEX.
+
+    :param mappings: Ответы get_mapping по псевдонимам.
+    :return: Отличающиеся поля по индексам; пустой словарь, если маппинги совпадают.
+    """
+    drift = {}
+    for alias, response in mappings.items():
+        for index, body in response.items():
+            fields = mapping_drift(INDEX[alias], body['mappings'].get('properties', {}))
+            if fields:
+                drift[index] = fields
+    return drift
+
+
+@backoff(errors=(ConnectionError,))
+def check_mappings(elastic: Elasticsearch):
+    """
+    Проверяет, что маппинги существующих индексов совпадают с INDEX.
+
+    Маппинги строгие, поэтому документ с полем, которого нет в индексе, Elasticsearch отклоняет:
+    инкрементальная загрузка в такой индекс отправила бы документы в файл недоставленных.
+
+    :param elastic: Клиент Elasticsearch.
+    :raises MappingMismatchError: Если индекс нужно перестроить reindex.py или snapshot.py.
+    """
+    mappings = {}
+    for alias in INDEX:
+        try:
+            mappings[alias] = elastic.indices.get_mapping(index=alias)
+        except NotFoundError:
+            continue
+    drift = indices_drift(mappings)
+    if drift:
+        raise MappingMismatchError(drift)
+
+
+@backoff(errors=(ConnectionError,))
+def create_indices(elastic: Elasticsearch):
+    """
+    Создает версию индекса с псевдонимом для каждого индекса, у которого нет ни псевдонима, ни индекса с тем же именем.
+
+    Индексы, созданные до появления псевдонимов, продолжают работать под своим именем до первой переиндексации.
+
+    :param elastic: Клиент Elasticsearch.
+    """
+    for alias in INDEX:
+        if not elastic.indices.exists(index=alias):
+            body = index_body(alias)
+            body['aliases'] = {alias: {}}
+            elastic.indices.create(index=versioned_name(alias), body=body)
+
+
+@dataclass
+class Reindexer(object):
+    """
+    Полная переиндексация в новые версии индексов с атомарным переключением псевдонимов.
+
+    Пока новые индексы заполняются, API читает старые через псевдонимы.
+
+    :param elastic: Клиент Elasticsearch.
+    :param aliases: Псевдонимы, которые нужно перестроить.
+    """
+    elastic: Elasticsearch
+    aliases: Sequence[str] = tuple(INDEX)
+    targets: Dict[str, str] = field(default_factory=dict, init=False)
+
+    @backoff(errors=(ConnectionError,))
+    def create(self) -> Dict[str, str]:
+        """
+        Создает новые версии индексов без обновления поиска и без реплик для быстрой загрузки.
+
+        :return: Соответствие псевдонимов и новых индексов.
+        """
+        for alias in self.aliases:
+            if alias not in self.targets:
+                index = versioned_name(alias)
+                self.elastic.indices.create(
+                    index=index, body=index_body(alias, refresh_interval='-1', number_of_replicas=0),
+                )
+                self.targets[alias] = index
+                logger.info('Index {0} is created for {1}.'.format(index, alias))
+        return self.targets
+
+    def publish(self):
+        """
+        Возвращает рабочие настройки новым индексам, объединяет сегменты и переключает на них псевдонимы.
+
+        Старые версии индексов удаляются после переключения.
+        """
+        for alias, index in self.targets.items():
+            self._finalize(alias, index)
+        for index in self._switch():
+            self.elastic.indices.delete(index=index, ignore_unavailable=True)
+
+    @backoff(errors=(ConnectionError,))
+    def _finalize(self, alias: str, index: str):
+        """
+        Возвращает индексу обновление поиска и реплики текущего индекса псевдонима и объединяет сегменты.
+
+        :param alias: Псевдоним индекса.
+        :param index: Новая версия индекса.
+        """
+        self.elastic.indices.put_settings(index=index, body={
+            'index': {
+                'refresh_interval': SETTINGS['refresh_interval'],
+                'number_of_replicas': self._replicas(alias),
+            },
+        })
+        self.elastic.indices.refresh(index=index)
+        self.elastic.indices.forcemerge(index=index, max_num_segments=1, request_timeout=FORCEMERGE_TIMEOUT)
+
+    @backoff(errors=(ConnectionError,))
+    def _switch(self) -> List[str]:
+        """
+        Переключает все псевдонимы одним запросом update_aliases.
+
+        Индекс, созданный до появления псевдонимов под именем псевдонима, удаляется в том же запросе.
+
+        :return: Предыдущие версии индексов, которые больше не входят в псевдонимы.
+        """
+        actions: List[Dict[str, Any]] = []
+        previous: List[str] = []
+        for alias, index in self.targets.items():
+            current = [name for name in self._current(alias) if name != index]
+            if self.elastic.indices.exists_alias(name=alias):
+                actions.extend({'remove': {'index': name, 'alias': alias}} for name in current)
+                previous.extend(current)
+            elif current:
+                actions.append({'remove_index': {'index': alias}})
+            actions.append({'add': {'index': index, 'alias': alias}})
+        self.elastic.indices.update_aliases(body={'actions': actions})
+        logger.info('Aliases are switched: {0}.'.format(self.targets))
+        return previous
+
+    def abort(self):
+        """
+        Удаляет созданные, но не опубликованные версии индексов.
+        """
+        for index in self.targets.values():
+            self.elastic.indices.delete(index=index, ignore_unavailable=True)
+        self.targets.clear()
+
+    def _current(self, alias: str) -> List[str]:
+        """
+        Возвращает индексы, которые сейчас читаются по имени псевдонима.
+
+        :param alias: Псевдоним индекса.
+        :return: Имена индексов; пустой список, если ни псевдонима, ни индекса нет.
+        """
+        try:
+            return list(self.elastic.indices.get(index=alias))
+        except NotFoundError:
+            return []
+
+    def _replicas(self, alias: str) -> int:
+        """
+        Возвращает количество реплик текущего индекса псевдонима.
+
+        :param alias: Псевдоним индекса.
+        :return: Количество реплик или DEFAULT_REPLICAS, если индекса еще нет.
+        """
+        try:
+            settings = self.elastic.indices.get_settings(index=alias, name='index.number_of_replicas')
+        except NotFoundError:
+            return DEFAULT_REPLICAS
+        for index_settings in settings.values():
+            return int(index_settings['settings']['index']['number_of_replicas'])
+        return DEFAULT_REPLICAS
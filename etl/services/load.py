@@ -1,35 +1,78 @@
-from dataclasses import dataclass
-from typing import Dict, List, Union, ValuesView
+import json
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union, ValuesView
 
 from elasticsearch import Elasticsearch, helpers
-from elasticsearch.exceptions import ConnectionError
+from elasticsearch.exceptions import ConnectionError, NotFoundError, TransportError
 
-from core.config import BATCH_SIZE, PostgresRow, Schemas
+from core import batching, metrics
+from core.config import (
+    BULK_CONCURRENCY,
+    BULK_MAX_CHUNK_BYTES,
+    BULK_MAX_RETRIES,
+    BULK_RETRY_DELAY,
+    BULK_RETRY_MAX_DELAY,
+    DEAD_LETTER_FILE,
+    PostgresRow,
+    Schemas,
+)
 from core.decorators import backoff
-from services.elasticsearch_index_definitions import SETTINGS, INDEX
+from core.logger import logger
+from models.models import Movie
+from services.documents import build_documents, encode, movie_genres_update, movie_persons_update
+from services.hashes import BaseHashStore, content_hash
+from services.indices import create_indices
+
+
+RETRY_STATUSES = frozenset((429, 502, 503, 504))
+
+
+def write_dead_letter(dead_letter_file: str, schema: Schemas, document: Dict, item: Dict):
+    """
+    Записывает документ, который не удалось проиндексировать, в dead-letter файл.
+
+    :param dead_letter_file: Путь к dead-letter файлу.
+    :param schema: Схема, определяющая индекс документа.
+    :param document: Документ, который не удалось проиндексировать.
+    :param item: Результат bulk-операции для документа.
+    """
+    logger.error('Document {0} was not indexed: {1}'.format(document['id'], item.get('error')))
+    record = {
+        'index': schema._index,
+        'id': document['id'],
+        'status': item.get('status'),
+        'error': item.get('error'),
+        'document': document,
+    }
+    with open(dead_letter_file, 'a') as file:
+        file.write(json.dumps(record, default=str) + '\n')
 
 
 @dataclass
 class ElasticLoader(object):
     elastic: Elasticsearch
+    parallel: bool = True
+    thread_count: int = BULK_CONCURRENCY
+    max_chunk_bytes: int = BULK_MAX_CHUNK_BYTES
+    max_retries: int = BULK_MAX_RETRIES
+    dead_letter_file: str = DEAD_LETTER_FILE
+    indices: Dict[str, str] = field(default_factory=dict)
+    hashes: Optional[BaseHashStore] = None
+    stats: Counter = field(default_factory=Counter, init=False)
+    _dead_letter_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _stats_lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+    _hash_indices: Dict[str, str] = field(default_factory=dict, init=False, repr=False)
 
-    @backoff(errors=(ConnectionError,))
     def __post_init__(self):
         """
         Инициализирует ElasticLoader, создавая индексы в Elasticsearch, если они еще не существуют.
         """
-        for index, properties in INDEX.items():
-            if not self.elastic.indices.exists(index=index):
-                body = {
-                    'settings': SETTINGS,
-                    'mappings': {
-                        'dynamic': 'strict',
-                        'properties': properties,
-                    },
-                }
-                self.elastic.indices.create(index=index, body=body)
+        create_indices(self.elastic)
 
-    @backoff(errors=(ConnectionError,))
     def bulk_insert(self, schema: Schemas, data: Union[List[PostgresRow], ValuesView[Dict]]):
         """
         Выполняет массовую вставку данных в Elasticsearch.
@@ -37,11 +80,274 @@ class ElasticLoader(object):
         :param schema: Схема, определяющая индекс и структуру данных для вставки.
         :param data: Список или представление значений, содержащих документы для вставки.
         """
-        actions = (
+        self.bulk_documents(schema, build_documents(schema, data))
+
+    def update_movie_persons(self, rows: List[PostgresRow], film_ids: List[str]) -> bool:
+        """
+        Обновляет имена людей во вложенных полях фильмов без пересборки документов фильмов.
+
+        :param rows: Строки таблицы person.
+        :param film_ids: Идентификаторы фильмов, связанных с людьми в PostgreSQL.
+        :return: True, если все фильмы обновлены; False, если фильмы нужно пересобрать целиком.
+        """
+        return self._update_movies(movie_persons_update(rows, film_ids), film_ids)
+
+    def update_movie_genres(self, rows: List[PostgresRow], film_ids: List[str]) -> bool:
+        """
+        Обновляет названия жанров в фильмах без пересборки документов фильмов.
+
+        :param rows: Строки таблицы genre.
+        :param film_ids: Идентификаторы фильмов, связанных с жанрами в PostgreSQL.
+        :return: True, если все фильмы обновлены; False, если фильмы нужно пересобрать целиком.
+        """
+        return self._update_movies(movie_genres_update(rows, film_ids), film_ids)
+
+    @backoff(errors=(ConnectionError,))
+    def _update_movies(self, body: Dict[str, Any], film_ids: List[str]) -> bool:
+        """
+        Выполняет частичное обновление фильмов запросом update_by_query.
+
+        Фильмы, которые еще не содержат связь (новый человек или жанр фильма), запросом не находятся,
+        поэтому при расхождении количества найденных фильмов с ожидаемым фильмы пересобираются.
+        Запрос меняет документы в обход хешей, поэтому хеши фильмов удаляются до запроса: иначе
+        возврат к прежнему содержимому был бы пропущен как не изменившийся.
+
+        :param body: Тело запроса update_by_query.
+        :param film_ids: Идентификаторы связанных фильмов в PostgreSQL.
+        :return: True, если все фильмы обновлены.
+        """
+        expected = len(film_ids)
+        if self.hashes is not None:
+            self.hashes.delete_many(self._hash_index(Movie), film_ids)
+        try:
+            response = self.elastic.update_by_query(
+                index=self.indices.get(Movie._index, Movie._index),
+                body=body,
+                conflicts='proceed',
+                slices='auto',
+            )
+        except ConnectionError:
+            raise
+        except TransportError as error:
+            logger.error('Partial update of movies failed: {0}'.format(error))
+            return False
+        if response.get('failures'):
+            logger.error('Partial update of movies failed: {0}'.format(response['failures']))
+            return False
+        if response.get('version_conflicts'):
+            logger.warning('Partial update of movies skipped {0} documents on version conflicts.'.format(
+                response['version_conflicts'],
+            ))
+            return False
+        if response.get('total', 0) != expected:
+            logger.info('Partial update matched {0} of {1} movies, movies are rebuilt.'.format(
+                response.get('total', 0), expected,
+            ))
+            return False
+        return True
+
+    def bulk_documents(self, schema: Schemas, documents: Iterable[Dict]):
+        """
+        Выполняет массовую вставку документов, уже приведенных к схеме.
+
+        Если задано хранилище хешей, документы, содержимое которых не изменилось с последней
+        загрузки, не отправляются.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param documents: Документы для вставки.
+        """
+        by_id = {str(document['id']): document for document in documents}
+        sources = {document_id: encode(document) for document_id, document in by_id.items()}
+        hashes = self._skip_unchanged(schema, sources)
+        with metrics.batch('load', schema._index) as batch:
+            if self.parallel:
+                failed = self._parallel_bulk(schema, by_id, sources)
+            else:
+                self._bulk(schema, sources)
+                failed = set()
+            batch['rows'] = len(sources)
+        batching.LOAD.observe(batch['rows'], batch['seconds'])
+        self._count(schema, indexed=len(sources) - len(failed), failed=len(failed))
+        if self.hashes is not None:
+            self.hashes.set_many(self._hash_index(schema), {
+                document_id: value for document_id, value in hashes.items() if document_id not in failed
+            })
+
+    @backoff(errors=(ConnectionError,))
+    def delete_documents(self, schema: Schemas, ids: Iterable[str]):
+        """
+        Удаляет документы строк, удаленных в PostgreSQL, и их хеши.
+
+        Документ, которого уже нет в индексе, ошибкой не считается.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param ids: Идентификаторы документов.
+        """
+        ids = [str(document_id) for document_id in ids]
+        if not ids:
+            return
+        index = self.indices.get(schema._index, schema._index)
+        actions = ({'_op_type': 'delete', '_index': index, '_id': document_id} for document_id in ids)
+        failed = 0
+        for ok, result in helpers.streaming_bulk(
+            self.elastic, actions, chunk_size=batching.LOAD.size, raise_on_error=False,
+        ):
+            item = result['delete']
+            if not ok and item.get('status') != 404:
+                logger.error('Document {0} was not deleted: {1}'.format(item.get('_id'), item.get('error')))
+                metrics.BULK_ERRORS.labels(schema._index, str(item.get('status'))).inc()
+                failed += 1
+        self._count(schema, deleted=len(ids) - failed, failed=failed)
+        if self.hashes is not None:
+            self.hashes.delete_many(self._hash_index(schema), ids)
+
+    def summary(self) -> Dict[str, int]:
+        """
+        Возвращает счетчики загруженных, пропущенных без изменений и не загруженных документов.
+
+        :return: Счетчики документов с момента создания загрузчика.
+        """
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def _skip_unchanged(self, schema: Schemas, sources: Dict[str, str]) -> Dict[str, str]:
+        """
+        Убирает из sources документы, хеш которых совпадает с хешем последней загруженной версии.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param sources: Сериализованные документы по идентификаторам; изменяется на месте.
+        :return: Хеши оставшихся документов.
+        """
+        if self.hashes is None or not sources:
+            return {}
+        hashes = {document_id: content_hash(source) for document_id, source in sources.items()}
+        stored = self.hashes.get_many(self._hash_index(schema), list(hashes))
+        for (document_id, value), previous in zip(list(hashes.items()), stored):
+            if value == previous:
+                del sources[document_id]
+                del hashes[document_id]
+        self._count(schema, skipped=len(stored) - len(hashes))
+        return hashes
+
+    def _hash_index(self, schema: Schemas) -> str:
+        """
+        Возвращает имя индекса, к которому привязаны хеши документов схемы.
+
+        Хеши привязаны к конкретной версии индекса, поэтому после переиндексации или пересоздания
+        индекса документы загружаются заново.
+
+        :param schema: Схема, определяющая индекс документов.
+        :return: Имя индекса, в который пишутся документы схемы.
+        """
+        alias = schema._index
+        if alias not in self._hash_indices:
+            index = self.indices.get(alias)
+            if index is None:
+                try:
+                    index = next(iter(self.elastic.indices.get(index=alias)), alias)
+                except NotFoundError:
+                    index = alias
+            self._hash_indices[alias] = index
+        return self._hash_indices[alias]
+
+    def _count(self, schema: Schemas, **counters: int):
+        """
+        Увеличивает счетчики документов загрузчика и метрики документов индекса.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param counters: Приращения счетчиков по названиям.
+        """
+        with self._stats_lock:
+            for name, value in counters.items():
+                self.stats[name] += value
+                metrics.DOCUMENTS.labels(schema._index, name).inc(value)
+
+    @backoff(errors=(ConnectionError,))
+    def _bulk(self, schema: Schemas, sources: Dict[str, str]):
+        """
+        Отправляет документы одним helpers.bulk; первая ошибка документа прерывает вставку.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param sources: Сериализованные документы по идентификаторам.
+        """
+        helpers.bulk(self.elastic, self._actions(schema, sources), chunk_size=batching.LOAD.size)
+
+    def _parallel_bulk(self, schema: Schemas, documents: Dict[str, Dict], sources: Dict[str, str]) -> Set[str]:
+        """
+        Отправляет документы через helpers.parallel_bulk и повторяет только неудавшиеся.
+
+        Пакеты ограничены и количеством документов, и размером в байтах, и отправляются
+        несколькими потоками. Документы, отклоненные с 429 или 5xx, повторяются с джиттером
+        до max_retries раз; при потере соединения повторы не ограничены, как в backoff.
+        Остальные ошибки и исчерпавшие попытки документы записываются в dead-letter файл.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param documents: Документы по идентификаторам для dead-letter файла.
+        :param sources: Сериализованные документы по идентификаторам.
+        :return: Идентификаторы документов, записанных в dead-letter файл.
+        """
+        pending = dict(sources)
+        dead = set()
+        attempt = 0
+        while pending:
+            failed = {}
+            results = helpers.parallel_bulk(
+                self.elastic,
+                self._actions(schema, pending),
+                thread_count=self.thread_count,
+                chunk_size=batching.LOAD.size,
+                max_chunk_bytes=self.max_chunk_bytes,
+                raise_on_error=False,
+                raise_on_exception=False,
+            )
+            for ok, result in results:
+                if ok:
+                    continue
+                item = next(iter(result.values()))
+                document_id = str(item.get('_id'))
+                metrics.BULK_ERRORS.labels(schema._index, str(item.get('status'))).inc()
+                if isinstance(item.get('exception'), ConnectionError):
+                    failed[document_id] = pending[document_id]
+                elif item.get('status') in RETRY_STATUSES and attempt < self.max_retries:
+                    failed[document_id] = pending[document_id]
+                else:
+                    self._dead_letter(schema, documents[document_id], item)
+                    dead.add(document_id)
+            pending = failed
+            if pending:
+                batching.LOAD.pressure('{0} documents were rejected'.format(len(pending)))
+                attempt += 1
+                delay = random.uniform(0, min(BULK_RETRY_MAX_DELAY, BULK_RETRY_DELAY * 2 ** attempt))
+                logger.error('Retrying {0} documents in {1:.2f} seconds.'.format(len(pending), delay))
+                time.sleep(delay)
+        return dead
+
+    def _dead_letter(self, schema: Schemas, document: Dict, item: Dict):
+        """
+        Записывает документ, который не удалось проиндексировать, в dead-letter файл.
+
+        :param schema: Схема, определяющая индекс документа.
+        :param document: Документ, который не удалось проиндексировать.
+        :param item: Результат bulk-операции для документа.
+        """
+        with self._dead_letter_lock:
+            write_dead_letter(self.dead_letter_file, schema, document, item)
+
+    def _actions(self, schema: Schemas, sources: Dict[str, str]) -> Iterator[Dict]:
+        """
+        Формирует bulk-действия индексации документов.
+
+        Документы пишутся в индекс из indices, если для индекса схемы он задан, иначе в псевдоним схемы.
+
+        :param schema: Схема, определяющая индекс документов.
+        :param sources: Сериализованные документы по идентификаторам.
+        :return: Итератор bulk-действий.
+        """
+        index = self.indices.get(schema._index, schema._index)
+        return (
             {
-                '_index': schema._index,
-                '_id': document['id'],
-                '_source': schema(**document).dict(),
-            } for document in data
+                '_index': index,
+                '_id': document_id,
+                '_source': source,
+            } for document_id, source in sources.items()
         )
-        helpers.bulk(self.elastic, actions, chunk_size=BATCH_SIZE)
@@ -0,0 +1,143 @@
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from queue import Empty, Full, Queue
+from typing import Any, Callable, Iterable, List, Optional, Sequence
+
+from core.config import PIPELINE_QUEUE_SIZE
+from core.logger import logger
+
+STOP = object()
+
+POLL_INTERVAL = 0.1
+
+
+@dataclass
+class Stage(object):
+    """
+    Этап конвейера.
+
+    :param name: Название этапа для логов.
+    :param handler: Функция обработки одного элемента; None в результате не передается дальше.
+    :param workers: Количество потоков этапа.
+    :param processes: Размер пула процессов для обработчика (0 - выполнять в потоках этапа).
+    """
+    name: str
+    handler: Callable[[Any], Any]
+    workers: int = 1
+    processes: int = 0
+
+
+@dataclass
+class Pipeline(object):
+    """
+    Конвейер из последовательных этапов, связанных ограниченными очередями.
+
+    Каждый этап выполняется в своих потоках; заполненная очередь блокирует предыдущий
+    этап, поэтому в памяти находится не больше queue_size пакетов на этап. Ошибка в любом
+    этапе останавливает конвейер и пробрасывается из run.
+    """
+    stages: Sequence[Stage]
+    queue_size: int = PIPELINE_QUEUE_SIZE
+    _stop: threading.Event = field(default_factory=threading.Event, init=False, repr=False)
+    _errors: List[BaseException] = field(default_factory=list, init=False, repr=False)
+
+    def run(self, source: Iterable[Any]) -> int:
+        """
+        Прогоняет элементы источника через все этапы и дожидается их обработки.
+
+        :param source: Итератор входных элементов первого этапа.
+        :return: Количество элементов, полученных из источника.
+        :raises BaseException: Первая ошибка, возникшая в источнике или этапах.
+        """
+        self._stop.clear()
+        self._errors.clear()
+        queues: List[Queue] = [Queue(maxsize=self.queue_size) for _ in self.stages]
+        executors = [ProcessPoolExecutor(stage.processes) if stage.processes else None for stage in self.stages]
+        threads = [
+            [
+                threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[num], queues[num + 1] if num + 1 < len(queues) else None, executors[num]),
+                    name='{0}-{1}'.format(stage.name, worker),
+                    daemon=True,
+                )
+                for worker in range(stage.workers)
+            ]
+            for num, stage in enumerate(self.stages)
+        ]
+        for stage_threads in threads:
+            for thread in stage_threads:
+                thread.start()
+
+        items = 0
+        try:
+            for item in source:
+                if not self._put(queues[0], item):
+                    break
+                items += 1
+        except BaseException as error:
+            self._fail(error)
+        try:
+            for num, stage_threads in enumerate(threads):
+                for _ in stage_threads:
+                    self._put(queues[num], STOP)
+                for thread in stage_threads:
+                    thread.join()
+        finally:
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+        if self._errors:
+            raise self._errors[0]
+        return items
+
+    def _work(self, stage: Stage, inbox: Queue, outbox: Optional[Queue], executor: Optional[Executor]):
+        """
+        Цикл потока этапа: берет элементы из входной очереди и передает результаты дальше.
+
+        :param stage: Этап конвейера.
+        :param inbox: Входная очередь этапа.
+        :param outbox: Очередь следующего этапа или None для последнего этапа.
+        :param executor: Пул процессов этапа или None.
+        """
+        while not self._stop.is_set():
+            try:
+                item = inbox.get(timeout=POLL_INTERVAL)
+            except Empty:
+                continue
+            if item is STOP:
+                return
+            try:
+                result = executor.submit(stage.handler, item).result() if executor else stage.handler(item)
+            except BaseException as error:
+                logger.error('Pipeline stage {0} failed: {1}'.format(stage.name, error))
+                self._fail(error)
+                return
+            if outbox is not None and result is not None:
+                self._put(outbox, result)
+
+    def _put(self, queue: Queue, item: Any) -> bool:
+        """
+        Кладет элемент в очередь, ожидая свободного места, пока конвейер не остановлен.
+
+        :param queue: Очередь этапа.
+        :param item: Элемент для передачи.
+        :return: True, если элемент передан; False, если конвейер остановлен.
+        """
+        while not self._stop.is_set():
+            try:
+                queue.put(item, timeout=POLL_INTERVAL)
+            except Full:
+                continue
+            return True
+        return False
+
+    def _fail(self, error: BaseException):
+        """
+        Запоминает ошибку и останавливает все этапы конвейера.
+
+        :param error: Возникшая ошибка.
+        """
+        self._errors.append(error)
+        self._stop.set()
@@ -0,0 +1,177 @@
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import orjson
+from psycopg2 import extensions
+from psycopg2.pool import AbstractConnectionPool
+
+from core import batching, metrics
+from core.config import Schemas
+from core.logger import logger
+from models.models import Genre, Movie, Person
+from services.extract import MOVIE_DOCUMENTS_SELECT, PERSON_DOCUMENTS_SELECT
+
+IdRange = Tuple[Optional[str], Optional[str]]
+
+SNAPSHOT_SELECTS = {
+    'genre': ('SELECT id, name, description FROM genre', 'id'),
+    'person': (PERSON_DOCUMENTS_SELECT, 'p.id'),
+    'film_work': (MOVIE_DOCUMENTS_SELECT, 'fw.id'),
+}
+
+SNAPSHOT_SCHEMAS: Dict[str, Schemas] = {
+    'genre': Genre,
+    'person': Person,
+    'film_work': Movie,
+}
+
+
+def id_ranges(count: int) -> List[IdRange]:
+    """
+    Делит пространство UUID на равные полуоткрытые диапазоны.
+
+    Идентификаторы в таблицах - случайные UUID, поэтому строки распределяются по диапазонам равномерно.
+
+    :param count: Количество диапазонов.
+    :return: Пары (начало, конец); None - диапазон не ограничен с этой стороны.
+    """
+    bounds = [str(uuid.UUID(int=index * (1 << 128) // count)) for index in range(1, count)]
+    return list(zip([None, *bounds], [*bounds, None]))
+
+
+def copy_query(cursor, table: str, id_range: IdRange) -> str:
+    """
+    Формирует COPY строк диапазона идентификаторов таблицы в виде JSON по строке на документ.
+
+    :param cursor: Курсор для подстановки параметров.
+    :param table: Таблица снимка.
+    :param id_range: Диапазон идентификаторов.
+    :return: Текст запроса COPY ... TO STDOUT.
+    """
+    select, column = SNAPSHOT_SELECTS[table]
+    start, end = id_range
+    conditions = ['TRUE']
+    if start is not None:
+        conditions.append(cursor.mogrify('{0} >= %s::uuid'.format(column), (start,)).decode())
+    if end is not None:
+        conditions.append(cursor.mogrify('{0} < %s::uuid'.format(column), (end,)).decode())
+    return 'COPY (SELECT row_to_json(snapshot)::text FROM ({0} WHERE {1}) snapshot) TO STDOUT'.format(
+        select, ' AND '.join(conditions),
+    )
+
+
+@dataclass
+class CopyBatches(object):
+    """
+    Файлоподобный приемник COPY ... TO STDOUT, который разбирает строки по мере поступления.
+
+    В текстовом формате COPY удваивает обратную косую черту; других экранирований в JSON без
+    управляющих символов нет. Разобранные строки передаются в on_batch пакетами размера
+    batching.LOAD.size.
+
+    :param on_batch: Функция, которая получает пакет разобранных строк.
+    """
+    on_batch: Callable[[List[Dict]], None]
+    rows: int = 0
+    _tail: bytes = field(default=b'', init=False, repr=False)
+    _batch: List[Dict] = field(default_factory=list, init=False, repr=False)
+
+    def write(self, data):
+        """
+        Принимает очередной фрагмент вывода COPY.
+
+        :param data: Фрагмент, который может обрываться посреди строки.
+        """
+        if isinstance(data, str):
+            data = data.encode()
+        *lines, self._tail = (self._tail + data).split(b'\n')
+        for line in lines:
+            self._batch.append(orjson.loads(line.replace(b'\\\\', b'\\')))
+            if len(self._batch) >= batching.LOAD.size:
+                self._emit()
+
+    def close(self):
+        """
+        Передает последний неполный пакет.
+        """
+        if self._tail:
+            self.write(b'\n')
+        if self._batch:
+            self._emit()
+
+    def _emit(self):
+        batch, self._batch = self._batch, []
+        self.rows += len(batch)
+        self.on_batch(batch)
+
+
+@dataclass
+class Snapshot(object):
+    """
+    Выгрузка всех таблиц через COPY несколькими потоками в одном согласованном снимке PostgreSQL.
+
+    Соединение postgres экспортирует снимок и держит его транзакцию открытой до конца выгрузки;
+    потоки пула импортируют этот снимок, поэтому все диапазоны видят одни и те же данные.
+
+    :param postgres: Соединение, экспортирующее снимок.
+    :param postgres_pool: Пул соединений для потоков выгрузки.
+    :param load: Функция, которая загружает пакет строк схемы в Elasticsearch.
+    :param workers: Количество потоков выгрузки.
+    :param ranges: Количество диапазонов идентификаторов на таблицу.
+    """
+    postgres: extensions.connection
+    postgres_pool: AbstractConnectionPool
+    load: Callable[[Schemas, List[Dict]], None]
+    workers: int
+    ranges: int
+
+    def run(self) -> datetime:
+        """
+        Выгружает таблицы genre, person и film_work.
+
+        :return: Время начала снимка по часам PostgreSQL.
+        """
+        self.postgres.set_session(isolation_level=extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+        try:
+            with self.postgres.cursor() as curs:
+                curs.execute('SELECT pg_export_snapshot(), localtimestamp;')
+                snapshot_id, started = curs.fetchone()
+            tasks = [(table, id_range) for table in SNAPSHOT_SELECTS for id_range in id_ranges(self.ranges)]
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                counts = list(executor.map(lambda task: self._copy(snapshot_id, *task), tasks))
+        finally:
+            self.postgres.rollback()
+            self.postgres.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+        totals: Dict[str, int] = {}
+        for (table, _), count in zip(tasks, counts):
+            totals[table] = totals.get(table, 0) + count
+        logger.info('Snapshot at {0} is loaded: {1}.'.format(started, totals))
+        return started
+
+    def _copy(self, snapshot_id: str, table: str, id_range: IdRange) -> int:
+        """
+        Выгружает диапазон идентификаторов таблицы и загружает его пакетами.
+
+        :param snapshot_id: Идентификатор экспортированного снимка.
+        :param table: Таблица снимка.
+        :param id_range: Диапазон идентификаторов.
+        :return: Количество выгруженных строк.
+        """
+        schema = SNAPSHOT_SCHEMAS[table]
+        conn = self.postgres_pool.getconn()
+        try:
+            conn.set_session(isolation_level=extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+            with metrics.batch('snapshot', table) as batch, conn.cursor() as curs:
+                curs.execute('SET TRANSACTION SNAPSHOT %s;', (snapshot_id,))
+                batches = CopyBatches(lambda rows: self.load(schema, rows))
+                curs.copy_expert(copy_query(curs, table, id_range), batches)
+                batches.close()
+                batch['rows'] = batches.rows
+        finally:
+            conn.rollback()
+            conn.set_session(isolation_level='DEFAULT', readonly='DEFAULT')
+            self.postgres_pool.putconn(conn)
+        return batches.rows
@@ -1,18 +1,19 @@
 import json
+import os
 from abc import abstractmethod
+from datetime import datetime, timezone
 from typing import Any, Dict
 
+from psycopg2 import sql
+from psycopg2.extensions import connection
+from psycopg2.extras import execute_values
 from pydantic.dataclasses import dataclass
 from redis import Redis
 
-from services.base import Config
+from services.base import MIN_UUID, Config, Watermark
 
-import json
-import os
-from abc import abstractmethod
-from typing import Any, Dict
-
-from pydantic.dataclasses import dataclass
+EXTRACT_STAGE = 'extract'
+LOAD_STAGE = 'load'
 
 
 @dataclass(config=Config)
@@ -61,6 +62,82 @@ class JsonStorage(BaseStorage):
         return {}
 
 
+@dataclass(config=Config)
+class RedisStorage(BaseStorage):
+    redis: Redis
+    key: str = 'etl_state'
+
+    def save_state(self, state: Dict) -> None:
+        """
+        Сохраняет состояние в хеш Redis, обновляя только переданные ключи.
+
+        :param state: Словарь, представляющий состояние для сохранения.
+        """
+        if state:
+            self.redis.hset(self.key, mapping={
+                field: json.dumps(value, default=str) for field, value in state.items()
+            })
+
+    def retrieve_state(self) -> Dict:
+        """
+        Извлекает состояние из хеша Redis.
+
+        :return: Словарь, представляющий извлеченное состояние, или пустой словарь, если данных нет.
+        """
+        return {
+            field.decode(): json.loads(value) for field, value in self.redis.hgetall(self.key).items()
+        }
+
+
+@dataclass(config=Config)
+class PostgresStorage(BaseStorage):
+    postgres: connection
+    table: str = 'etl_state'
+
+    def __post_init__(self):
+        """
+        Создает таблицу состояния в PostgreSQL, если она еще не существует.
+        """
+        query = sql.SQL("""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value JSONB NOT NULL,
+                modified TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now()
+            );
+        """).format(table=sql.Identifier(self.table))
+        with self.postgres.cursor() as curs:
+            curs.execute(query)
+        self.postgres.commit()
+
+    def save_state(self, state: Dict) -> None:
+        """
+        Сохраняет состояние в таблицу PostgreSQL, обновляя только переданные ключи.
+
+        :param state: Словарь, представляющий состояние для сохранения.
+        """
+        query = sql.SQL("""
+            INSERT INTO {table} (key, value)
+            VALUES %s
+            ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, modified = now();
+        """).format(table=sql.Identifier(self.table))
+        with self.postgres.cursor() as curs:
+            execute_values(curs, query, [(key, json.dumps(value, default=str)) for key, value in state.items()])
+        self.postgres.commit()
+
+    def retrieve_state(self) -> Dict:
+        """
+        Извлекает состояние из таблицы PostgreSQL.
+
+        :return: Словарь, представляющий извлеченное состояние, или пустой словарь, если данных нет.
+        """
+        query = sql.SQL('SELECT key, value FROM {table};').format(table=sql.Identifier(self.table))
+        with self.postgres.cursor() as curs:
+            curs.execute(query)
+            state = {row['key']: row['value'] for row in curs}
+        self.postgres.commit()
+        return state
+
+
 @dataclass(config=Config)
 class State(object):
     storage: BaseStorage
@@ -75,9 +152,13 @@ class State(object):
         """
         Записывает значение в состояние под заданным ключом.
 
+        Перед записью состояние перечитывается из хранилища, чтобы не затереть
+        ключи, которые успели обновить другие экземпляры ETL.
+
         :param key: Ключ, под которым будет храниться значение.
         :param value: Значение для сохранения.
         """
+        self.data = self.storage.retrieve_state()
         self.data[key] = value
         self.storage.save_state(self.data)
 
@@ -89,4 +170,39 @@ class State(object):
         :param default: Значение по умолчанию, если ключ не найден.
         :return: Значение, соответствующее ключу, или значение по умолчанию.
         """
+        self.data = self.storage.retrieve_state()
         return self.data.get(key, default)
+
+    def read_watermark(self, table: str, stage: str) -> Watermark:
+        """
+        Читает водяной знак (modified, id) таблицы для указанного этапа конвейера.
+
+        Если водяного знака еще нет, используется устаревший общий ключ `last_updated`. Он записывался
+        с часовым поясом, а столбцы modified его не содержат, поэтому значение приводится к UTC без пояса.
+
+        :param table: Название исходной таблицы.
+        :param stage: Этап конвейера (EXTRACT_STAGE или LOAD_STAGE).
+        :return: Пара (modified, id) последней обработанной строки.
+        """
+        watermark = self.read_state('{stage}:{table}'.format(stage=stage, table=table))
+        if watermark is None:
+            last_updated = self.read_state('last_updated')
+            modified = datetime.fromisoformat(last_updated) if last_updated else datetime.min
+            if modified.tzinfo is not None:
+                modified = modified.astimezone(timezone.utc).replace(tzinfo=None)
+            return (modified, MIN_UUID)
+        return (datetime.fromisoformat(watermark['modified']), watermark['id'])
+
+    def write_watermark(self, table: str, stage: str, watermark: Watermark) -> None:
+        """
+        Фиксирует водяной знак таблицы для указанного этапа конвейера.
+
+        :param table: Название исходной таблицы.
+        :param stage: Этап конвейера (EXTRACT_STAGE или LOAD_STAGE).
+        :param watermark: Пара (modified, id) последней успешно обработанной строки.
+        """
+        modified, row_id = watermark
+        self.write_state(
+            '{stage}:{table}'.format(stage=stage, table=table),
+            {'modified': modified.isoformat(), 'id': str(row_id)},
+        )
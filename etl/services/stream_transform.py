@@ -0,0 +1,195 @@
+import os
+import socket
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+from redis.exceptions import ConnectionError, ResponseError
+
+from core import batching, metrics
+from core.config import STREAM_CLAIM_IDLE, STREAM_GROUP, STREAM_READ_COUNT
+from core.decorators import backoff
+from services.documents import movie_template
+from services.transform import DataTransform
+
+StreamEntry = Tuple[bytes, Optional[Dict[bytes, bytes]]]
+
+
+def consumer_name() -> str:
+    """
+    Формирует имя потребителя, уникальное для процесса на хосте.
+
+    :return: Имя хоста и идентификатор процесса.
+    """
+    return '{0}-{1}'.format(socket.gethostname(), os.getpid())
+
+
+@dataclass
+class StreamDataTransform(DataTransform):
+    """
+    Очередь фильмов в потоке Redis с группой потребителей.
+
+    Каждая запись потока - пакет идентификаторов фильмов. Воркеры забирают записи через XREADGROUP,
+    подтверждают их после успешной загрузки и забирают себе записи, которые другой воркер держит
+    дольше claim_idle миллисекунд. В режиме in_memory поведение DataTransform не меняется.
+
+    :param group: Группа потребителей потока.
+    :param consumer: Имя потребителя в группе.
+    :param claim_idle: Время в миллисекундах, после которого неподтвержденная запись забирается у другого потребителя.
+    :param block: Время в миллисекундах, которое батчер ждет новых записей; None - не ждать.
+    :param read_count: Количество записей, которое забирается одним запросом к Redis.
+    """
+    group: str = STREAM_GROUP
+    consumer: str = field(default_factory=consumer_name)
+    claim_idle: int = STREAM_CLAIM_IDLE
+    block: Optional[int] = None
+    read_count: int = STREAM_READ_COUNT
+    _groups: Set[str] = field(default_factory=set, init=False, repr=False)
+    _claim_cursors: Dict[str, str] = field(default_factory=dict, init=False, repr=False)
+    _claimed: Dict[FrozenSet[str], List[bytes]] = field(default_factory=dict, init=False, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, init=False, repr=False)
+
+    @staticmethod
+    def stream(key: str) -> str:
+        """
+        Возвращает имя потока для ключа очереди.
+
+        Поток хранится под отдельным именем, чтобы не конфликтовать с множеством режима 'set'.
+
+        :param key: Ключ очереди.
+        :return: Имя потока в Redis.
+        """
+        return '{0}:stream'.format(key)
+
+    @backoff(errors=(ConnectionError,))
+    def flush(self):
+        """
+        Сбрасывает буфер идентификаторов в поток конвейером XADD, по записи на пакет фильмов текущего размера.
+        """
+        if self.in_memory:
+            super().flush()
+            return
+        if any(self._buffer.values()):
+            with metrics.batch('collect', 'redis') as batch:
+                pipeline = self.redis.pipeline(transaction=False)
+                for key, buffer in self._buffer.items():
+                    members = list(buffer)
+                    batch['rows'] += len(members)
+                    size = batching.MOVIES.size
+                    for start in range(0, len(members), size):
+                        pipeline.xadd(self.stream(key), {'ids': ','.join(members[start:start + size])})
+                pipeline.execute()
+        self._buffer.clear()
+        self._flushed_at = time.monotonic()
+
+    def batcher(self, key: str, template: Callable[[], Dict[str, Any]] = movie_template) -> Iterator[Dict[str, Any]]:
+        """
+        Генерирует пакеты идентификаторов произведений из записей потока.
+
+        Сначала забираются зависшие записи других потребителей, затем читаются новые. Итератор
+        завершается, когда ни тех, ни других нет.
+
+        :param key: Ключ очереди.
+        :param template: Функция, создающая пустой шаблон документа для идентификатора.
+        :return: Итератор, который возвращает словарь с идентификаторами произведений и их свойствами.
+        """
+        if self.in_memory:
+            yield from super().batcher(key, template)
+            return
+        self.flush()
+        stream = self.stream(key)
+        self._create_group(stream)
+        while entries := self._claim(stream) or self._read(stream):
+            for entry_id, fields in entries:
+                if not fields:
+                    self._ack(stream, [entry_id])
+                    continue
+                movie_ids = fields[b'ids'].decode().split(',')
+                with self._lock:
+                    self._claimed.setdefault(frozenset(movie_ids), []).append(entry_id)
+                yield {movie_id: template() for movie_id in movie_ids}
+
+    def acknowledge(self, key: str, film_work_ids: Iterable[str]):
+        """
+        Подтверждает и удаляет из потока запись пакета успешно загруженных произведений.
+
+        :param key: Ключ очереди.
+        :param film_work_ids: Идентификаторы произведений пакета, полученного из батчера.
+        """
+        if self.in_memory:
+            super().acknowledge(key, film_work_ids)
+            return
+        movie_ids = frozenset(film_work_ids)
+        with self._lock:
+            entry_ids = self._claimed.get(movie_ids)
+            if not entry_ids:
+                return
+            entry_id = entry_ids.pop()
+            if not entry_ids:
+                del self._claimed[movie_ids]
+        self._ack(self.stream(key), [entry_id])
+
+    @backoff(errors=(ConnectionError,))
+    def _create_group(self, stream: str):
+        """
+        Создает группу потребителей и поток, если их еще нет.
+
+        :param stream: Имя потока.
+        """
+        if stream in self._groups:
+            return
+        try:
+            self.redis.xgroup_create(stream, self.group, id='0', mkstream=True)
+        except ResponseError as error:
+            if 'BUSYGROUP' not in str(error):
+                raise
+        self._groups.add(stream)
+
+    @backoff(errors=(ConnectionError,))
+    def _claim(self, stream: str) -> List[StreamEntry]:
+        """
+        Забирает до read_count записей, которые другой потребитель не подтвердил дольше claim_idle миллисекунд.
+
+        Позиция просмотра списка неподтвержденных записей сохраняется между вызовами.
+
+        :param stream: Имя потока.
+        :return: Забранные записи.
+        """
+        with metrics.batch('queue', 'redis') as batch:
+            cursor, entries, *_ = self.redis.xautoclaim(
+                stream, self.group, self.consumer, self.claim_idle,
+                start_id=self._claim_cursors.get(stream, '0-0'), count=self.read_count,
+            )
+            self._claim_cursors[stream] = cursor.decode() if isinstance(cursor, bytes) else cursor
+            batch['rows'] = len(entries)
+        return entries
+
+    @backoff(errors=(ConnectionError,))
+    def _read(self, stream: str) -> List[StreamEntry]:
+        """
+        Читает до read_count новых записей потока для этого потребителя.
+
+        :param stream: Имя потока.
+        :return: Прочитанные записи.
+        """
+        with metrics.batch('queue', 'redis') as batch:
+            response = self.redis.xreadgroup(
+                self.group, self.consumer, {stream: '>'}, count=self.read_count, block=self.block,
+            )
+            entries = [entry for _, stream_entries in response or () for entry in stream_entries]
+            batch['rows'] = len(entries)
+        return entries
+
+    @backoff(errors=(ConnectionError,))
+    def _ack(self, stream: str, entry_ids: List[bytes]):
+        """
+        Подтверждает записи в группе и удаляет их из потока.
+
+        :param stream: Имя потока.
+        :param entry_ids: Идентификаторы записей.
+        """
+        pipeline = self.redis.pipeline(transaction=False)
+        pipeline.xack(stream, self.group, *entry_ids)
+        pipeline.xdel(stream, *entry_ids)
+        pipeline.execute()
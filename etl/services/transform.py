@@ -1,43 +1,137 @@
-from dataclasses import dataclass
-from typing import Any, Dict, Iterator
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
 
 from redis import Redis
 from redis.exceptions import ConnectionError
 
-from core.config import BATCH_SIZE, PostgresRow
+from core import batching, metrics
+from core.config import COLLECTOR_FLUSH_INTERVAL, COLLECTOR_FLUSH_SIZE, SADD_MEMBERS, PostgresRow, Schemas
 from core.decorators import backoff
-from models.models import Movie, Person
+from models.models import Person
+from services import documents
+from services.documents import movie_template
+
+MovieBatch = Tuple[List[str], List[Dict[str, Any]]]
+
+
+def build_documents(schema: Schemas, batch: MovieBatch) -> MovieBatch:
+    """
+    Приводит строки пакета к схеме индекса.
+
+    Функция объявлена на уровне модуля, чтобы ее можно было выполнять в пуле процессов.
+
+    :param schema: Схема документов.
+    :param batch: Идентификаторы фильмов пакета и их строки.
+    :return: Идентификаторы фильмов пакета и готовые документы.
+    """
+    movie_ids, rows = batch
+    return movie_ids, documents.build_documents(schema, rows)
 
 
 @dataclass
 class DataTransform(object):
     redis: Redis
+    flush_size: int = COLLECTOR_FLUSH_SIZE
+    flush_interval: float = COLLECTOR_FLUSH_INTERVAL
+    in_memory: bool = False
+    _buffer: Dict[str, Set[str]] = field(default_factory=dict, init=False, repr=False)
+    _memory: Dict[str, Set[str]] = field(default_factory=dict, init=False, repr=False)
+    _flushed_at: float = field(default_factory=time.monotonic, init=False, repr=False)
 
-    @backoff(errors=(ConnectionError,))
     def collector(self, key: str, film_work_id: str):
         """
-        Собирает идентификатор произведения и добавляет его в множество Redis.
+        Собирает идентификатор произведения в буфер без повторов.
+
+        Буфер сбрасывается в Redis, когда в нем накапливается flush_size идентификаторов
+        или с последнего сброса прошло flush_interval секунд.
 
         :param key: Ключ, под которым будет храниться множество идентификаторов.
         :param film_work_id: Идентификатор произведения для добавления.
         """
-        self.redis.sadd(key, film_work_id)
+        buffer = self._buffer.setdefault(key, set())
+        buffer.add(str(film_work_id))
+        if len(buffer) >= self.flush_size or time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    @backoff(errors=(ConnectionError,))
+    def flush(self):
+        """
+        Сбрасывает буфер идентификаторов: конвейером многоэлементных SADD в Redis
+        или в множества в памяти процесса, если включен режим in_memory.
+        """
+        if self.in_memory:
+            for key, buffer in self._buffer.items():
+                self._memory.setdefault(key, set()).update(buffer)
+        elif any(self._buffer.values()):
+            with metrics.batch('collect', 'redis') as batch:
+                pipeline = self.redis.pipeline(transaction=False)
+                for key, buffer in self._buffer.items():
+                    members = list(buffer)
+                    batch['rows'] += len(members)
+                    for start in range(0, len(members), SADD_MEMBERS):
+                        pipeline.sadd(key, *members[start:start + SADD_MEMBERS])
+                pipeline.execute()
+        self._buffer.clear()
+        self._flushed_at = time.monotonic()
 
     @backoff(errors=(ConnectionError,))
-    def batcher(self, key: str) -> Iterator[Dict[str, Any]]:
+    def batcher(self, key: str, template: Callable[[], Dict[str, Any]] = movie_template) -> Iterator[Dict[str, Any]]:
         """
-        Генерирует пакеты идентификаторов произведений из множества Redis.
+        Генерирует пакеты идентификаторов произведений из множества Redis или памяти процесса.
+
+        Идентификаторы остаются в множестве до вызова acknowledge, поэтому после сбоя
+        незагруженные произведения будут обработаны при следующем запуске.
 
         :param key: Ключ множества идентификаторов в Redis.
+        :param template: Функция, создающая пустой шаблон документа для идентификатора.
         :return: Итератор, который возвращает словарь с идентификаторами произведений и их свойствами.
         """
+        self.flush()
+        if self.in_memory:
+            yield from self._memory_batcher(key, template)
+            return
         cursor = '0'
         while cursor != 0:
-            cursor, data = self.redis.sscan(key, cursor=cursor, count=BATCH_SIZE)  # type: ignore[assignment, arg-type]
+            with metrics.batch('queue', 'redis') as batch:
+                cursor, data = self.redis.sscan(  # type: ignore[assignment]
+                    key, cursor=cursor, count=batching.MOVIES.size,  # type: ignore[arg-type]
+                )
+                batch['rows'] = len(data)
+            if data:
+                yield {
+                    movie_id.decode(): template() for movie_id in data
+                }
+
+    def _memory_batcher(self, key: str, template: Callable[[], Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Генерирует пакеты идентификаторов произведений из множества в памяти процесса.
+
+        :param key: Ключ множества идентификаторов.
+        :param template: Функция, создающая пустой шаблон документа для идентификатора.
+        :return: Итератор, который возвращает словарь с идентификаторами произведений и их свойствами.
+        """
+        movie_ids = list(self._memory.get(key, ()))
+        start = 0
+        while start < len(movie_ids):
+            size = batching.MOVIES.size
             yield {
-                movie_id.decode(): Movie.properties() for movie_id in data
+                movie_id: template() for movie_id in movie_ids[start:start + size]
             }
-        self.redis.delete(key)
+            start += size
+
+    @backoff(errors=(ConnectionError,))
+    def acknowledge(self, key: str, film_work_ids: Iterable[str]):
+        """
+        Удаляет из множества идентификаторы успешно загруженных произведений.
+
+        :param key: Ключ множества идентификаторов в Redis.
+        :param film_work_ids: Идентификаторы загруженных произведений.
+        """
+        if self.in_memory:
+            self._memory.get(key, set()).difference_update(film_work_ids)
+        else:
+            self.redis.srem(key, *film_work_ids)
 
     def parser(self, row: PostgresRow, movie: Dict):
         """
@@ -80,7 +174,9 @@ class DataTransform(object):
         :param movie: Словарь, представляющий произведение, в которое добавляется информация о жанре.
         :return: Словарь с обновленной информацией о жанрах, связанных с произведением.
         """
-        genre_names_list = movie.get('genres', [])
+        genres_list = movie.get('genres', [])
+        genre_names_list = movie.get('genres_names', [])
         if row['genre_name'] not in genre_names_list:
+            genres_list.append({'id': str(row['genre_id']), 'name': row['genre_name']})
             genre_names_list.append(row['genre_name'])
-        return {'genres': genre_names_list}
+        return {'genres': genres_list, 'genres_names': genre_names_list}
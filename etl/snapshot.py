@@ -0,0 +1,64 @@
+from core.config import ELASTIC_PAR, ETL_PAR, POSTGRES_PAR, REDIS_PAR
+from db.db import con_elastic, con_postgres, con_postgres_pool, con_redis
+from main import get_hash_store, get_storage
+from services import load
+from services.base import MIN_UUID
+from services.indices import Reindexer
+from services.snapshot import SNAPSHOT_SCHEMAS, Snapshot
+from services.state import EXTRACT_STAGE, LOAD_STAGE, State
+
+
+def snapshot(snapshot_loader: Snapshot, reindexer: Reindexer, state: State):
+    """
+    Загружает все данные одним снимком PostgreSQL в новые версии индексов и переключает на них псевдонимы.
+
+    Водяные знаки всех таблиц устанавливаются на начало снимка: изменения, сделанные во время выгрузки,
+    загрузит инкрементальный ETL.
+
+    :param snapshot_loader: Выгрузка таблиц через COPY.
+    :param reindexer: Объект, управляющий версиями индексов и псевдонимами.
+    :param state: Объект состояния инкрементального ETL.
+    """
+    try:
+        started = snapshot_loader.run()
+        reindexer.publish()
+    except BaseException:
+        reindexer.abort()
+        raise
+    for table in SNAPSHOT_SCHEMAS:
+        for stage in (EXTRACT_STAGE, LOAD_STAGE):
+            state.write_watermark(table, stage, (started, MIN_UUID))
+
+
+def main():
+    """
+    Устанавливает соединения с базами данных и выполняет загрузку снимком.
+    """
+    with con_postgres(**POSTGRES_PAR) as postgres_conn:
+        with con_postgres_pool(ETL_PAR.snapshot_workers, **POSTGRES_PAR) as postgres_pool:
+            with con_redis(**REDIS_PAR) as redis_conn:
+                with con_elastic(**ELASTIC_PAR) as elastic_conn:
+                    reindexer = Reindexer(elastic_conn)
+                    elastic = load.ElasticLoader(
+                        elastic_conn,
+                        parallel=ETL_PAR.bulk_mode == 'parallel',
+                        thread_count=ETL_PAR.bulk_concurrency,
+                        dead_letter_file=ETL_PAR.dead_letter_file,
+                        indices=reindexer.create(),
+                        hashes=get_hash_store(redis_conn),
+                    )
+                    snapshot(
+                        Snapshot(
+                            postgres_conn,
+                            postgres_pool,
+                            elastic.bulk_insert,
+                            workers=ETL_PAR.snapshot_workers,
+                            ranges=ETL_PAR.snapshot_ranges,
+                        ),
+                        reindexer,
+                        State(get_storage(postgres_conn, redis_conn)),
+                    )
+
+
+if __name__ == '__main__':
+    main()
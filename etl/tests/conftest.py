@@ -0,0 +1,88 @@
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List
+
+import orjson
+import pytest
+
+from benchmarks.catalogue import Catalogue, CatalogueExtractor, generate_catalogue
+from benchmarks.fakes import FakeElasticsearch
+from services import load, transform
+from services.state import JsonStorage, State
+
+
+@dataclass
+class RejectingElasticsearch(FakeElasticsearch):
+    """
+    Клиент Elasticsearch в памяти, который отвечает на bulk заданными статусами.
+
+    :param statuses: Статусы следующих попыток индексации документа по его идентификатору.
+    """
+    statuses: Dict[str, List[int]] = field(default_factory=dict)
+    attempts: Counter = field(default_factory=Counter)
+
+    def bulk(self, body: str, **kwargs) -> Dict[str, Any]:
+        lines = iter(body.splitlines())
+        items = []
+        for action_line in lines:
+            action = orjson.loads(action_line)['index']
+            next(lines)
+            document_id = action['_id']
+            self.attempts[document_id] += 1
+            statuses = self.statuses.get(document_id)
+            status = statuses.pop(0) if statuses else 201
+            item = {'_index': action['_index'], '_id': document_id, 'status': status}
+            if status >= 300:
+                item['error'] = {'type': 'rejected', 'reason': 'status {0}'.format(status)}
+            else:
+                self.documents[action['_index']] += 1
+            items.append({'index': item})
+        return {'errors': any('error' in item['index'] for item in items), 'items': items}
+
+
+@pytest.fixture(name='catalogue')
+def catalogue_fixture() -> Catalogue:
+    """Небольшой синтетический каталог."""
+    return generate_catalogue(30)
+
+
+@pytest.fixture(name='extractor')
+def extractor_fixture(catalogue) -> CatalogueExtractor:
+    """Экстрактор, читающий каталог из памяти."""
+    return CatalogueExtractor(catalogue)
+
+
+@pytest.fixture(name='elastic')
+def elastic_fixture() -> FakeElasticsearch:
+    """Клиент Elasticsearch в памяти."""
+    return FakeElasticsearch()
+
+
+@pytest.fixture(name='rejecting_elastic')
+def rejecting_elastic_fixture() -> RejectingElasticsearch:
+    """Клиент Elasticsearch в памяти с заданными отказами bulk."""
+    return RejectingElasticsearch()
+
+
+@pytest.fixture(name='make_loader')
+def make_loader_fixture(elastic, tmp_path) -> Callable[..., load.ElasticLoader]:
+    """Фабрика загрузчиков, пишущих в клиент Elasticsearch в памяти."""
+
+    def make_loader(**kwargs) -> load.ElasticLoader:
+        kwargs.setdefault('parallel', False)
+        return load.ElasticLoader(elastic, dead_letter_file=os.path.join(tmp_path, 'dead_letter.jsonl'), **kwargs)
+
+    return make_loader
+
+
+@pytest.fixture(name='data')
+def data_fixture() -> transform.DataTransform:
+    """Очередь фильмов и людей в памяти процесса."""
+    return transform.DataTransform(None, in_memory=True)  # type: ignore[arg-type]
+
+
+@pytest.fixture(name='state')
+def state_fixture(tmp_path) -> State:
+    """Состояние ETL в JSON-файле."""
+    return State(JsonStorage(os.path.join(tmp_path, 'state.json')))
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import os
+
+import pytest
+
+from models.models import Genre
+from services import async_load
+from services.async_load import AsyncElasticLoader
+
+GENRES = [
+    {'id': 'genre-{0}'.format(num), 'name': 'Genre {0}'.format(num), 'description': None} for num in range(4)
+]
+
+
+class AsyncElasticsearch(object):
+    """Асинхронная обертка над синхронным клиентом в памяти."""
+
+    def __init__(self, elastic):
+        self.elastic = elastic
+        self.transport = elastic.transport
+
+    async def bulk(self, body: str, **kwargs):
+        return self.elastic.bulk(body, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    """Повторы без задержки."""
+    monkeypatch.setattr(async_load, 'BULK_RETRY_DELAY', 0)
+
+
+def load_genres(elastic, dead_letter_file: str) -> AsyncElasticLoader:
+    """
+    Загружает жанры двумя одновременными пакетами и дожидается их.
+
+    :param elastic: Синхронный клиент Elasticsearch в памяти.
+    :param dead_letter_file: Путь к dead-letter файлу.
+    :return: Загрузчик после завершения всех запросов.
+    """
+
+    async def run() -> AsyncElasticLoader:
+        loader = AsyncElasticLoader(AsyncElasticsearch(elastic), concurrency=2, dead_letter_file=dead_letter_file)
+        await loader.bulk_insert(Genre, GENRES[:2])
+        await loader.bulk_insert(Genre, GENRES[2:])
+        await loader.drain()
+        return loader
+
+    return asyncio.run(run())
+
+
+def test_rejected_documents_are_retried(rejecting_elastic, tmp_path):
+    """Документы, отклоненные с 429, повторяются, а остальные документы не отправляются заново."""
+    rejecting_elastic.statuses = {'genre-1': [429, 429]}
+    loader = load_genres(rejecting_elastic, os.path.join(tmp_path, 'dead_letter.jsonl'))
+
+    assert loader.summary() == {'indexed': 4}
+    assert rejecting_elastic.attempts == {'genre-0': 1, 'genre-1': 3, 'genre-2': 1, 'genre-3': 1}
+
+
+def test_failed_documents_go_to_dead_letter(rejecting_elastic, tmp_path):
+    """Документ с ошибкой, которую нельзя повторить, записывается в dead-letter файл."""
+    dead_letter_file = os.path.join(tmp_path, 'dead_letter.jsonl')
+    rejecting_elastic.statuses = {'genre-2': [400]}
+    loader = load_genres(rejecting_elastic, dead_letter_file)
+
+    assert loader.summary() == {'indexed': 3, 'failed': 1}
+    with open(dead_letter_file) as file:
+        [record] = [json.loads(line) for line in file]
+    assert (record['index'], record['id'], record['status']) == ('genres', 'genre-2', 400)
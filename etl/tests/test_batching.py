@@ -0,0 +1,65 @@
+from core.batching import AdaptiveBatch
+
+
+def make_batch(**kwargs) -> AdaptiveBatch:
+    """
+    Создает контроллер размера пакета для тестов.
+
+    :param kwargs: Параметры, отличающиеся от тестовых по умолчанию.
+    :return: Контроллер размера пакета.
+    """
+    params = {'size': 100, 'min_size': 10, 'max_size': 300, 'step': 50, 'decrease': 0.5}
+    params.update(kwargs)
+    return AdaptiveBatch('test', **params)
+
+
+def test_size_is_clamped():
+    """Начальный размер приводится к границам."""
+    assert make_batch(size=5000).size == 300
+    assert make_batch(size=1).size == 10
+
+
+def test_increase_while_latency_holds():
+    """Пока время на строку не растет, размер растет на step до max_size."""
+    batch = make_batch()
+    sizes = []
+    for _ in range(5):
+        batch.observe(batch.size, batch.size / 128)
+        sizes.append(batch.size)
+
+    assert sizes == [150, 200, 250, 300, 300]
+
+
+def test_decrease_when_latency_rises():
+    """Рост времени на строку больше допуска уменьшает размер в decrease раз."""
+    batch = make_batch(size=200)
+    batch.observe(200, 2.0)
+    assert batch.size == 250
+
+    batch.observe(250, 250 * 0.012)
+    assert batch.size == 250
+
+    batch.observe(250, 250 * 0.02)
+    assert batch.size == 125
+
+
+def test_small_batches_are_ignored():
+    """Пакеты меньше половины размера и пустые пакеты не меняют размер."""
+    batch = make_batch(size=200)
+    batch.observe(99, 10.0)
+    batch.observe(0, 0.0)
+    assert batch.size == 200
+
+    batch.observe(200, 2.0)
+    assert batch.size == 250
+
+
+def test_pressure_decreases_to_min_size():
+    """Сигнал перегрузки уменьшает размер, но не ниже min_size."""
+    batch = make_batch(size=100, min_size=40)
+    sizes = []
+    for _ in range(3):
+        batch.pressure('429 Too Many Requests')
+        sizes.append(batch.size)
+
+    assert sizes == [50, 40, 40]
@@ -0,0 +1,59 @@
+import os
+from datetime import timedelta
+
+from benchmarks.catalogue import START
+from main import run_changes, run_etl
+from models.models import Movie
+from services.base import MIN_UUID
+from services.hashes import DbmHashStore
+
+MISSING_ID = MIN_UUID.replace('0', 'f')
+
+
+def test_changes_delete_missing_rows(catalogue, extractor, elastic, make_loader, data):
+    """Документы строк, которых уже нет в PostgreSQL, удаляются, остальные загружаются."""
+    film_id = catalogue.films[0][0]
+    elastic_loader = make_loader()
+
+    loaded = run_changes(extractor, data, elastic_loader, {
+        'film_work': {film_id, MISSING_ID},
+        'person': {MISSING_ID},
+    })
+
+    assert loaded == {'film_work': {(catalogue.films[0][-1], film_id)}, 'person': set()}
+    assert elastic.deleted == {'movies': 1, 'persons': 1}
+    assert elastic_loader.summary()['deleted'] == 2
+    assert elastic.documents['movies'] == 1
+
+
+def test_poll_skips_rows_loaded_by_changes(catalogue, extractor, make_loader, data, state):
+    """Следующий опрос пропускает строки, загруженные по уведомлениям, и загружает остальные."""
+    run_etl(extractor, data, make_loader(), state)
+
+    modified = START + timedelta(days=1)
+    changes = catalogue.touch(0.1, modified)
+    extractor.refresh()
+    notified = {table: set(ids) for table, ids in changes.items() if table != 'genre'}
+    loaded = run_changes(extractor, data, make_loader(), notified)
+
+    elastic_loader = make_loader()
+    run_etl(extractor, data, elastic_loader, state, loaded=loaded)
+    genre_films = {
+        film_id for genre_id in changes['genre'] for film_id in catalogue.film_ids('genre', genre_id)
+    }
+    assert elastic_loader.summary()['indexed'] == len(changes['genre']) + len(genre_films)
+    assert state.read_watermark('film_work', 'extract') == (modified, max(changes['film_work']))
+
+
+def test_deleted_documents_forget_hashes(catalogue, extractor, make_loader, data, tmp_path):
+    """После удаления документа его хеш забывается, и вновь созданный документ загружается."""
+    hashes = DbmHashStore(os.path.join(tmp_path, 'hashes'))
+    film_id = catalogue.films[0][0]
+    elastic_loader = make_loader(hashes=hashes)
+    run_changes(extractor, data, elastic_loader, {'film_work': {film_id}})
+    index = elastic_loader._hash_index(Movie)
+    assert hashes.get_many(index, [film_id]) != [None]
+
+    elastic_loader.delete_documents(Movie, [film_id])
+
+    assert hashes.get_many(index, [film_id]) == [None]
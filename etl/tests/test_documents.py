@@ -0,0 +1,41 @@
+import orjson
+import pytest
+
+from models.models import Genre, Movie, Person
+from services.documents import build_documents, encode, validate
+
+
+def model_documents(schema, rows) -> list:
+    """
+    Строит документы через модель pydantic, как до сборки документов без моделей.
+
+    :param schema: Схема документов.
+    :param rows: Строки PostgreSQL.
+    :return: Документы в виде, в котором они уходят в Elasticsearch.
+    """
+    return [orjson.loads(encode(schema(**dict(row)).dict())) for row in rows]
+
+
+@pytest.mark.parametrize('schema', [Movie, Person, Genre])
+def test_documents_match_models(catalogue, extractor, schema):
+    """Документы, собранные без моделей pydantic, совпадают с результатом моделей."""
+    rows = {
+        Movie: lambda: extractor.get_movie_documents([film[0] for film in catalogue.films]),
+        Person: lambda: extractor.get_person_documents([person[0] for person in catalogue.persons]),
+        Genre: lambda: extractor.select_rows('genre', [genre[0] for genre in catalogue.genres]),
+    }[schema]()
+
+    documents = [orjson.loads(encode(document)) for document in build_documents(schema, rows)]
+
+    assert documents == model_documents(schema, rows)
+
+
+def test_sampled_validation_logs_difference(extractor, catalogue, caplog):
+    """Проверка по выборке молчит для верных документов и логирует документ, разошедшийся с моделью."""
+    rows = extractor.get_movie_documents([catalogue.films[0][0]])
+
+    [document] = build_documents(Movie, rows, sample_rate=1)
+    assert not caplog.records
+
+    validate(Movie, rows[0], dict(document, genres_names=[]))
+    assert 'differs from Movie model' in caplog.text
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+import pytest
+from psycopg2.extensions import connection
+
+from core import batching
+from services.base import MIN_UUID, UpdatesNotFoundError
+from services.extract import PostgresExtractor
+
+START = datetime(2021, 6, 16)
+
+# Пары строк с одинаковым modified: порядок внутри пары задает id
+ROWS = [
+    {'id': '00000000-0000-0000-0000-00000000000{0}'.format(num), 'modified': START + timedelta(days=num // 2)}
+    for num in range(1, 6)
+]
+
+
+class KeysetCursor(object):
+    """Курсор, который отвечает на запрос страницы так же, как WHERE (modified, id) > ... LIMIT."""
+
+    def __init__(self, conn: 'KeysetConnection'):
+        self.conn = conn
+        self.rows: List[Dict[str, Any]] = []
+
+    def __enter__(self) -> 'KeysetCursor':
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, query, params):
+        modified, row_id, limit = params
+        self.conn.watermarks.append((modified, row_id))
+        self.rows = [row for row in self.conn.rows if (row['modified'], row['id']) > (modified, row_id)][:limit]
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self.rows
+
+
+class KeysetConnection(connection):
+    """Соединение без сервера PostgreSQL, которое запоминает водяные знаки запросов."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = sorted(rows, key=lambda row: (row['modified'], row['id']))
+        self.watermarks: List[tuple] = []
+
+    def cursor(self, *args, **kwargs) -> KeysetCursor:
+        return KeysetCursor(self)
+
+
+@pytest.fixture(autouse=True)
+def page_size(monkeypatch):
+    """Страницы по две строки."""
+    monkeypatch.setattr(batching, 'EXTRACT', batching.AdaptiveBatch('extract', size=2, min_size=2, max_size=2))
+
+
+def test_select_table_pages_after_watermark():
+    """Страницы идут по (modified, id), и каждая следующая начинается после последней строки предыдущей."""
+    conn = KeysetConnection(ROWS)
+    pages = list(PostgresExtractor(conn).select_table('film_work', (datetime.min, MIN_UUID)))
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row['id'] for page in pages for row in page] == [row['id'] for row in ROWS]
+    assert conn.watermarks == [(datetime.min, MIN_UUID)] + [
+        (page[-1]['modified'], page[-1]['id']) for page in pages
+    ]
+
+
+def test_select_table_resumes_inside_equal_modified():
+    """Водяной знак посреди строк с одинаковым modified не теряет и не повторяет строк."""
+    conn = KeysetConnection(ROWS)
+    watermark = (ROWS[1]['modified'], ROWS[1]['id'])
+    pages = list(PostgresExtractor(conn).select_table('person', watermark))
+
+    assert [row['id'] for page in pages for row in page] == [row['id'] for row in ROWS[2:]]
+
+
+def test_get_updates_without_rows():
+    """Если ни в одной таблице нет строк после водяных знаков, поднимается UpdatesNotFoundError."""
+    last = (ROWS[-1]['modified'], ROWS[-1]['id'])
+    updates = PostgresExtractor(KeysetConnection(ROWS)).get_updates(
+        {table: last for table in PostgresExtractor.TABLES}
+    )
+
+    with pytest.raises(UpdatesNotFoundError):
+        next(updates)
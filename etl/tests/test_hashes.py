@@ -0,0 +1,50 @@
+import os
+
+import fakeredis
+import pytest
+
+from models.models import Genre
+from services.hashes import DbmHashStore, RedisHashStore
+
+GENRES = [
+    {'id': 'genre-{0}'.format(num), 'name': 'Genre {0}'.format(num), 'description': None} for num in range(3)
+]
+
+
+@pytest.fixture(name='hashes', params=['redis', 'dbm'])
+def hashes_fixture(request, tmp_path):
+    """Хранилище хешей каждого вида."""
+    if request.param == 'redis':
+        return RedisHashStore(fakeredis.FakeRedis())
+    return DbmHashStore(os.path.join(tmp_path, 'hashes'))
+
+
+def test_store_round_trip(hashes):
+    """Хеши хранятся отдельно для каждого индекса и удаляются по идентификаторам."""
+    hashes.set_many('genres_1', {'a': '1', 'b': '2'})
+
+    assert hashes.get_many('genres_1', ['a', 'b', 'c']) == ['1', '2', None]
+    assert hashes.get_many('genres_2', ['a']) == [None]
+    hashes.delete_many('genres_1', ['a'])
+    assert hashes.get_many('genres_1', ['a', 'b']) == [None, '2']
+
+
+def test_unchanged_documents_are_skipped(elastic, make_loader, hashes):
+    """Повторная загрузка отправляет только изменившиеся документы."""
+    make_loader(hashes=hashes).bulk_insert(Genre, GENRES)
+
+    elastic_loader = make_loader(hashes=hashes)
+    elastic_loader.bulk_insert(Genre, [dict(GENRES[0], name='Drama')] + GENRES[1:])
+
+    assert elastic_loader.summary() == {'indexed': 1, 'skipped': 2, 'failed': 0}
+    assert sum(elastic.documents.values()) == len(GENRES) + 1
+
+
+def test_new_index_version_loads_everything(make_loader, hashes):
+    """Хеши привязаны к версии индекса, поэтому в новую версию загружаются все документы."""
+    make_loader(hashes=hashes).bulk_insert(Genre, GENRES)
+
+    elastic_loader = make_loader(hashes=hashes, indices={'genres': 'genres_new'})
+    elastic_loader.bulk_insert(Genre, GENRES)
+
+    assert elastic_loader.summary() == {'indexed': len(GENRES), 'skipped': 0, 'failed': 0}
@@ -0,0 +1,60 @@
+import copy
+from dataclasses import dataclass, field
+from typing import Any, Dict
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+
+from services.elasticsearch_index_definitions import INDEX
+from services.indices import MappingMismatchError, check_mappings, mapping_drift
+
+
+@dataclass
+class MappingIndices(object):
+    """
+    Часть API indices, которая отдает маппинги существующих индексов.
+    """
+    mappings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def get_mapping(self, index: str, **kwargs) -> Dict[str, Any]:
+        if index not in self.mappings:
+            raise NotFoundError(404, 'index_not_found_exception', {})
+        return {'{0}_1'.format(index): {'mappings': {'properties': self.mappings[index]}}}
+
+
+@dataclass
+class MappingElasticsearch(object):
+    """
+    Клиент Elasticsearch с маппингами индексов.
+    """
+    indices: MappingIndices = field(default_factory=MappingIndices)
+
+
+def test_current_mappings_pass():
+    """Индексы с маппингами из INDEX и отсутствующие индексы проверку проходят."""
+    elastic = MappingElasticsearch()
+    elastic.indices.mappings = {'movies': copy.deepcopy(INDEX['movies'])}
+
+    check_mappings(elastic)
+
+
+def test_missing_field_is_reported():
+    """Индекс persons без фильмографий нужно перестроить."""
+    persons = copy.deepcopy(INDEX['persons'])
+    del persons['films']
+    elastic = MappingElasticsearch()
+    elastic.indices.mappings = {'persons': persons, 'genres': copy.deepcopy(INDEX['genres'])}
+
+    with pytest.raises(MappingMismatchError) as raised:
+        check_mappings(elastic)
+    assert raised.value.drift == {'persons_1': ['films']}
+    assert 'reindex.py' in str(raised.value)
+
+
+def test_changed_type_is_reported():
+    """Поле другого типа и новое вложенное поле тоже считаются расхождением."""
+    movies = copy.deepcopy(INDEX['movies'])
+    movies['genres'] = {'type': 'keyword'}
+    del movies['actors']['properties']['name']
+
+    assert mapping_drift(INDEX['movies'], movies) == ['genres', 'actors.name']
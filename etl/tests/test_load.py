@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+
+from core.config import ETL_PAR
+from main import run_changes
+from models.models import Genre, Movie
+from services import load
+from services.hashes import DbmHashStore
+
+GENRES = [
+    {'id': 'genre-{0}'.format(num), 'name': 'Genre {0}'.format(num), 'description': None} for num in range(3)
+]
+
+
+def test_partial_update_forgets_movie_hashes(catalogue, extractor, make_loader, data, tmp_path):
+    """После частичного обновления фильм с прежним содержимым загружается заново, а не пропускается."""
+    hashes = DbmHashStore(os.path.join(tmp_path, 'hashes'))
+    film_id = catalogue.films[0][0]
+    run_changes(extractor, data, make_loader(hashes=hashes), {'film_work': {film_id}})
+
+    elastic_loader = make_loader(hashes=hashes)
+    genre_id = catalogue.genres[catalogue.film_genres[0][0]][0]
+    genre_rows = extractor.select_rows('genre', [genre_id])
+    assert elastic_loader.update_movie_genres(genre_rows, catalogue.film_ids('genre', genre_id))
+    assert hashes.get_many(elastic_loader._hash_index(Movie), [film_id]) == [None]
+
+    run_changes(extractor, data, elastic_loader, {'film_work': {film_id}})
+    # Люди фильма не менялись и пропускаются, фильм загружается заново
+    assert elastic_loader.summary()['indexed'] == 1
+
+
+def test_parallel_bulk_retries_only_failed(rejecting_elastic, tmp_path, monkeypatch):
+    """parallel_bulk повторяет только документы, отклоненные с 429 или 5xx."""
+    monkeypatch.setattr(load, 'BULK_RETRY_DELAY', 0)
+    rejecting_elastic.statuses = {'genre-0': [429], 'genre-1': [503, 429]}
+    elastic_loader = load.ElasticLoader(
+        rejecting_elastic, thread_count=2, dead_letter_file=os.path.join(tmp_path, 'dead_letter.jsonl'),
+    )
+
+    elastic_loader.bulk_insert(Genre, GENRES)
+
+    assert elastic_loader.summary() == {'indexed': 3, 'failed': 0}
+    assert rejecting_elastic.attempts == {'genre-0': 2, 'genre-1': 3, 'genre-2': 1}
+
+
+def test_exhausted_retries_go_to_dead_letter(rejecting_elastic, tmp_path, monkeypatch):
+    """Документ, исчерпавший повторы, записывается в dead-letter файл."""
+    monkeypatch.setattr(load, 'BULK_RETRY_DELAY', 0)
+    dead_letter_file = os.path.join(tmp_path, 'dead_letter.jsonl')
+    rejecting_elastic.statuses = {'genre-2': [429, 429, 429]}
+    elastic_loader = load.ElasticLoader(rejecting_elastic, max_retries=2, dead_letter_file=dead_letter_file)
+
+    elastic_loader.bulk_insert(Genre, GENRES)
+
+    assert elastic_loader.summary() == {'indexed': 2, 'failed': 1}
+    with open(dead_letter_file) as file:
+        [record] = [json.loads(line) for line in file]
+    assert (record['id'], record['status']) == ('genre-2', 429)
+
+
+@pytest.mark.parametrize('response, missing, rebuilt', [
+    ({}, 0, False),
+    ({}, 1, True),
+    ({'version_conflicts': 1}, 0, True),
+    ({'failures': [{'cause': 'shard failure'}]}, 0, True),
+])
+def test_partial_update_fallback(catalogue, extractor, elastic, make_loader, data, monkeypatch,
+                                 response, missing, rebuilt):
+    """Фильмы пересобираются целиком, только если частичное обновление дошло не до всех."""
+    monkeypatch.setattr(ETL_PAR, 'partial_updates', True)
+    update_by_query = elastic.update_by_query
+
+    def answer(body, **kwargs):
+        result = dict(update_by_query(body, **kwargs), **response)
+        result['total'] -= missing
+        return result
+
+    monkeypatch.setattr(elastic, 'update_by_query', answer)
+    genre_id = catalogue.genres[0][0]
+    elastic_loader = make_loader()
+
+    run_changes(extractor, data, elastic_loader, {'genre': {genre_id}})
+
+    assert catalogue.film_ids('genre', genre_id)
+    films = len(catalogue.film_ids('genre', genre_id)) if rebuilt else 0
+    assert elastic_loader.summary()['indexed'] == 1 + films
@@ -0,0 +1,56 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from prometheus_client import REGISTRY
+
+from core import metrics
+from models.models import Genre
+
+
+def sample(name: str, **labels: str) -> float:
+    """
+    Возвращает текущее значение метрики; 0, если ее еще нет.
+
+    :param name: Имя образца метрики.
+    :param labels: Метки образца.
+    :return: Значение образца.
+    """
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_batch_counts_rows_and_duration():
+    """Пакет увеличивает счетчик строк этапа и гистограмму длительности."""
+    rows = sample('etl_rows_total', stage='extract', table='test_batch')
+    batches = sample('etl_batch_duration_seconds_count', stage='extract', table='test_batch')
+
+    with metrics.batch('extract', 'test_batch') as batch:
+        batch['rows'] = 7
+
+    assert batch['seconds'] >= 0
+    assert sample('etl_rows_total', stage='extract', table='test_batch') == rows + 7
+    assert sample('etl_batch_duration_seconds_count', stage='extract', table='test_batch') == batches + 1
+
+
+def test_lag():
+    """Отставание считается от времени изменения строки и сбрасывается, когда обновлений нет."""
+    metrics.observe_lag('test_lag', datetime.now() - timedelta(minutes=1))
+    assert 59 <= sample('etl_lag_seconds', table='test_lag') < 120
+
+    metrics.observe_lag('test_lag', None)
+    assert sample('etl_lag_seconds', table='test_lag') == 0
+
+
+def test_loader_documents_and_run_summary(make_loader, tmp_path):
+    """Загрузчик считает документы по индексам, а итоги прохода пишутся в файл метрик."""
+    indexed = sample('etl_documents_total', index='genres', result='indexed')
+    elastic_loader = make_loader()
+    elastic_loader.bulk_insert(Genre, [{'id': 'genre-1', 'name': 'Drama', 'description': None}])
+    metrics_file = os.path.join(tmp_path, 'etl.prom')
+
+    summary = metrics.run_summary(time.monotonic(), True, elastic_loader.summary(), metrics_file)
+
+    assert sample('etl_documents_total', index='genres', result='indexed') == indexed + 1
+    assert summary['updates'] and summary['indexed'] == 1
+    with open(metrics_file) as file:
+        assert 'etl_runs_total{result="updates"}' in file.read()
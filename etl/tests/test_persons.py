@@ -0,0 +1,32 @@
+from main import run_changes
+from models.models import Movie, Person
+
+
+def test_film_change_reloads_its_persons(catalogue, extractor, elastic, make_loader, data):
+    """Изменение фильма пересобирает документы всех его участников."""
+    film_id = catalogue.films[0][0]
+
+    run_changes(extractor, data, make_loader(), {'film_work': {film_id}})
+
+    assert elastic.documents['persons'] == len(set(catalogue.film_person_ids(film_id)))
+
+
+def test_person_documents_carry_filmography(catalogue, extractor, make_loader, data, monkeypatch):
+    """Документ человека содержит его фильмы с ролями, а его фильмы пересобираются."""
+    person_id = next(person[0] for person in catalogue.persons if len(catalogue.film_ids('person', person[0])) > 1)
+    elastic_loader = make_loader()
+    loaded = {}
+    bulk_documents = elastic_loader.bulk_documents
+
+    def record(schema, documents):
+        loaded.setdefault(schema, []).extend(documents)
+        bulk_documents(schema, documents)
+
+    monkeypatch.setattr(elastic_loader, 'bulk_documents', record)
+    run_changes(extractor, data, elastic_loader, {'person': {person_id}})
+
+    [document] = loaded[Person]
+    film_ids = catalogue.film_ids('person', person_id)
+    assert sorted(film['id'] for film in document['films']) == sorted(set(film_ids))
+    assert all(film['roles'] and set(film['roles']) <= {'actor', 'director', 'writer'} for film in document['films'])
+    assert len(loaded[Movie]) == len(set(film_ids))
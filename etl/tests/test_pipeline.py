@@ -0,0 +1,78 @@
+import itertools
+import threading
+
+import pytest
+
+from services.pipeline import Pipeline, Stage
+
+
+def test_run_passes_items_through_stages():
+    """Все элементы проходят этапы с несколькими потоками, None дальше не передается."""
+    results = []
+    lock = threading.Lock()
+
+    def collect(item):
+        with lock:
+            results.append(item)
+
+    pipeline = Pipeline(
+        [
+            Stage('double', lambda item: item * 2, workers=3),
+            Stage('odd', lambda item: item if item % 4 else None, workers=2),
+            Stage('collect', collect),
+        ],
+        queue_size=4,
+    )
+
+    assert pipeline.run(range(100)) == 100
+    assert sorted(results) == [item * 2 for item in range(100) if item % 2]
+
+
+def test_stage_error_stops_pipeline():
+    """Ошибка этапа останавливает бесконечный источник и пробрасывается из run."""
+    error = ValueError('bad batch')
+    handled = []
+
+    def handler(item):
+        if item == 5:
+            raise error
+        handled.append(item)
+
+    pipeline = Pipeline([Stage('load', handler, workers=2)], queue_size=2)
+
+    with pytest.raises(ValueError) as raised:
+        pipeline.run(itertools.count())
+    assert raised.value is error
+    assert 5 not in handled
+
+
+def test_source_error_stops_pipeline():
+    """Ошибка источника останавливает этапы и пробрасывается из run."""
+
+    def source():
+        yield from range(3)
+        raise ConnectionError('postgres is gone')
+
+    handled = []
+    pipeline = Pipeline([Stage('transform', handled.append)])
+
+    with pytest.raises(ConnectionError):
+        pipeline.run(source())
+    assert set(handled) <= {0, 1, 2}
+
+
+def test_pipeline_runs_again_after_error():
+    """После ошибки конвейер сбрасывает остановку и ошибки для следующего запуска."""
+    calls = []
+
+    def handler(item):
+        calls.append(item)
+        if item == 'bad':
+            raise RuntimeError(item)
+
+    pipeline = Pipeline([Stage('load', handler)])
+
+    with pytest.raises(RuntimeError):
+        pipeline.run(['bad'])
+    assert pipeline.run(['good', 'good']) == 2
+    assert calls.count('good') == 2
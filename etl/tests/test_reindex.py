@@ -0,0 +1,139 @@
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List
+
+import pytest
+from elasticsearch.exceptions import NotFoundError
+
+from benchmarks.fakes import FakeElasticsearch, FakeIndices
+from models.models import Person
+from reindex import reindex
+from services import load
+from services.indices import Reindexer, create_indices
+from services.state import EXTRACT_STAGE, LOAD_STAGE
+
+
+@dataclass
+class AliasIndices(FakeIndices):
+    """
+    API indices в памяти с псевдонимами и настройками.
+    """
+    deleted: List[str] = field(default_factory=list)
+
+    def get(self, index: str, **kwargs) -> Dict[str, Any]:
+        found = super().get(index)
+        if not found:
+            raise NotFoundError(404, 'index_not_found_exception', {})
+        return found
+
+    def exists_alias(self, name: str, **kwargs) -> bool:
+        return any(name in body.get('aliases', {}) for body in self.names.values())
+
+    def update_aliases(self, body: Dict[str, Any], **kwargs):
+        for action in body['actions']:
+            (name, params), = action.items()
+            if name == 'add':
+                self.names[params['index']].setdefault('aliases', {})[params['alias']] = {}
+            elif name == 'remove':
+                self.names[params['index']]['aliases'].pop(params['alias'])
+            else:
+                self.delete(params['index'])
+
+    def delete(self, index: str, **kwargs):
+        if self.names.pop(index, None) is not None:
+            self.deleted.append(index)
+
+    def get_settings(self, index: str, **kwargs) -> Dict[str, Any]:
+        return {name: {'settings': {'index': {'number_of_replicas': '1'}}} for name in self.get(index)}
+
+    def put_settings(self, index: str, body: Dict[str, Any], **kwargs):
+        self.names[index]['settings'].update(body['index'])
+
+    def refresh(self, index: str, **kwargs):
+        pass
+
+    def forcemerge(self, index: str, **kwargs):
+        pass
+
+
+@pytest.fixture(name='elastic')
+def elastic_fixture() -> FakeElasticsearch:
+    """Клиент Elasticsearch в памяти с уже опубликованными индексами."""
+    elastic = FakeElasticsearch(indices=AliasIndices())
+    create_indices(elastic)
+    return elastic
+
+
+def aliases(elastic: FakeElasticsearch) -> Dict[str, str]:
+    """
+    Возвращает индексы, на которые указывают псевдонимы.
+
+    :param elastic: Клиент Elasticsearch в памяти.
+    :return: Индексы по псевдонимам.
+    """
+    return {alias: name for name, body in elastic.indices.names.items() for alias in body.get('aliases', {})}
+
+
+def test_reindex_switches_aliases(catalogue, extractor, elastic, state, tmp_path):
+    """Псевдонимы переключаются на новые индексы, старые удаляются, водяные знаки откатываются."""
+    previous = aliases(elastic)
+    ahead = (datetime(2030, 1, 1), '00000000-0000-0000-0000-000000000000')
+    for stage in (EXTRACT_STAGE, LOAD_STAGE):
+        state.write_watermark('film_work', stage, ahead)
+
+    reindexer = Reindexer(elastic)
+    elastic_loader = load.ElasticLoader(
+        elastic, parallel=False, dead_letter_file=os.path.join(tmp_path, 'dead_letter.jsonl'),
+        indices=reindexer.create(),
+    )
+    reindex(extractor, elastic_loader, reindexer, state)
+
+    assert aliases(elastic) == reindexer.targets
+    assert sorted(elastic.indices.deleted) == sorted(previous.values())
+    last_film = max((film[-1], film[0]) for film in catalogue.films)
+    assert state.read_watermark('film_work', EXTRACT_STAGE) == last_film
+    assert state.read_watermark('film_work', LOAD_STAGE) == last_film
+
+
+def test_failed_reindex_rolls_back(catalogue, extractor, elastic, state, tmp_path, monkeypatch):
+    """При сбое новые индексы удаляются, а псевдонимы и водяные знаки остаются прежними."""
+    previous = aliases(elastic)
+    behind = (catalogue.films[0][-1] - timedelta(days=1), catalogue.films[0][0])
+    state.write_watermark('film_work', EXTRACT_STAGE, behind)
+
+    reindexer = Reindexer(elastic)
+    elastic_loader = load.ElasticLoader(
+        elastic, parallel=False, dead_letter_file=os.path.join(tmp_path, 'dead_letter.jsonl'),
+        indices=reindexer.create(),
+    )
+    targets = list(reindexer.targets.values())
+    bulk_insert = elastic_loader.bulk_insert
+
+    def fail_persons(schema, data):
+        if schema is Person:
+            raise RuntimeError('Elasticsearch is unavailable')
+        bulk_insert(schema, data)
+
+    monkeypatch.setattr(elastic_loader, 'bulk_insert', fail_persons)
+    with pytest.raises(RuntimeError):
+        reindex(extractor, elastic_loader, reindexer, state)
+
+    assert aliases(elastic) == previous
+    assert sorted(elastic.indices.deleted) == sorted(targets)
+    assert state.read_watermark('film_work', EXTRACT_STAGE) == behind
+
+
+def test_reindex_after_legacy_last_updated(catalogue, extractor, elastic, state, tmp_path):
+    """Водяные знаки из устаревшего last_updated с часовым поясом сравниваются с водяными знаками строк."""
+    state.write_state('last_updated', datetime(2030, 1, 1, tzinfo=timezone.utc).isoformat())
+
+    reindexer = Reindexer(elastic)
+    elastic_loader = load.ElasticLoader(
+        elastic, parallel=False, dead_letter_file=os.path.join(tmp_path, 'dead_letter.jsonl'),
+        indices=reindexer.create(),
+    )
+    reindex(extractor, elastic_loader, reindexer, state)
+
+    last_film = max((film[-1], film[0]) for film in catalogue.films)
+    assert state.read_watermark('film_work', EXTRACT_STAGE) == last_film
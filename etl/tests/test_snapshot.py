@@ -0,0 +1,62 @@
+import uuid
+
+import orjson
+import pytest
+
+from core import batching
+from services.snapshot import CopyBatches, id_ranges
+
+ROWS = [
+    {'id': 'genre-1', 'name': 'Drama', 'description': 'C:\\path'},
+    {'id': 'genre-2', 'name': 'Комедия', 'description': 'Line "one"\\nline two'},
+    {'id': 'genre-3', 'name': 'Action', 'description': None},
+]
+
+
+def copy_output(rows: list) -> bytes:
+    """
+    Формирует вывод COPY ... TO STDOUT в текстовом формате: JSON по строке, обратная косая черта удвоена.
+
+    :param rows: Строки снимка.
+    :return: Вывод COPY.
+    """
+    return b''.join(orjson.dumps(row).replace(b'\\', b'\\\\') + b'\n' for row in rows)
+
+
+@pytest.fixture(autouse=True)
+def batch_size(monkeypatch):
+    """Пакеты по две строки."""
+    monkeypatch.setattr(batching, 'LOAD', batching.AdaptiveBatch('load', size=2, min_size=2, max_size=2))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 1000])
+def test_copy_batches_parse_chunks(chunk_size):
+    """Строки разбираются при любом делении вывода COPY на фрагменты, в том числе посреди символа."""
+    batches = []
+    output = copy_output(ROWS)
+    copy_batches = CopyBatches(batches.append)
+    for start in range(0, len(output), chunk_size):
+        copy_batches.write(output[start:start + chunk_size])
+    copy_batches.close()
+
+    assert batches == [ROWS[:2], ROWS[2:]]
+    assert copy_batches.rows == len(ROWS)
+
+
+def test_copy_batches_last_line_without_newline():
+    """Последняя строка без перевода строки разбирается при закрытии."""
+    batches = []
+    copy_batches = CopyBatches(batches.append)
+    copy_batches.write(copy_output(ROWS[:1]).rstrip(b'\n').decode())
+    copy_batches.close()
+
+    assert batches == [ROWS[:1]]
+
+
+def test_id_ranges_cover_uuid_space():
+    """Диапазоны идентификаторов смежные и покрывают все пространство UUID."""
+    ranges = id_ranges(4)
+
+    assert ranges[0][0] is None and ranges[-1][1] is None
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    assert uuid.UUID(ranges[2][0]) == uuid.UUID(int=1 << 127)
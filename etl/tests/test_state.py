@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import pytest
+
+from main import run_etl
+from models.models import Movie
+from services import transform
+from services.base import MIN_UUID
+from services.state import EXTRACT_STAGE, LOAD_STAGE
+
+MODIFIED = datetime(2021, 6, 16, 20, 14, 9, 246511)
+
+ROW_ID = '3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff'
+
+
+def test_watermark_round_trip(state):
+    """Водяной знак хранится отдельно для каждой таблицы и этапа."""
+    state.write_watermark('film_work', EXTRACT_STAGE, (MODIFIED, ROW_ID))
+
+    assert state.read_watermark('film_work', EXTRACT_STAGE) == (MODIFIED, ROW_ID)
+    assert state.read_watermark('film_work', LOAD_STAGE) == (datetime.min, MIN_UUID)
+    assert state.read_watermark('person', EXTRACT_STAGE) == (datetime.min, MIN_UUID)
+
+
+def test_legacy_last_updated(state):
+    """Без водяного знака выборка начинается с устаревшего ключа last_updated."""
+    state.write_state('last_updated', MODIFIED.isoformat())
+
+    assert state.read_watermark('genre', EXTRACT_STAGE) == (MODIFIED, MIN_UUID)
+
+
+def test_legacy_last_updated_with_time_zone(state):
+    """Устаревший last_updated с часовым поясом приводится к UTC без пояса, как столбцы modified."""
+    moscow = timezone(timedelta(hours=3))
+    state.write_state('last_updated', MODIFIED.replace(tzinfo=moscow).isoformat())
+
+    modified, _ = state.read_watermark('genre', EXTRACT_STAGE)
+
+    assert modified == MODIFIED - timedelta(hours=3)
+    assert modified < MODIFIED
+
+
+def test_resume_after_failed_load(catalogue, extractor, make_loader, state, monkeypatch):
+    """После сбоя загрузки фильмы остаются в очереди, и следующий запуск загружает их без повторной выборки."""
+    data = transform.DataTransform(fakeredis.FakeRedis())
+    failing = make_loader()
+    bulk_documents = failing.bulk_documents
+
+    def fail_movies(schema, documents):
+        if schema is Movie:
+            raise RuntimeError('Elasticsearch is unavailable')
+        bulk_documents(schema, documents)
+
+    monkeypatch.setattr(failing, 'bulk_documents', fail_movies)
+    with pytest.raises(RuntimeError):
+        run_etl(extractor, data, failing, state)
+
+    last_film = max((film[-1], film[0]) for film in catalogue.films)
+    assert state.read_watermark('film_work', EXTRACT_STAGE) == last_film
+    assert state.read_watermark('film_work', LOAD_STAGE) == (datetime.min, MIN_UUID)
+
+    elastic_loader = make_loader()
+    run_etl(extractor, data, elastic_loader, state)
+
+    assert elastic_loader.summary()['indexed'] == len(catalogue.films) + len(catalogue.persons)
+    assert state.read_watermark('film_work', LOAD_STAGE) == last_film
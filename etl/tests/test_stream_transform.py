@@ -0,0 +1,98 @@
+import fakeredis
+import pytest
+
+from core import batching
+from services.stream_transform import StreamDataTransform
+
+KEY = 'movies'
+
+MOVIE_IDS = ['movie-{0}'.format(num) for num in range(5)]
+
+
+@pytest.fixture(name='redis')
+def redis_fixture(monkeypatch):
+    """Redis в памяти; пакеты потока по два фильма."""
+    monkeypatch.setattr(batching.MOVIES, 'size', 2)
+    return fakeredis.FakeRedis()
+
+
+def produce(redis) -> StreamDataTransform:
+    """
+    Записывает идентификаторы фильмов в поток.
+
+    :param redis: Клиент Redis.
+    :return: Очередь, в которую записаны фильмы.
+    """
+    producer = StreamDataTransform(redis, consumer='producer')
+    for movie_id in MOVIE_IDS:
+        producer.collector(KEY, movie_id)
+    producer.flush()
+    return producer
+
+
+def consume(worker: StreamDataTransform) -> list:
+    """
+    Забирает все пакеты воркера и подтверждает каждый.
+
+    :param worker: Очередь воркера.
+    :return: Полученные пакеты идентификаторов.
+    """
+    batches = []
+    for batch in worker.batcher(KEY):
+        batches.append(sorted(batch))
+        worker.acknowledge(KEY, batch.keys())
+    return batches
+
+
+def pending(redis) -> int:
+    """
+    Возвращает количество неподтвержденных записей группы.
+
+    :param redis: Клиент Redis.
+    :return: Количество записей.
+    """
+    return redis.xpending(StreamDataTransform.stream(KEY), 'etl')['pending']
+
+
+def test_claim_and_ack(redis):
+    """Воркер получает все пакеты, а подтверждение удаляет записи из потока."""
+    produce(redis)
+    batches = consume(StreamDataTransform(redis, consumer='a'))
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(sum(batches, [])) == MOVIE_IDS
+    assert redis.xlen(StreamDataTransform.stream(KEY)) == 0
+    assert pending(redis) == 0
+
+
+def test_unknown_batch_is_not_acked(redis):
+    """Подтверждение пакета, которого не было в батчере, ничего не удаляет."""
+    produce(redis)
+    worker = StreamDataTransform(redis, consumer='a')
+    batch = next(worker.batcher(KEY))
+    worker.acknowledge(KEY, ['movie-unknown'])
+
+    # Все три записи прочитаны одним запросом и ждут подтверждения
+    assert pending(redis) == 3
+    worker.acknowledge(KEY, batch.keys())
+    worker.acknowledge(KEY, batch.keys())
+    assert pending(redis) == 2
+    assert redis.xlen(StreamDataTransform.stream(KEY)) == 2
+
+
+def test_reclaim_after_worker_failure(redis):
+    """Пакет упавшего воркера забирает другой воркер после claim_idle."""
+    produce(redis)
+    failed = StreamDataTransform(redis, consumer='failed', read_count=1)
+    lost = sorted(next(failed.batcher(KEY)))
+
+    patient = StreamDataTransform(redis, consumer='patient', claim_idle=60000)
+    received = consume(patient)
+    assert lost not in received
+    assert pending(redis) == 1
+
+    rescuer = StreamDataTransform(redis, consumer='rescuer', claim_idle=0)
+    assert consume(rescuer) == [lost]
+    assert pending(redis) == 0
+    assert redis.xlen(StreamDataTransform.stream(KEY)) == 0
+    assert sorted(sum(received + [lost], [])) == MOVIE_IDS
@@ -0,0 +1,104 @@
+from typing import Any, Dict, List
+
+import fakeredis
+from psycopg2.extensions import connection
+
+from benchmarks.movie_rows import generate_film
+from models.models import Movie
+from services import transform
+from services.documents import build_documents, movie_template
+from services.extract import MOVIE_DOCUMENTS_QUERY, PostgresExtractor
+from services.transform import DataTransform
+
+
+class RowsConnection(connection):
+    """Соединение без сервера PostgreSQL, которое запоминает запросы и отвечает заданными строками."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        self.rows = rows
+        self.queries: List[tuple] = []
+
+    def __enter__(self) -> 'RowsConnection':
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def cursor(self, *args, **kwargs) -> 'RowsConnection':
+        return self
+
+    def execute(self, query, params):
+        self.queries.append((query, params))
+
+    def fetchall(self) -> List[Dict[str, Any]]:
+        return self.rows
+
+
+def test_aggregated_row_matches_joined_rows():
+    """Одна агрегированная строка фильма дает тот же документ, что и строки LEFT JOIN."""
+    joined, aggregated = generate_film(persons=6, genres=3)
+    data = DataTransform(None, in_memory=True)  # type: ignore[arg-type]
+    movie = movie_template()
+    for row in joined:
+        data.parser(row, movie)
+
+    assert len(joined) == 18
+    assert build_documents(Movie, [aggregated]) == build_documents(Movie, [movie])
+
+
+def test_movie_documents_one_query_per_batch():
+    """Документы пакета фильмов выбираются одним запросом со списком идентификаторов."""
+    _, aggregated = generate_film(persons=6, genres=3)
+    conn = RowsConnection([aggregated])
+
+    rows = PostgresExtractor(conn).get_movie_documents(iter([aggregated['id']]))
+
+    assert rows == [aggregated]
+    assert conn.queries == [(MOVIE_DOCUMENTS_QUERY, {'film_ids': [aggregated['id']]})]
+
+
+def test_collector_flushes_full_buffer():
+    """Идентификаторы копятся в буфере без повторов и уходят в Redis, когда буфер заполнен."""
+    redis = fakeredis.FakeRedis()
+    data = DataTransform(redis, flush_size=3, flush_interval=3600)
+    for film_id in ('a', 'b', 'a'):
+        data.collector('movie_ids', film_id)
+    assert redis.scard('movie_ids') == 0
+
+    data.collector('movie_ids', 'c')
+    assert redis.smembers('movie_ids') == {b'a', b'b', b'c'}
+
+
+def test_flush_splits_sadd(monkeypatch):
+    """Большой буфер уходит несколькими SADD одним конвейером, и очередь разбирается до конца."""
+    monkeypatch.setattr(transform, 'SADD_MEMBERS', 2)
+    redis = fakeredis.FakeRedis()
+    pipelines = []
+    sadd_sizes = []
+    make_pipeline = redis.pipeline
+
+    def pipeline(*args, **kwargs):
+        redis_pipeline = make_pipeline(*args, **kwargs)
+        sadd = redis_pipeline.sadd
+
+        def counted_sadd(key, *members):
+            sadd_sizes.append(len(members))
+            return sadd(key, *members)
+
+        redis_pipeline.sadd = counted_sadd
+        pipelines.append(redis_pipeline)
+        return redis_pipeline
+
+    monkeypatch.setattr(redis, 'pipeline', pipeline)
+    data = DataTransform(redis)
+    film_ids = ['film-{0}'.format(num) for num in range(5)]
+    for film_id in film_ids:
+        data.collector('movie_ids', film_id)
+    data.flush()
+
+    assert len(pipelines) == 1
+    assert sorted(sadd_sizes) == [1, 2, 2]
+    assert redis.scard('movie_ids') == 5
+    for movies in data.batcher('movie_ids'):
+        data.acknowledge('movie_ids', movies.keys())
+    assert redis.scard('movie_ids') == 0
@@ -0,0 +1,63 @@
+import time
+from contextlib import nullcontext
+
+from core import metrics
+from core.config import ELASTIC_PAR, ETL_PAR, POSTGRES_PAR, REDIS_PAR
+from core.logger import logger
+from db.db import con_elastic, con_postgres, con_postgres_pool, con_redis
+from main import get_hash_store, get_transform, load_movies, load_movies_pipeline, load_persons
+from services import extract, indices, load
+
+
+def run_worker(postgres, elasticsearch, redis, postgres_pool=None):
+    """
+    Разбирает потоки фильмов и людей вместе с другими воркерами группы: забирает пакеты, загружает их
+    в Elasticsearch и подтверждает.
+
+    Воркер не читает изменения PostgreSQL и не меняет водяные знаки: записи в поток добавляет main.py.
+
+    :param postgres: Соединение с PostgreSQL.
+    :param elasticsearch: Соединение с Elasticsearch.
+    :param redis: Соединение с Redis.
+    :param postgres_pool: Пул соединений PostgreSQL для конвейерной загрузки фильмов.
+    :raises MappingMismatchError: Если маппинги индексов устарели и их нужно перестроить.
+    """
+    indices.check_mappings(elasticsearch)
+    hashes = get_hash_store(redis)
+    data = get_transform(redis, block=ETL_PAR.stream_block)
+    postgres_extractor = extract.PostgresExtractor(postgres)
+    logger.info('Worker {0} is started.'.format(data.consumer))
+    while True:
+        started = time.monotonic()
+        elastic = load.ElasticLoader(
+            elasticsearch,
+            parallel=ETL_PAR.bulk_mode == 'parallel',
+            thread_count=ETL_PAR.bulk_concurrency,
+            dead_letter_file=ETL_PAR.dead_letter_file,
+            hashes=hashes,
+        )
+        if postgres_pool is not None:
+            loaded = load_movies_pipeline(postgres_pool, data, elastic)
+        else:
+            loaded = load_movies(postgres_extractor, data, elastic)
+        loaded = load_persons(postgres_extractor, data, elastic) or loaded
+        if loaded:
+            metrics.run_summary(started, True, elastic.summary(), ETL_PAR.metrics_file)
+
+
+def main():
+    """
+    Устанавливает соединения с базами данных и запускает воркер загрузки фильмов.
+    """
+    if ETL_PAR.queue != 'stream' or ETL_PAR.collector_in_memory:
+        raise SystemExit('Worker requires ETL_QUEUE=stream and a Redis queue.')
+    metrics.start_metrics_server(ETL_PAR.metrics_port)
+    pool = con_postgres_pool(ETL_PAR.extract_workers, **POSTGRES_PAR) if ETL_PAR.pipeline else nullcontext()
+    with con_postgres(**POSTGRES_PAR) as postgres_conn, pool as postgres_pool:
+        with con_redis(**REDIS_PAR) as redis_conn:
+            with con_elastic(**ELASTIC_PAR) as elastic_conn:
+                run_worker(postgres_conn, elastic_conn, redis_conn, postgres_pool)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,18 @@
+from typing import Any
+
+from fastapi import APIRouter
+
+from services.cache_service import cache_stats
+
+router = APIRouter()
+
+
+@router.get(
+    "/stats",
+    summary="Статистика кеша",
+    description="Попадания в кеш процесса и в Redis для обработавшего запрос процесса",
+    response_description="Счетчики и доли попаданий по уровням кеша",
+    tags=["Кеш"],
+)
+async def cache_statistics() -> dict[str, Any]:
+    return cache_stats.dump()
@@ -1,9 +1,10 @@
 from http import HTTPStatus
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from api.v1.pagination import set_page_headers
 from services.film import FilmService, get_film_service
 from services.films import FilmListService, get_film_list_service
 from services.films_search import (
@@ -27,7 +28,7 @@ class Film(BaseModel):
     title: str
     imdb_rating: float | None
     description: str | None
-    genres: list
+    genres: list[str]
     actors: list
     writers: list
     directors: list
@@ -42,18 +43,25 @@ class Film(BaseModel):
     tags=["Список кинопроизведений"],
 )
 async def film_list(
+        request: Request,
+        response: Response,
         sort: str | None = Query("-imdb_rating"),
         page_size: int = Query(50, ge=1),
         page_number: int = Query(1),
         genre: str = Query(None),
+        cursor: str | None = Query(None),
+        pit: bool = Query(False),
         film_service: FilmListService = Depends(get_film_list_service),
 ) -> list[FilmList]:
-    films = await film_service.get_list(sort, page_size, page_number, genre)
+    films = await film_service.get_list(
+        sort, page_size, page_number, genre, cursor, pit
+    )
     if not films:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="films not found"
         )
-    return [FilmList(**dict(film)) for film in films]
+    set_page_headers(request, response, films)
+    return [FilmList(**dict(film)) for film in films.items]
 
 
 @router.get(
@@ -65,19 +73,26 @@ async def film_list(
     tags=["Полнотекстовый поиск"],
 )
 async def search_film_list(
+        request: Request,
+        response: Response,
         query: str | None = Query(None),
         page_size: int = Query(50, ge=1),
         page_number: int = Query(1),
+        cursor: str | None = Query(None),
+        pit: bool = Query(False),
         film_service: FilmListSearchService = Depends(
             get_film_list_search_service
         ),
 ) -> list[FilmList]:
-    films = await film_service.get_list(query, page_size, page_number)
+    films = await film_service.get_list(
+        query, page_size, page_number, cursor, pit
+    )
     if not films:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="films not found"
         )
-    return [FilmList(**dict(film)) for film in films]
+    set_page_headers(request, response, films)
+    return [FilmList(**dict(film)) for film in films.items]
 
 
 @router.get(
@@ -95,4 +110,5 @@ async def film_details(film_id: str, film_service: FilmService = Depends(get_fil
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="film not found"
         )
-    return Film(**dict(film))
+    # В ответе жанры остаются списком названий
+    return Film(**dict(film, genres=film.genres_names or []))
@@ -1,9 +1,10 @@
 from http import HTTPStatus
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from api.v1.pagination import set_page_headers
 from services.genre import GenreService, get_genre_service
 from services.genres import GenreListService, get_genre_list_service
 
@@ -26,16 +27,23 @@ class Genre(BaseModel):
     tags=["Список жанров"],
 )
 async def genre_list(
+    request: Request,
+    response: Response,
     page_size: int = Query(50, ge=1),
     page_number: int = Query(1),
+    cursor: str | None = Query(None),
+    pit: bool = Query(False),
     genre_service: GenreListService = Depends(get_genre_list_service),
 ) -> list[Genre]:
-    genres = await genre_service.get_list(page_size, page_number)
+    genres = await genre_service.get_list(
+        page_size, page_number, cursor, pit
+    )
     if not genres:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="genres not found"
         )
-    return [Genre(**dict(genre)) for genre in genres]
+    set_page_headers(request, response, genres)
+    return [Genre(**dict(genre)) for genre in genres.items]
 
 
 @router.get(
@@ -0,0 +1,34 @@
+from fastapi import Request, Response
+
+from models.page import Page
+
+
+def set_page_headers(request: Request, response: Response, page: Page) -> None:
+    """Заголовки пагинации: общее количество совпадений, курсор и ссылки на страницы."""
+
+    if page.next_cursor is not None:
+        response.headers["X-Next-Cursor"] = page.next_cursor
+
+    if page.by_cursor or page.total is None:
+        if page.next_cursor is not None:
+            url = request.url.include_query_params(cursor=page.next_cursor)
+            response.headers["Link"] = f'<{url}>; rel="next"'
+        return
+
+    response.headers["X-Total-Count"] = str(page.total)
+    if page.relation != "eq":
+        response.headers["X-Total-Count-Relation"] = page.relation
+
+    pages_total = (page.total + page.page_size - 1) // page.page_size
+    links = {"first": 1}
+    if page.page_number > 1:
+        links["prev"] = min(page.page_number - 1, pages_total)
+    if page.page_number < pages_total:
+        links["next"] = page.page_number + 1
+    if page.relation == "eq":
+        links["last"] = pages_total
+
+    response.headers["Link"] = ", ".join(
+        f'<{request.url.include_query_params(page_number=number)}>; rel="{rel}"'
+        for rel, number in links.items()
+    )
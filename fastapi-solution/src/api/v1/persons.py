@@ -2,9 +2,10 @@ from http import HTTPStatus
 from typing import Any
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from pydantic import BaseModel
 
+from api.v1.pagination import set_page_headers
 from services.person import PersonService, get_person_service
 from services.person_films import (
     PersonFilmListService,
@@ -41,19 +42,26 @@ class PersonFilmList(BaseModel):
     tags=["Полнотекстовый поиск"],
 )
 async def person_list(
+    request: Request,
+    response: Response,
     query: str | None = Query(None),
     page_size: int = Query(50, ge=1),
     page_number: int = Query(1),
+    cursor: str | None = Query(None),
+    pit: bool = Query(False),
     person_service: PersonListSearchService = Depends(
         get_person_list_search_service
     ),
 ) -> list[Person]:
-    persons = await person_service.get_list(query, page_size, page_number)
+    persons = await person_service.get_list(
+        query, page_size, page_number, cursor, pit
+    )
     if not persons:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail="persons not found"
         )
-    return [Person(**dict(person)) for person in persons]
+    set_page_headers(request, response, persons)
+    return [Person(**dict(person)) for person in persons.items]
 
 
 @router.get(
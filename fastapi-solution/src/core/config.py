@@ -13,6 +13,12 @@ class Settings(BaseSettings):
     elastic_schema: str = Field(default="http://", env="ELASTIC_SCHEMA")
     elastic_host: str = Field(default="127.0.0.1", env="ELASTICSEARCH_HOST")
     elastic_port: int = Field(default=9200, env="ELASTICSEARCH_PORT")
+    local_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024, env="LOCAL_CACHE_MAX_BYTES"
+    )
+    local_cache_ttl: float = Field(default=10, env="LOCAL_CACHE_TTL")
+    cache_ttl: dict[str, tuple[int, int]] = Field(default={}, env="CACHE_TTL")
+    cache_beta: float = Field(default=1.0, env="CACHE_BETA")
     base_dir: str = Field(
         default=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
         env="BASE_DIR",
@@ -1,4 +1,5 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI
@@ -8,6 +9,7 @@ from redis.asyncio import Redis
 from api import router
 from core.config import settings
 from db import elastic, redis
+from services.cache_service import listen_invalidations
 
 
 @asynccontextmanager
@@ -20,7 +22,12 @@ async def lifespan(app: FastAPI):
             f"{settings.elastic_port}"
         ]
     )
+    # Подписка на инвалидацию кеша процесса
+    invalidations = asyncio.create_task(listen_invalidations(redis.redis))
     yield
+    invalidations.cancel()
+    with suppress(asyncio.CancelledError):
+        await invalidations
     # Отключение от баз при выключении сервера
     await redis.redis.close()
     await elastic.es.close()
@@ -4,10 +4,16 @@ from uuid import UUID
 from pydantic import BaseModel
 
 
+class FilmGenre(BaseModel):
+    id: UUID | str
+    name: str
+
+
 class Film(BaseModel):
     id: UUID | str
     imdb_rating: float | None
-    genres: list[str] | None
+    genres: list[FilmGenre] | None
+    genres_names: list[str] | None = None
     title: str
     description: str | None
     directors_names: list[str] | None
@@ -0,0 +1,13 @@
+from typing import Any
+
+from pydantic import BaseModel
+
+
+class Page(BaseModel):
+    items: list[Any]
+    total: int | None = None
+    relation: str = "eq"
+    page_number: int
+    page_size: int
+    next_cursor: str | None = None
+    by_cursor: bool = False
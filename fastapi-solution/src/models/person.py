@@ -13,6 +13,13 @@ class PersonBase(BaseModel):
             self.id = str(self.id)
 
 
+class PersonFilm(BaseModel):
+    id: UUID | str
+    title: str
+    imdb_rating: float | None
+    roles: list[str] = []
+
+
 class Person(BaseModel):
     id: UUID | str
     full_name: str
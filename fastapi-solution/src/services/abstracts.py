@@ -1,43 +1,75 @@
+import asyncio
 import json
+import time
 from abc import ABC, abstractmethod
 from http import HTTPStatus
-from typing import Any
+from typing import Any, Awaitable, Callable
 
-from elasticsearch import NotFoundError
+from elasticsearch import BadRequestError
 from fastapi import HTTPException
 
 from core.logger import log
 from models.film import Film
 from models.genre import Genre
-from models.person import Person
-from services.cache_service import CacheService
+from models.page import Page
+from models.person import Person, PersonFilm
+from services.cache_service import LOCK_POLL_IN_SECONDS, CacheEntry, CacheService
 from services.elasticsearch_service import ElasticsearchService
 from services.es_queries import common, persons_in_films
+from services.tools.cursor import decode_cursor, encode_cursor
+from services.tools.person_films_dict import films_dict
+
+# Глубина постраничного доступа (index.max_result_window в Elasticsearch)
+MAX_RESULT_WINDOW = 10000
+
+# Время жизни point-in-time между запросами страниц по курсору
+PIT_KEEP_ALIVE = "1m"
+
+# Заполнение ключей кеша, которые сейчас выполняются в этом процессе
+_in_flight: dict[str, asyncio.Task] = {}
+
+# Фоновые обновления устаревших записей; промахи их не ждут: обновление,
+# уступившее блокировку другому процессу, возвращает None
+_revalidating: dict[str, asyncio.Task] = {}
 
 
 class PageNumberPagination:
-    async def get_pages_total(self, docs_total: int, page_size: int) -> int:
-        """Определение количества страниц."""
-        pages_total = (docs_total + page_size - 1) // page_size
-        return pages_total
+    async def validate_page(self, page_number: int, page_size: int) -> int:
+        """Проверка номера страницы до запроса; возвращает размер страницы в пределах окна."""
+
+        offset = (page_number - 1) * page_size
+        if page_number < 1 or offset >= MAX_RESULT_WINDOW:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail="page not found"
+            )
+        return min(page_size, MAX_RESULT_WINDOW - offset)
 
-    async def validate_pages(
+    async def get_page(
             self,
-            docs_total: int,
+            docs: dict[str, Any],
+            items: list[Any],
+            query_body: dict,
             page_number: int,
-            pages_total: int,
             page_size: int,
-    ) -> int:
-        """Метод валидации количества страниц."""
+    ) -> Page | None:
+        """Сборка страницы с общим количеством совпадений и курсором следующей страницы."""
 
-        if page_number < 1 or page_number > pages_total:
-            raise HTTPException(
-                status_code=HTTPStatus.NOT_FOUND, detail="page not found"
-            )
-        if page_number == pages_total:
-            page_size_last = docs_total - (page_size * (pages_total - 1))
-            return page_size_last
-        return page_size
+        if not items:
+            return None
+        hits = docs["hits"]["hits"]
+        next_cursor = None
+        if len(hits) == query_body["size"] and "sort" in hits[-1]:
+            next_cursor = encode_cursor(hits[-1]["sort"], docs.get("pit_id"))
+        total = docs["hits"].get("total")
+        return Page(
+            items=items,
+            total=total["value"] if total else None,
+            relation=total["relation"] if total else "eq",
+            page_number=page_number,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            by_cursor="search_after" in query_body or "pit" in query_body,
+        )
 
 
 class AbstractService(ABC):
@@ -50,60 +82,234 @@ class AbstractService(ABC):
             "film": Film,
             "genre": Genre,
             "person": Person,
+            "person_film": PersonFilm,
         }
 
-    async def get_from_cache(self, key: str, model: str, is_list: bool = False) -> Any:
-        """Получение данных из кеша."""
-        object_ = self._models[model]
-        data = await self.cache_service.get(key)
-        if not data:
-            return None
+    async def single_flight(
+            self,
+            key: str | None,
+            model: str,
+            fetch: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Чтение из кеша; при промахе Elasticsearch запрашивает один запрос на ключ."""
+
+        if key is None:
+            return await fetch()
+
+        entry = await self.cache_service.get(key)
+        if entry is not None:
+            # Устаревшая запись отдается сразу, а обновляется в фоне
+            if entry.should_refresh(self.cache_service.policy.beta):
+                self._revalidate(key, model, fetch, entry)
+            return self._loads(entry.data, model)
+
+        # Запросы этого процесса ждут одно заполнение ключа
+        task = _in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fill(key, model, fetch))
+            _in_flight[key] = task
+            task.add_done_callback(lambda _: _in_flight.pop(key, None))
+        return await asyncio.shield(task)
+
+    def _revalidate(
+            self,
+            key: str,
+            model: str,
+            fetch: Callable[[], Awaitable[Any]],
+            stale: CacheEntry,
+    ) -> None:
+        """Запуск фонового обновления записи, если ее еще никто не обновляет."""
+
+        if key in _in_flight or key in _revalidating:
+            return
+
+        def done(task: asyncio.Task) -> None:
+            _revalidating.pop(key, None)
+            if not task.cancelled() and task.exception() is not None:
+                log.warning("\nCache refresh of '%s' failed: %s\n", key, task.exception())
+
+        task = asyncio.ensure_future(self._fill(key, model, fetch, stale))
+        _revalidating[key] = task
+        task.add_done_callback(done)
+
+    async def _fill(
+            self,
+            key: str,
+            model: str,
+            fetch: Callable[[], Awaitable[Any]],
+            stale: CacheEntry | None = None,
+    ) -> Any:
+        """Заполнение ключа под блокировкой Redis, общей для всех процессов."""
+
+        while True:
+            token = await self.cache_service.acquire_lock(key)
+            if token is not None:
+                try:
+                    entry = await self.cache_service.get(key, local=False)
+                    if entry is not None and (
+                        stale is None
+                        or entry.soft_expires_at > stale.soft_expires_at
+                    ):
+                        return self._loads(entry.data, model)
+
+                    started = time.monotonic()
+                    data = await fetch()
+                    if data:
+                        await self.cache_service.set(
+                            key,
+                            self._dumps(data, model),
+                            time.monotonic() - started,
+                        )
+                    return data
+                finally:
+                    await self.cache_service.release_lock(key, token)
+
+            # Запись уже обновляет другой процесс
+            if stale is not None:
+                return None
 
-        if is_list:
-            collection = [object_(**row) for row in json.loads(data.decode())]
-            return collection
-        return object_.parse_raw(data)
+            await asyncio.sleep(LOCK_POLL_IN_SECONDS)
+            entry = await self.cache_service.get(key, local=False)
+            if entry is not None:
+                return self._loads(entry.data, model)
 
-    async def put_to_cache(self, key: str, data: list | Film, model: str) -> None:
-        """Сохранение данных в кеш."""
+    def _loads(self, data: bytes, model: str) -> Any:
+        """Разбор данных из кеша."""
         object_ = self._models[model]
-        if isinstance(data, list):
-            serialized_data = json.dumps(
-                [dict(object_(**dict(item))) for item in data]
-            )
-        else:
-            serialized_data = data.json()
+        parsed = json.loads(data.decode())
+        if isinstance(parsed, list):
+            return [object_(**row) for row in parsed]
+        return object_(**parsed)
 
-        await self.cache_service.set(key, serialized_data)
+    def _dumps(self, data: list | Film, model: str) -> str:
+        """Сериализация данных для кеша."""
+        object_ = self._models[model]
+        if isinstance(data, list):
+            return json.dumps([object_(**dict(item)).model_dump(mode="json") for item in data])
+        return data.json()
 
 
 class PersonFilmsMixin(AbstractService):
-    async def _get_person_films(self, person_id: str) -> list[dict[str, Any]]:
-        """Метод сборки кинопроизведений по персоне."""
+    async def _get_persons_films(
+            self, person_ids: list[str]
+    ) -> dict[str, list[Film]]:
+        """Метод сборки кинопроизведений по нескольким персонам одним запросом."""
 
-        index_ = "movies"
+        if not person_ids:
+            return {}
 
-        query_body = common.get_query()
-        query_body["query"] = persons_in_films.get_query(person_id)
-        try:
-            log.info("\nGeting films from elasticsearch.\n")
-            docs = await self.es_service.search(
-                index=index_,
-                body=query_body,
-            )
-            films_person = [Film(**doc["_source"]) for doc in docs]
+        bodies = []
+        for person_id in person_ids:
+            query_body = common.get_query()
+            query_body["query"] = persons_in_films.get_query(person_id)
+            bodies.append(query_body)
 
-        except NotFoundError:
-            return None
+        log.info("\nGetting films of %s persons from elasticsearch.\n", len(bodies))
+        responses = await self.es_service.msearch("movies", bodies)
 
-        log.debug("\nfilms_person: \n%s\n", films_person)
+        return {
+            person_id: [Film(**doc["_source"]) for doc in docs]
+            for person_id, docs in zip(person_ids, responses)
+        }
 
-        return films_person
+    async def _get_filmography(
+            self, person_id: str, source: dict[str, Any] | None
+    ) -> list[PersonFilm]:
+        """Метод получения фильмографии персоны из ее документа или из фильмов."""
+
+        filmographies = await self._get_filmographies(
+            [source if source is not None else {"id": person_id}]
+        )
+        return filmographies[person_id]
+
+    async def _get_filmographies(
+            self, sources: list[dict[str, Any]]
+    ) -> dict[str, list[PersonFilm]]:
+        """Метод получения фильмографий персон: из документов или одним msearch по фильмам."""
+
+        filmographies = {
+            source["id"]: [PersonFilm(**film) for film in source["films"]]
+            for source in sources
+            if "films" in source
+        }
+        missing = [
+            source["id"] for source in sources if "films" not in source
+        ]
+        persons_films = await self._get_persons_films(missing)
+        for person_id, person_films in persons_films.items():
+            films = [dict(film) for film in person_films]
+            roles = films_dict(person_id, films)
+            filmographies[person_id] = [
+                PersonFilm(**film, roles=film_roles["roles"])
+                for film, film_roles in zip(films, roles)
+            ]
+
+        return filmographies
 
 
 class AbstractListService(AbstractService, PageNumberPagination):
     """Абстрактный класс для работы со списком сущностей."""
 
+    async def search_page(
+            self,
+            index: str,
+            query_body: dict,
+            page_number: int,
+            page_size: int,
+            cursor: str | None = None,
+            pit: bool = False,
+    ) -> dict[str, Any]:
+        """Поиск страницы по номеру (from) или по курсору (search_after и point-in-time)."""
+
+        sort = query_body.get("sort") or (["_score"] if "query" in query_body else [])
+        query_body["sort"] = [*sort, {"id": "asc"}]
+
+        if cursor is None and not pit:
+            query_body["size"] = await self.validate_page(page_number, page_size)
+            query_body["from"] = (page_number - 1) * page_size
+            return await self.es_service.search_page(index, query_body)
+
+        query_body.pop("from", None)
+        query_body["size"] = min(page_size, MAX_RESULT_WINDOW)
+        pit_id = None
+        if cursor is not None:
+            data = decode_cursor(cursor)
+            query_body["search_after"] = data["search_after"]
+            pit_id = data.get("pit")
+        if pit and pit_id is None:
+            pit_id = await self.es_service.open_point_in_time(
+                index, PIT_KEEP_ALIVE
+            )
+        if pit_id is not None:
+            query_body["pit"] = {"id": pit_id, "keep_alive": PIT_KEEP_ALIVE}
+            index = None
+
+        try:
+            return await self.es_service.search_page(
+                index, query_body, track_total_hits=False
+            )
+        except BadRequestError:
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor"
+            )
+
+    def _loads(self, data: bytes, model: str) -> Page:
+        """Разбор страницы из кеша."""
+        object_ = self._models[model]
+        page = json.loads(data.decode())
+        page["items"] = [object_(**row) for row in page["items"]]
+        return Page(**page)
+
+    def _dumps(self, page: Page, model: str) -> str:
+        """Сериализация страницы для кеша."""
+        object_ = self._models[model]
+        return json.dumps(
+            {
+                **page.model_dump(exclude={"items"}),
+                "items": [object_(**dict(item)).model_dump(mode="json") for item in page.items],
+            }
+        )
+
     @abstractmethod
     async def get_list(self, *args, **kwargs) -> Any:
         pass
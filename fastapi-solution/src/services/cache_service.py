@@ -1,27 +1,210 @@
+import asyncio
+import math
+import os
+import random
+import time
+import uuid
 from typing import Any
 
 from redis.asyncio import Redis
+from redis.exceptions import RedisError
 
+from core.config import settings
 from core.logger import log
+from services.local_cache import LocalCache
 
 CACHE_EXPIRE_IN_SECONDS = 60 * 5
 
+# Время жизни записей по группам эндпоинтов: (мягкое, жесткое) в секундах.
+# После мягкого срока запись отдается и обновляется в фоне, после жесткого удаляется.
+# Переопределяется переменной окружения CACHE_TTL в формате JSON.
+CACHE_TTL = {
+    "films": (60, CACHE_EXPIRE_IN_SECONDS),
+    "search": (30, CACHE_EXPIRE_IN_SECONDS),
+    "persons": (120, CACHE_EXPIRE_IN_SECONDS * 2),
+    "genres": (600, CACHE_EXPIRE_IN_SECONDS * 12),
+}
+
+# Канал, по которому процессы сообщают друг другу об измененных ключах
+INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Пауза перед повторной подпиской после потери соединения с Redis
+RESUBSCRIBE_DELAY_IN_SECONDS = 1
+
+# Идентификатор процесса в сообщениях об инвалидации
+PROCESS_ID = uuid.uuid4().hex
+
+# Время жизни блокировки, под которой один процесс заполняет ключ
+LOCK_EXPIRE_IN_MILLISECONDS = 10 * 1000
+
+# Интервал, с которым ожидающие процессы проверяют, заполнен ли ключ
+LOCK_POLL_IN_SECONDS = 0.05
+
+# Снятие блокировки только ее владельцем
+RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+local_cache = LocalCache(
+    max_bytes=settings.local_cache_max_bytes,
+    ttl=settings.local_cache_ttl,
+)
+
+
+class CacheStats:
+    """Счетчики попаданий по уровням кеша в текущем процессе."""
+
+    def __init__(self):
+        self.local_hits = 0
+        self.local_misses = 0
+        self.redis_hits = 0
+        self.redis_misses = 0
+
+    def dump(self) -> dict[str, Any]:
+        """Счетчики и доли попаданий по уровням."""
+        local_total = self.local_hits + self.local_misses
+        redis_total = self.redis_hits + self.redis_misses
+        return {
+            "pid": os.getpid(),
+            "local": {
+                "hits": self.local_hits,
+                "misses": self.local_misses,
+                "hit_ratio": self.local_hits / local_total if local_total else 0.0,
+                "keys": len(local_cache),
+                "bytes": local_cache.size,
+            },
+            "redis": {
+                "hits": self.redis_hits,
+                "misses": self.redis_misses,
+                "hit_ratio": self.redis_hits / redis_total if redis_total else 0.0,
+            },
+        }
+
+
+cache_stats = CacheStats()
+
+
+class CachePolicy:
+    """Мягкое и жесткое время жизни записей и коэффициент раннего обновления."""
+
+    def __init__(self, soft_ttl: int, hard_ttl: int, beta: float):
+        self.soft_ttl = soft_ttl
+        self.hard_ttl = hard_ttl
+        self.beta = beta
+
+    @classmethod
+    def for_family(cls, family: str) -> "CachePolicy":
+        """Политика группы эндпоинтов с учетом настроек окружения."""
+        soft_ttl, hard_ttl = settings.cache_ttl.get(family, CACHE_TTL[family])
+        return cls(soft_ttl, hard_ttl, settings.cache_beta)
+
+
+class CacheEntry:
+    """Запись кеша: данные, срок мягкого устаревания и время их получения."""
+
+    def __init__(self, data: bytes, soft_expires_at: float, delta: float):
+        self.data = data
+        self.soft_expires_at = soft_expires_at
+        self.delta = delta
+
+    @classmethod
+    def parse(cls, value: bytes) -> "CacheEntry":
+        """Разбор записи: заголовок "<мягкий срок> <время получения>" и данные."""
+        header, _, data = value.partition(b"\n")
+        try:
+            soft_expires_at, delta = map(float, header.split())
+        except ValueError:
+            # Запись без заголовка считается устаревшей
+            return cls(value, 0.0, 0.0)
+        return cls(data, soft_expires_at, delta)
+
+    def dump(self) -> bytes:
+        """Сериализация записи."""
+        header = f"{self.soft_expires_at:.3f} {self.delta:.3f}\n"
+        return header.encode() + self.data
+
+    def should_refresh(self, beta: float) -> bool:
+        """Пора ли обновлять запись: вероятностное раннее обновление до мягкого срока."""
+        early = -self.delta * beta * math.log(1.0 - random.random())
+        return time.time() + early >= self.soft_expires_at
+
 
 class CacheService:
     """Сервис для управления кэшем."""
 
-    def __init__(self, redis: Redis):
+    def __init__(
+            self,
+            redis: Redis,
+            family: str | None = None,
+            local: LocalCache = local_cache,
+    ):
         self.redis = redis
+        self.policy = (
+            CachePolicy.for_family(family)
+            if family is not None
+            else CachePolicy(
+                CACHE_EXPIRE_IN_SECONDS, CACHE_EXPIRE_IN_SECONDS, settings.cache_beta
+            )
+        )
+        self.local = local
 
-    async def get(self, key: str) -> Any:
-        """Получение данных из кеша."""
-        data = await self.redis.get(key)
-        if not data:
+    async def get(self, key: str, local: bool = True) -> CacheEntry | None:
+        """Получение записи из кеша процесса или из Redis."""
+        if local:
+            value = self.local.get(key)
+            if value is not None:
+                cache_stats.local_hits += 1
+                return CacheEntry.parse(value)
+            cache_stats.local_misses += 1
+
+        value = await self.redis.get(key)
+        if not value:
+            cache_stats.redis_misses += 1
             return None
+        cache_stats.redis_hits += 1
         log.info("\nGetting data from redis.\n")
-        return data
+        self.local.set(key, value)
+        return CacheEntry.parse(value)
 
-    async def set(self, key: str, data: str, expire: int = CACHE_EXPIRE_IN_SECONDS) -> None:
-        """Сохранение данных в кэше."""
-        await self.redis.set(key, data, expire)
+    async def set(self, key: str, data: str, delta: float = 0.0) -> None:
+        """Сохранение данных в кэше и оповещение остальных процессов."""
+        entry = CacheEntry(
+            data.encode(), time.time() + self.policy.soft_ttl, delta
+        )
+        value = entry.dump()
+        await self.redis.set(key, value, self.policy.hard_ttl)
         log.info("\nThe data is placed in redis.\n")
+        self.local.set(key, value, self.policy.hard_ttl)
+        await self.redis.publish(INVALIDATION_CHANNEL, f"{PROCESS_ID}:{key}")
+
+    async def acquire_lock(self, key: str) -> str | None:
+        """Захват блокировки заполнения ключа; возвращает токен владельца."""
+        token = uuid.uuid4().hex
+        acquired = await self.redis.set(
+            f"lock: {key}", token, nx=True, px=LOCK_EXPIRE_IN_MILLISECONDS
+        )
+        return token if acquired else None
+
+    async def release_lock(self, key: str, token: str) -> None:
+        """Снятие блокировки заполнения ключа."""
+        await self.redis.eval(RELEASE_LOCK_SCRIPT, 1, f"lock: {key}", token)
+
+
+async def listen_invalidations(redis: Redis, local: LocalCache = local_cache) -> None:
+    """Удаление из кеша процесса ключей, измененных другими процессами."""
+    while True:
+        try:
+            async with redis.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Сообщения, пропущенные без подписки, не придут: кеш сбрасывается
+                local.clear()
+                async for message in pubsub.listen():
+                    sender, _, key = message["data"].decode().partition(":")
+                    if sender != PROCESS_ID:
+                        local.delete(key)
+        except RedisError:
+            log.warning("\nCache invalidation channel is lost, resubscribing.\n")
+            await asyncio.sleep(RESUBSCRIBE_DELAY_IN_SECONDS)
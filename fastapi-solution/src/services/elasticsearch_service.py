@@ -1,9 +1,13 @@
 from typing import Any, List, Dict
 
-from elasticsearch import AsyncElasticsearch, NotFoundError
+from elasticsearch import ApiError, AsyncElasticsearch, NotFoundError
+from elasticsearch.exceptions import HTTP_EXCEPTIONS
 
 from core.logger import log
 
+# Предел точного подсчета совпадений в ответе поиска
+TRACK_TOTAL_HITS = 10000
+
 
 class ElasticsearchService:
     """Сервис для работы с Elasticsearch."""
@@ -20,10 +24,47 @@ class ElasticsearchService:
         except NotFoundError:
             return None
 
-    async def count(self, index: str) -> int:
-        """Получение количества документов в индексе."""
-        data = await self.elastic.count(index=index)
-        return int(data["count"])
+    async def search_page(
+            self,
+            index: str | None,
+            body: dict,
+            track_total_hits: int | bool = TRACK_TOTAL_HITS,
+    ) -> Dict[str, Any]:
+        """Поиск в Elasticsearch с общим количеством совпадений."""
+        log.info("\nGetting page from Elasticsearch.\n")
+        return await self.elastic.search(
+            index=index, body=body, track_total_hits=track_total_hits
+        )
+
+    async def open_point_in_time(self, index: str, keep_alive: str) -> str:
+        """Открытие point-in-time для согласованного обхода страниц."""
+        data = await self.elastic.open_point_in_time(
+            index=index, keep_alive=keep_alive
+        )
+        return data["id"]
+
+    async def msearch(
+            self, index: str, bodies: List[dict]
+    ) -> List[List[Dict[str, Any]]]:
+        """Несколько поисков в Elasticsearch одним запросом."""
+        if not bodies:
+            return []
+        log.info("\nGetting data from Elasticsearch with msearch.\n")
+        searches = []
+        for body in bodies:
+            searches.extend(({}, body))
+        data = await self.elastic.msearch(index=index, searches=searches)
+        # Ошибка отдельного поиска не должна стать пустым результатом в кеше
+        for response in data["responses"]:
+            if "error" in response:
+                status = response.get("status", 500)
+                raise HTTP_EXCEPTIONS.get(status, ApiError)(
+                    message=str(response["error"]), meta=data.meta, body=response
+                )
+        return [
+            response.get("hits", {}).get("hits", [])
+            for response in data["responses"]
+        ]
 
     async def get(self, index: str, id) -> Dict[str, Any]:
         return await self.elastic.get(index=index, id=id)
@@ -11,7 +11,7 @@ def generation_query_body(page_size, page_number, query):
                 "fields": [
                     "title^3",
                     "description^2",
-                    "genres",
+                    "genres_names",
                     "directors_names",
                     "actors_names",
                     "writers_names",
@@ -22,12 +22,13 @@ class FilmService(AbstractItemService):
         log.info("\nGetting film '%s'.\n", film_id)
 
         key = f"Film: id: {str(film_id)}"
-        film = await self.get_from_cache(key, "film")
+        film = await self.single_flight(
+            key,
+            "film",
+            lambda: self._get_item_from_elastic(film_id),
+        )
         if not film:
-            film = await self._get_item_from_elastic(film_id)
-            if not film:
-                return None
-            await self.put_to_cache(key, film, "film")
+            return None
 
         return film
 
@@ -49,6 +50,6 @@ def get_film_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> FilmService:
     """Провайдер FilmService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "films")
     es_service = ElasticsearchService(elastic)
     return FilmService(cache_service, es_service)
@@ -1,7 +1,6 @@
 from functools import lru_cache
-from typing import List
 
-from elasticsearch import AsyncElasticsearch
+from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
 
@@ -9,6 +8,7 @@ from core.logger import log
 from db.elastic import get_elastic
 from db.redis import get_redis
 from models.film import Film
+from models.page import Page
 from services.abstracts import AbstractListService
 from services.cache_service import CacheService
 from services.elasticsearch_service import ElasticsearchService
@@ -24,23 +24,27 @@ class FilmListService(AbstractListService):
             page_size: int,
             page_number: int,
             genre_uuid: str | None,
-    ) -> List[Film] | None:
-        """Основной метод получения списка кинопроизведений."""
+            cursor: str | None = None,
+            pit: bool = False,
+    ) -> Page | None:
+        """Основной метод получения страницы кинопроизведений."""
         log.info("\nGetting films.\n")
 
-        key = (
-            f"FilmList: sort: {sort_field}, size: {page_size}, "
-            f"page: {page_number}, genre_uuid: {genre_uuid}"
+        key = None
+        if cursor is None and not pit:
+            key = (
+                f"FilmList: sort: {sort_field}, size: {page_size}, "
+                f"page: {page_number}, genre_uuid: {genre_uuid}"
+            )
+        films = await self.single_flight(
+            key,
+            "film",
+            lambda: self._get_list_from_elastic(
+                sort_field, page_size, page_number, genre_uuid, cursor, pit
+            ),
         )
-        films = await self.get_from_cache(key, "film", is_list=True)
         if not films:
-            films = await self._get_list_from_elastic(
-                sort_field, page_size, page_number, genre_uuid
-            )
-            if not films:
-                return None
-
-            await self.put_to_cache(key, films, "film")
+            return None
 
         return films
 
@@ -50,45 +54,31 @@ class FilmListService(AbstractListService):
             page_size: int,
             page_number: int,
             genre_uuid: str | None,
-    ) -> List[Film] | None:
-        """Метод получения списка кинопроизведений из Elasticsearch."""
+            cursor: str | None,
+            pit: bool,
+    ) -> Page | None:
+        """Метод получения страницы кинопроизведений из Elasticsearch."""
 
         index_ = "movies"
-        docs_total = await self.es_service.count(index_)
-        pages_total = await self.get_pages_total(docs_total, page_size)
-        page_size = await self.validate_pages(docs_total, page_number, pages_total, page_size)
-        page_size = min(page_size, docs_total - (page_size * (page_number - 1)))
 
         query_body = common.get_query(page_size, page_number, sort_field)
 
         if genre_uuid is not None:
-            genre_name = await self._get_genre_name_from_id(genre_uuid)
-            if genre_name is None:
-                return None
-
-            query_body["query"] = {"match": {"genres": genre_name}}
+            query_body["query"] = {
+                "bool": {"filter": [{"term": {"genres.id": genre_uuid}}]}
+            }
 
         log.info("\nquery_body: \n%s\n", query_body)
 
-        docs = await self.es_service.search(index_, query_body)
-        if not docs:
-            return None
-
-        films = [Film(**doc["_source"]) for doc in docs]
-        return films
-
-    async def _get_genre_name_from_id(self, genre_id: str):
-        """Метод получения названия жанра по id."""
-        index_ = "genres"
-        query_body = common.get_query()
-        query_body["query"] = {"match": {"id": genre_id}}
-
-        docs = await self.es_service.search(index_, query_body)
-        if not docs:
+        try:
+            docs = await self.search_page(
+                index_, query_body, page_number, page_size, cursor, pit
+            )
+        except NotFoundError:
             return None
 
-        genre_name = docs[0]["_source"]["name"]
-        return genre_name
+        films = [Film(**doc["_source"]) for doc in docs["hits"]["hits"]]
+        return await self.get_page(docs, films, query_body, page_number, page_size)
 
 
 @lru_cache()
@@ -97,6 +87,6 @@ def get_film_list_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> FilmListService:
     """Провайдер FilmListService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "films")
     es_service = ElasticsearchService(elastic)
     return FilmListService(cache_service, es_service)
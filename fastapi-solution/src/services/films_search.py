@@ -1,5 +1,4 @@
 from functools import lru_cache
-from typing import List
 
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
@@ -9,6 +8,7 @@ from core.logger import log
 from db.elastic import get_elastic
 from db.redis import get_redis
 from models.film import Film
+from models.page import Page
 from services.abstracts import AbstractListService
 from services.cache_service import CacheService
 from services.elasticsearch_service import ElasticsearchService
@@ -23,18 +23,24 @@ class FilmListSearchService(AbstractListService):
             query: str | None,
             page_size: int,
             page_number: int,
-    ) -> List[Film] | None:
-        """Основной метод получения списка кинопроизведений."""
+            cursor: str | None = None,
+            pit: bool = False,
+    ) -> Page | None:
+        """Основной метод получения страницы кинопроизведений."""
         log.info("\nGetting films.\n")
 
-        key = f"FilmSearch: {query}, size: {page_size}, page: {page_number}"
-        films = await self.get_from_cache(key, "film", is_list=True)
+        key = None
+        if cursor is None and not pit:
+            key = f"FilmSearch: {query}, size: {page_size}, page: {page_number}"
+        films = await self.single_flight(
+            key,
+            "film",
+            lambda: self._get_list_from_elastic(
+                query, page_size, page_number, cursor, pit
+            ),
+        )
         if not films:
-            films = await self._get_list_from_elastic(query, page_size, page_number)
-            if not films:
-                return None
-
-            await self.put_to_cache(key, films, "film")
+            return None
 
         return films
 
@@ -43,12 +49,11 @@ class FilmListSearchService(AbstractListService):
             query: str | None,
             page_size: int,
             page_number: int,
-    ) -> List[Film] | None:
-        """Метод получения списка кинопроизведений из Elasticsearch."""
+            cursor: str | None,
+            pit: bool,
+    ) -> Page | None:
+        """Метод получения страницы кинопроизведений из Elasticsearch."""
         index_ = "movies"
-        docs_total = await self.es_service.count(index_)
-        pages_total = await self.get_pages_total(docs_total, page_size)
-        page_size = await self.validate_pages(docs_total, page_number, pages_total, page_size)
 
         query_body = generation_query_body(page_size, page_number, query)
 
@@ -56,14 +61,16 @@ class FilmListSearchService(AbstractListService):
 
         try:
             log.info("\nSearching films from Elasticsearch.\n")
-            docs = await self.es_service.elastic.search(index=index_, body=query_body)
+            docs = await self.search_page(
+                index_, query_body, page_number, page_size, cursor, pit
+            )
             films = [Film(**doc["_source"]) for doc in docs["hits"]["hits"]]
         except NotFoundError:
             return None
 
         log.debug("\ndocs: \n%s\n", docs["hits"]["hits"])
 
-        return films
+        return await self.get_page(docs, films, query_body, page_number, page_size)
 
 
 @lru_cache()
@@ -72,6 +79,6 @@ def get_film_list_search_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> FilmListSearchService:
     """Провайдер FilmListSearchService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "search")
     es_service = ElasticsearchService(elastic)
     return FilmListSearchService(cache_service, es_service)
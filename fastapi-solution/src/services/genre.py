@@ -21,13 +21,13 @@ class GenreService(AbstractItemService):
         log.info("\nGetting genre '%s'.\n", genre_id)
 
         key = f"Genre: id: {genre_id}"
-        genre = await self.get_from_cache(key, "genre")
+        genre = await self.single_flight(
+            key,
+            "genre",
+            lambda: self._get_item_from_elastic(genre_id),
+        )
         if not genre:
-            genre = await self._get_item_from_elastic(genre_id)
-            if not genre:
-                return None
-
-            await self.put_to_cache(key, genre, "genre")
+            return None
 
         return genre
 
@@ -48,6 +48,6 @@ def get_genre_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> GenreService:
     """Провайдер GenreService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "genres")
     es_service = ElasticsearchService(elastic)
     return GenreService(cache_service, es_service)
@@ -0,0 +1,51 @@
+import time
+from collections import OrderedDict
+
+
+class LocalCache:
+    """Кеш процесса в памяти: вытеснение по LRU, время жизни и лимит объема."""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.size = 0
+        self._data: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    def get(self, key: str) -> bytes | None:
+        """Получение значения, если оно есть и не устарело."""
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None) -> None:
+        """Сохранение значения с вытеснением давно не использованных."""
+        item_size = len(key) + len(value)
+        self.delete(key)
+        if item_size > self.max_bytes:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        self._data[key] = (time.monotonic() + ttl, value)
+        self.size += item_size
+        while self.size > self.max_bytes:
+            old_key, (_, old_value) = self._data.popitem(last=False)
+            self.size -= len(old_key) + len(old_value)
+
+    def delete(self, key: str) -> None:
+        """Удаление значения."""
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= len(key) + len(item[1])
+
+    def clear(self) -> None:
+        """Очистка кеша."""
+        self._data.clear()
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
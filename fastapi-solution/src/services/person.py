@@ -11,7 +11,7 @@ from models.person import Person
 from services.abstracts import AbstractItemService, PersonFilmsMixin
 from services.cache_service import CacheService
 from services.elasticsearch_service import ElasticsearchService
-from services.tools.person_films_dict import films_dict
+from services.tools.person_films_dict import films_roles
 
 
 class PersonService(AbstractItemService, PersonFilmsMixin):
@@ -23,13 +23,13 @@ class PersonService(AbstractItemService, PersonFilmsMixin):
         log.info("\nGetting person '%s'.\n", person_id)
 
         key = f"Person: id: {str(person_id)}"
-        person = await self.get_from_cache(key, "person")
+        person = await self.single_flight(
+            key,
+            "person",
+            lambda: self._get_item_from_elastic(person_id),
+        )
         if not person:
-            person = await self._get_item_from_elastic(person_id)
-
-            if not person:
-                return None
-            await self.put_to_cache(key, person, "person")
+            return None
 
         return person
 
@@ -38,16 +38,16 @@ class PersonService(AbstractItemService, PersonFilmsMixin):
         try:
             log.info("\nGetting person from elasticsearch\n")
             doc = await self.es_service.get(index="persons", id=person_id)
-
-            films = [
-                dict(film) for film in await self._get_person_films(person_id)
-            ]
-
-            films_person = films_dict(person_id, films)
         except NotFoundError:
             return None
 
-        person = Person(**doc["_source"], films=films_person)
+        source = doc["_source"]
+        films = await self._get_filmography(person_id, source)
+        person = Person(
+            id=source["id"],
+            full_name=source["full_name"],
+            films=films_roles(films),
+        )
 
         return person
 
@@ -58,6 +58,6 @@ def get_person_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> PersonService:
     """Провайдер PersonService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "persons")
     es_service = ElasticsearchService(elastic)
     return PersonService(cache_service, es_service)
@@ -1,6 +1,4 @@
 from functools import lru_cache
-from typing import Any
-
 from elasticsearch import AsyncElasticsearch, NotFoundError
 from fastapi import Depends
 from redis.asyncio import Redis
@@ -8,7 +6,7 @@ from redis.asyncio import Redis
 from core.logger import log
 from db.elastic import get_elastic
 from db.redis import get_redis
-from models.film import Film
+from models.person import PersonFilm
 from services.abstracts import AbstractItemService, PersonFilmsMixin
 from services.cache_service import CacheService
 from services.elasticsearch_service import ElasticsearchService
@@ -17,36 +15,34 @@ from services.elasticsearch_service import ElasticsearchService
 class PersonFilmListService(AbstractItemService, PersonFilmsMixin):
     """Класс для работы со списком кинопроизведений персоны"""
 
-    async def get_by_id(self, person_id: str) -> list[Film] | None:
+    async def get_by_id(self, person_id: str) -> list[PersonFilm] | None:
         """Основной метод получения списка кинопроизведений персоны."""
 
         log.info("\nGetting person '%s'.\n", person_id)
 
         key = f"PersonFilms: id: {str(person_id)}"
-        person_films = await self.get_from_cache(key, "film", is_list=True)
+        person_films = await self.single_flight(
+            key,
+            "person_film",
+            lambda: self._get_item_from_elastic(person_id),
+        )
         if not person_films:
-            person_films = await self._get_item_from_elastic(person_id)
-
-            if not person_films:
-                return None
-
-            await self.put_to_cache(key, person_films, "film")
+            return None
 
         return person_films
 
     async def _get_item_from_elastic(
             self, person_id: str
-    ) -> list[dict[str, Any]] | None:
+    ) -> list[PersonFilm] | None:
         """Метод получения списка кинопроизведений персоны из elasticsearch."""
         try:
             log.info("\nGetting person from elasticsearch.\n")
-
-            person_films = await self._get_person_films(person_id)
-
+            doc = await self.es_service.get(index="persons", id=person_id)
+            source = doc["_source"]
         except NotFoundError:
-            return None
+            source = None
 
-        return person_films
+        return await self._get_filmography(person_id, source)
 
 
 @lru_cache()
@@ -55,6 +51,6 @@ def get_person_film_list_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> PersonFilmListService:
     """Провайдер FilmListService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "persons")
     es_service = ElasticsearchService(elastic)
     return PersonFilmListService(cache_service, es_service)
@@ -7,13 +7,13 @@ from redis.asyncio import Redis
 from core.logger import log
 from db.elastic import get_elastic
 from db.redis import get_redis
-from models.film import Film
-from models.person import Person, PersonBase
+from models.page import Page
+from models.person import Person
 from services.abstracts import AbstractListService, PersonFilmsMixin
 from services.cache_service import CacheService
 from services.elasticsearch_service import ElasticsearchService
 from services.es_queries import common
-from services.tools.person_films_dict import films_dict
+from services.tools.person_films_dict import films_roles
 
 
 class PersonListSearchService(AbstractListService, PersonFilmsMixin):
@@ -24,22 +24,25 @@ class PersonListSearchService(AbstractListService, PersonFilmsMixin):
             query: str | None,
             page_size: int,
             page_number: int,
-    ) -> list[Film] | None:
-        """Основной метод получения списка персон."""
+            cursor: str | None = None,
+            pit: bool = False,
+    ) -> Page | None:
+        """Основной метод получения страницы персон."""
 
         log.info("\nGetting persons.\n")
 
-        key = f"PersonSearch: {query}, size: {page_size}, page: {page_number}"
-        persons = await self.get_from_cache(key, "person", is_list=True)
+        key = None
+        if cursor is None and not pit:
+            key = f"PersonSearch: {query}, size: {page_size}, page: {page_number}"
+        persons = await self.single_flight(
+            key,
+            "person",
+            lambda: self._get_list_from_elastic(
+                query, page_size, page_number, cursor, pit
+            ),
+        )
         if not persons:
-            persons = await self._get_list_from_elastic(
-                query, page_size, page_number
-            )
-
-            if not persons:
-                return None
-
-            await self.put_to_cache(key, persons, "person")
+            return None
 
         return persons
 
@@ -48,13 +51,12 @@ class PersonListSearchService(AbstractListService, PersonFilmsMixin):
             query: str | None,
             page_size: int,
             page_number: int,
-    ) -> list[Person] | None:
-        """Метод получения списка персон из elasticsearch."""
+            cursor: str | None,
+            pit: bool,
+    ) -> Page | None:
+        """Метод получения страницы персон из elasticsearch."""
 
         index_ = "persons"
-        docs_total = await self.es_service.count(index_)
-        pages_total = await self.get_pages_total(docs_total, page_size)
-        page_size = await self.validate_pages(docs_total, page_number, pages_total, page_size)
 
         query_body = common.get_query(page_size, page_number, None)
 
@@ -72,34 +74,26 @@ class PersonListSearchService(AbstractListService, PersonFilmsMixin):
 
         try:
             log.info("\nSearching persons from elasticsearch\n")
-            docs = await self.es_service.search(
-                index=index_,
-                body=query_body,
+            docs = await self.search_page(
+                index_, query_body, page_number, page_size, cursor, pit
             )
-            persons_query = [
-                PersonBase(**doc["_source"]) for doc in docs
-            ]
-
-            persons = []
-            for person in persons_query:
-                person_id = dict(person)["id"]
-                films = [
-                    dict(film)
-                    for film in await self._get_person_films(person_id)
-                ]
-                films_person = films_dict(person_id, films)
-                person_temp = Person(
-                    **dict(person),
-                    films=films_person,
+            sources = [doc["_source"] for doc in docs["hits"]["hits"]]
+            filmographies = await self._get_filmographies(sources)
+            persons = [
+                Person(
+                    id=source["id"],
+                    full_name=source["full_name"],
+                    films=films_roles(filmographies[source["id"]]),
                 )
-                persons.append(person_temp)
+                for source in sources
+            ]
 
         except NotFoundError:
             return None
 
-        log.debug("\ndocs: \n%s\n", docs)
+        log.debug("\ndocs: \n%s\n", docs["hits"]["hits"])
 
-        return persons
+        return await self.get_page(docs, persons, query_body, page_number, page_size)
 
 
 @lru_cache()
@@ -108,6 +102,6 @@ def get_person_list_search_service(
         elastic: AsyncElasticsearch = Depends(get_elastic),
 ) -> PersonListSearchService:
     """PersonListSearchService."""
-    cache_service = CacheService(redis)
+    cache_service = CacheService(redis, "search")
     es_service = ElasticsearchService(elastic)
     return PersonListSearchService(cache_service, es_service)
@@ -0,0 +1,32 @@
+import base64
+import binascii
+import json
+from http import HTTPStatus
+from typing import Any
+
+from fastapi import HTTPException
+
+
+def encode_cursor(search_after: list[Any], pit_id: str | None = None) -> str:
+    """Функция сборки непрозрачного курсора следующей страницы."""
+
+    data = {"search_after": search_after}
+    if pit_id is not None:
+        data["pit"] = pit_id
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict[str, Any]:
+    """Функция разбора курсора: значения search_after и id point-in-time."""
+
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        data = json.loads(raw)
+        if not isinstance(data.get("search_after"), list):
+            raise ValueError(cursor)
+    except (binascii.Error, UnicodeDecodeError, ValueError, AttributeError):
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail="invalid cursor"
+        )
+    return data
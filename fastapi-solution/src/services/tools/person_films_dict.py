@@ -22,3 +22,9 @@ def films_dict(
         films_person.append(film_temp)
 
     return films_person
+
+
+def films_roles(films: list[Any]) -> list[dict[str, Any]]:
+    """Функция сборки словаря фильмов персоны из ее фильмографии."""
+
+    return [{"id": film.id, "roles": film.roles} for film in films]
@@ -11,10 +11,21 @@ from core.conftest import (
     redis_client,
     redis_get_data,
 )
-from testdata.films import generate_films, index_
-from testdata.films_queries import films_list_queries, films_search_queries
+from testdata.films import (
+    generate_films,
+    genre_sci_fi,
+    index_,
+)
+from testdata.films_queries import (
+    films_cursor_invalid_queries,
+    films_cursor_queries,
+    films_list_queries,
+    films_pages_queries,
+    films_search_queries,
+)
 from testdata.genres import genre_action
 from testdata.genres import index_ as genres_index
+from utils.links import parse_links
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -34,7 +45,7 @@ async def test_films(
     film_id_wrong = f"{film_id}none"
 
     search_urn = f"/api/v1/films/{film_id}"
-    status, _, _ = await make_get_request(search_urn)
+    status, _, body = await make_get_request(search_urn)
     key = f"Film: id: {str(film_id)}"
     cashed_data = await redis_get_data(key)
     search_urn_wrong = f"/api/v1/films/{film_id_wrong}"
@@ -43,6 +54,9 @@ async def test_films(
     cashed_data_wrong = await redis_get_data(key_wrong)
 
     assert status == HTTPStatus.OK
+    assert body["id"] == film_id
+    assert body["genres"] == es_data[0]["genres_names"]
+    assert body["actors"] == es_data[0]["actors"]
     assert cashed_data == True
     assert status_wrong == HTTPStatus.NOT_FOUND
     assert cashed_data_wrong == False
@@ -92,6 +106,113 @@ async def test_films_list(
     assert cashed_data == expected_answer["cashed_data"]
 
 
+@pytest.mark.parametrize("query_data, expected_answer", films_pages_queries)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_films_pages(
+    es_write_data,
+    make_get_request,
+    query_data,
+    expected_answer,
+) -> None:
+    """Test films list pagination headers."""
+
+    es_data = generate_films(120) + generate_films(30, [genre_sci_fi])
+    bulk_query = [
+        {"_index": index_, "_id": row["id"], "_source": row} for row in es_data
+    ]
+    await es_write_data(index_, bulk_query)
+
+    search_urn = "/api/v1/films"
+    status, headers, body = await make_get_request(search_urn, query_data)
+    total = headers.get("X-Total-Count")
+
+    assert status == expected_answer["status"]
+    assert len(body) == expected_answer["length"]
+    assert total == (
+        None
+        if expected_answer["total"] is None
+        else str(expected_answer["total"])
+    )
+    assert "X-Total-Count-Relation" not in headers
+    assert parse_links(headers.get("Link")) == expected_answer["links"]
+
+
+@pytest.mark.parametrize("query_data, expected_answer", films_cursor_queries)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_films_cursor(
+    es_write_data,
+    make_get_request,
+    query_data,
+    expected_answer,
+) -> None:
+    """Test films list cursor pagination against page numbers."""
+
+    es_data = generate_films(120)
+    bulk_query = [
+        {"_index": index_, "_id": row["id"], "_source": row} for row in es_data
+    ]
+    await es_write_data(index_, bulk_query)
+
+    search_urn = "/api/v1/films"
+    status, headers, body = await make_get_request(search_urn, query_data)
+    pages = [body]
+    while cursor := headers.get("X-Next-Cursor"):
+        status_next, headers, body = await make_get_request(
+            search_urn, {**query_data, "cursor": cursor}
+        )
+        if status_next == HTTPStatus.NOT_FOUND:
+            break
+        assert status_next == HTTPStatus.OK
+        assert "X-Total-Count" not in headers
+        assert parse_links(headers.get("Link"), "cursor") == (
+            {"next": headers["X-Next-Cursor"]}
+            if "X-Next-Cursor" in headers
+            else {}
+        )
+        pages.append(body)
+
+    offset_query = {
+        key: value for key, value in query_data.items() if key != "pit"
+    }
+    for page_number, page in enumerate(pages, start=1):
+        _, _, offset_body = await make_get_request(
+            search_urn, {**offset_query, "page_number": page_number}
+        )
+        assert [film["id"] for film in page] == [
+            film["id"] for film in offset_body
+        ]
+
+    ids = [film["id"] for page in pages for film in page]
+    assert status == expected_answer["status"]
+    assert len(pages) == expected_answer["pages"]
+    assert len(ids) == len(set(ids)) == expected_answer["length"]
+
+
+@pytest.mark.parametrize(
+    "query_data, expected_answer", films_cursor_invalid_queries
+)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_films_cursor_invalid(
+    es_write_data,
+    make_get_request,
+    query_data,
+    expected_answer,
+) -> None:
+    """Test films list with a malformed cursor."""
+
+    es_data = generate_films(10)
+    bulk_query = [
+        {"_index": index_, "_id": row["id"], "_source": row} for row in es_data
+    ]
+    await es_write_data(index_, bulk_query)
+
+    search_urn = "/api/v1/films"
+    status, _, body = await make_get_request(search_urn, query_data)
+
+    assert status == expected_answer["status"]
+    assert body["detail"] == expected_answer["detail"]
+
+
 @pytest.mark.parametrize("query_data, expected_answer", films_search_queries)
 @pytest.mark.asyncio(loop_scope="session")
 async def test_films_search(
@@ -13,7 +13,11 @@ from core.conftest import (
 )
 from testdata.films import person_in_films
 from testdata.persons import generate_persons, index_
-from testdata.persons_queries import persons_search_queries
+from testdata.persons_queries import (
+    persons_pages_queries,
+    persons_search_queries,
+)
+from utils.links import parse_links
 
 
 @pytest.mark.asyncio(loop_scope="session")
@@ -111,3 +115,33 @@ async def test_persons_search(
     assert status == expected_answer["status"]
     assert len(body) == expected_answer["length"]
     assert cashed_data == expected_answer["cashed_data"]
+
+
+@pytest.mark.parametrize("query_data, expected_answer", persons_pages_queries)
+@pytest.mark.asyncio(loop_scope="session")
+async def test_persons_pages(
+    es_write_data,
+    make_get_request,
+    query_data,
+    expected_answer,
+) -> None:
+    """Test persons search pagination headers."""
+
+    es_data = generate_persons(10)
+    bulk_query = [
+        {"_index": index_, "_id": row["id"], "_source": row} for row in es_data
+    ]
+    await es_write_data(index_, bulk_query)
+
+    search_urn = "/api/v1/persons/search"
+    status, headers, body = await make_get_request(search_urn, query_data)
+    total = headers.get("X-Total-Count")
+
+    assert status == expected_answer["status"]
+    assert len(body) == expected_answer["length"]
+    assert total == (
+        None
+        if expected_answer["total"] is None
+        else str(expected_answer["total"])
+    )
+    assert parse_links(headers.get("Link")) == expected_answer["links"]
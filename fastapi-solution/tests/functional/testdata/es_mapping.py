@@ -6,7 +6,14 @@ ES_MAPPING = {
                 "imdb_rating": {"type": "float"},
                 "title": {"type": "text"},
                 "description": {"type": "text"},
-                "genres": {"type": "text"},
+                "genres": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "keyword"},
+                        "name": {"type": "keyword"},
+                    },
+                },
+                "genres_names": {"type": "keyword"},
                 "directors_names": {"type": "text"},
                 "actors_names": {"type": "text"},
                 "writers_names": {"type": "text"},
@@ -50,6 +57,15 @@ ES_MAPPING = {
                 "full_name": {"type": "text"},
                 "roles": {"type": "keyword"},
                 "film_ids": {"type": "keyword"},
+                "films": {
+                    "type": "object",
+                    "properties": {
+                        "id": {"type": "keyword"},
+                        "title": {"type": "text"},
+                        "imdb_rating": {"type": "float"},
+                        "roles": {"type": "keyword"},
+                    },
+                },
             }
         }
     },
@@ -3,19 +3,28 @@ from random import random
 
 person_in_films = {"id": "ef86b8ff-3c82-4d31-ad8e-72b69f4e3f95", "name": "Ann"}
 
+genre_action = {"id": "6c162475-c7ed-4461-9184-001ef3d9f26e", "name": "Action"}
+genre_sci_fi = {"id": "6a0a479b-cfec-41ac-b520-41b2b007b611", "name": "Sci-Fi"}
+
 index_ = "movies"
 
 
-def generate_films(quantity: int = 1) -> list[dict]:
+def generate_films(
+    quantity: int = 1, genres: list[dict] | None = None
+) -> list[dict]:
     """The function of generating movies for tests."""
 
+    if genres is None:
+        genres = [genre_action, genre_sci_fi]
+
     films = [
         {
             "id": str(uuid.uuid4()),
             "imdb_rating": round(random() * 10, 1),
             "title": "The Star",
             "description": "New World",
-            "genres": ["Action", "Sci-Fi"],
+            "genres": genres,
+            "genres_names": [genre["name"] for genre in genres],
             "directors_names": ["Stan"],
             "actors_names": ["Ann", "Bob"],
             "writers_names": ["Ben", "Howard"],
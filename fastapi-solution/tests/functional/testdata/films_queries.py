@@ -53,6 +53,71 @@ films_list_queries = [
     ),
 ]
 
+# 120 films of Action and Sci-Fi and 30 films of Sci-Fi only
+films_pages_queries = [
+    (
+        {"page_size": 60},
+        {
+            "status": HTTPStatus.OK,
+            "length": 60,
+            "total": 150,
+            "links": {"first": 1, "next": 2, "last": 3},
+        },
+    ),
+    (
+        {"page_size": 60, "page_number": 3},
+        {
+            "status": HTTPStatus.OK,
+            "length": 30,
+            "total": 150,
+            "links": {"first": 1, "prev": 2, "last": 3},
+        },
+    ),
+    (
+        {"page_size": 60, "genre": "6c162475-c7ed-4461-9184-001ef3d9f26e"},
+        {
+            "status": HTTPStatus.OK,
+            "length": 60,
+            "total": 120,
+            "links": {"first": 1, "next": 2, "last": 2},
+        },
+    ),
+    (
+        {
+            "page_size": 60,
+            "page_number": 2,
+            "genre": "6c162475-c7ed-4461-9184-001ef3d9f26e",
+        },
+        {
+            "status": HTTPStatus.OK,
+            "length": 60,
+            "total": 120,
+            "links": {"first": 1, "prev": 1, "last": 2},
+        },
+    ),
+    (
+        {"page_size": 60, "genre": "6a0a479b-cfec-41ac-b520-41b2b007b611"},
+        {
+            "status": HTTPStatus.OK,
+            "length": 60,
+            "total": 150,
+            "links": {"first": 1, "next": 2, "last": 3},
+        },
+    ),
+    (
+        {"page_size": 60, "page_number": 4},
+        {"status": HTTPStatus.NOT_FOUND, "length": 1, "total": None, "links": {}},
+    ),
+    (
+        {"page_size": 60, "page_number": 0},
+        {"status": HTTPStatus.NOT_FOUND, "length": 1, "total": None, "links": {}},
+    ),
+    (
+        {"page_size": 100, "page_number": 101},
+        {"status": HTTPStatus.NOT_FOUND, "length": 1, "total": None, "links": {}},
+    ),
+]
+
 films_search_queries = [
     (
         {"query": "The Star"},
@@ -79,3 +144,50 @@ films_search_queries = [
         {"status": HTTPStatus.NOT_FOUND, "length": 1, "cashed_data": False},
     ),
 ]
+
+films_cursor_queries = [
+    (
+        {"page_size": 40},
+        {"status": HTTPStatus.OK, "pages": 3, "length": 120},
+    ),
+    (
+        {"page_size": 45, "pit": "true"},
+        {"status": HTTPStatus.OK, "pages": 3, "length": 120},
+    ),
+    (
+        {"sort": "imdb_rating", "page_size": 35},
+        {"status": HTTPStatus.OK, "pages": 4, "length": 120},
+    ),
+    (
+        {
+            "sort": "imdb_rating",
+            "page_size": 25,
+            "genre": "6c162475-c7ed-4461-9184-001ef3d9f26e",
+            "pit": "true",
+        },
+        {"status": HTTPStatus.OK, "pages": 5, "length": 120},
+    ),
+]
+
+films_cursor_invalid_queries = [
+    (
+        {"cursor": "not a cursor"},
+        {"status": HTTPStatus.BAD_REQUEST, "detail": "invalid cursor"},
+    ),
+    (
+        {"cursor": "eyJhIjoxfQ"},
+        {"status": HTTPStatus.BAD_REQUEST, "detail": "invalid cursor"},
+    ),
+    (
+        {"cursor": "eyJzZWFyY2hfYWZ0ZXIiOiJ4In0"},
+        {"status": HTTPStatus.BAD_REQUEST, "detail": "invalid cursor"},
+    ),
+    (
+        {"cursor": "WzEsMl0"},
+        {"status": HTTPStatus.BAD_REQUEST, "detail": "invalid cursor"},
+    ),
+    (
+        {"cursor": "eyJzZWFyY2hfYWZ0ZXIiOls5LjUsImEiLCJiIiwiYyJdfQ"},
+        {"status": HTTPStatus.BAD_REQUEST, "detail": "invalid cursor"},
+    ),
+]
@@ -13,6 +13,15 @@ def generate_persons(quantity: int = 1) -> list[dict]:
             "full_name": "John",
             "roles": choice([["Actor"], ["Writer"], ["Director"]]),
             "film_ids": [str(uuid.uuid4()) for _ in range(choice([1, 2, 3]))],
+            "films": [
+                {
+                    "id": str(uuid.uuid4()),
+                    "title": "The Star",
+                    "imdb_rating": 8.5,
+                    "roles": choice([["actor"], ["writer"], ["director"]]),
+                }
+                for _ in range(choice([1, 2, 3]))
+            ],
         }
         for _ in range(quantity)
     ]
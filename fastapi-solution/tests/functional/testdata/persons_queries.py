@@ -22,3 +22,42 @@ persons_search_queries = [
         {"status": HTTPStatus.NOT_FOUND, "length": 1, "cashed_data": False},
     ),
 ]
+
+# 10 persons named John
+persons_pages_queries = [
+    (
+        {"query": "John", "page_size": 4},
+        {
+            "status": HTTPStatus.OK,
+            "length": 4,
+            "total": 10,
+            "links": {"first": 1, "next": 2, "last": 3},
+        },
+    ),
+    (
+        {"query": "John", "page_size": 4, "page_number": 2},
+        {
+            "status": HTTPStatus.OK,
+            "length": 4,
+            "total": 10,
+            "links": {"first": 1, "prev": 1, "next": 3, "last": 3},
+        },
+    ),
+    (
+        {"query": "John", "page_size": 4, "page_number": 3},
+        {
+            "status": HTTPStatus.OK,
+            "length": 2,
+            "total": 10,
+            "links": {"first": 1, "prev": 2, "last": 3},
+        },
+    ),
+    (
+        {"query": "John", "page_size": 4, "page_number": 4},
+        {"status": HTTPStatus.NOT_FOUND, "length": 1, "total": None, "links": {}},
+    ),
+    (
+        {"query": "John", "page_size": 5000, "page_number": 3},
+        {"status": HTTPStatus.NOT_FOUND, "length": 1, "total": None, "links": {}},
+    ),
+]
@@ -0,0 +1,16 @@
+import re
+from urllib.parse import parse_qs, urlsplit
+
+LINK_PATTERN = re.compile(r'<([^>]+)>; rel="(\w+)"')
+
+
+def parse_links(header: str | None, param: str = "page_number") -> dict:
+    """Map each rel of a Link header to the value of a query parameter."""
+
+    if not header:
+        return {}
+    links = {}
+    for url, rel in LINK_PATTERN.findall(header):
+        value = parse_qs(urlsplit(url).query)[param][0]
+        links[rel] = int(value) if value.isdigit() else value
+    return links
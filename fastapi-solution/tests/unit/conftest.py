@@ -0,0 +1,99 @@
+import asyncio
+import time
+from typing import Any
+
+import pytest
+
+from services import abstracts
+from services.abstracts import AbstractService
+from services.cache_service import CacheEntry, CachePolicy
+
+
+class StubCacheService:
+    """Cache service that keeps entries and fill locks in memory."""
+
+    def __init__(self, policy: CachePolicy):
+        self.policy = policy
+        self.entries: dict[str, CacheEntry] = {}
+        self.locks: dict[str, str] = {}
+        self.lock_count = 0
+
+    async def get(self, key: str, local: bool = True) -> CacheEntry | None:
+        return self.entries.get(key)
+
+    async def set(self, key: str, data: str, delta: float = 0.0) -> None:
+        self.entries[key] = CacheEntry(
+            data.encode(), time.time() + self.policy.soft_ttl, delta
+        )
+
+    async def acquire_lock(self, key: str) -> str | None:
+        if key in self.locks:
+            return None
+        self.lock_count += 1
+        token = str(self.lock_count)
+        self.locks[key] = token
+        return token
+
+    async def release_lock(self, key: str, token: str) -> None:
+        if self.locks.get(key) == token:
+            del self.locks[key]
+
+
+class StubElasticsearchService:
+    """Elasticsearch service that counts queries and holds them on a gate."""
+
+    def __init__(self):
+        self.calls = 0
+        self.gate = asyncio.Event()
+        self.gate.set()
+        self.error: Exception | None = None
+        self.result: list[Any] = []
+
+    async def search(self) -> list[Any]:
+        self.calls += 1
+        await self.gate.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class FrozenClock:
+    """Wall clock that moves only when a test moves it."""
+
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class StubService(AbstractService):
+    """Service with the cache-aside logic of AbstractService and nothing else."""
+
+
+@pytest.fixture(name="clock")
+def clock(monkeypatch) -> FrozenClock:
+    """Frozen time.time fixture."""
+    frozen = FrozenClock(1_700_000_000.0)
+    monkeypatch.setattr(time, "time", frozen)
+    return frozen
+
+
+@pytest.fixture(name="cache_service")
+def cache_service() -> StubCacheService:
+    """In-memory cache service fixture."""
+    return StubCacheService(CachePolicy(soft_ttl=60, hard_ttl=300, beta=1.0))
+
+
+@pytest.fixture(name="es_service")
+def es_service() -> StubElasticsearchService:
+    """Counting Elasticsearch service fixture."""
+    return StubElasticsearchService()
+
+
+@pytest.fixture(name="service")
+def service(cache_service, es_service) -> StubService:
+    """Service under test fixture."""
+    yield StubService(cache_service, es_service)
+    abstracts._in_flight.clear()
+    abstracts._revalidating.clear()
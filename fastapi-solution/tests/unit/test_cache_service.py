@@ -0,0 +1,83 @@
+import math
+import random
+
+import fakeredis
+import pytest
+
+from services.cache_service import CacheEntry, CachePolicy, CacheService
+from services.local_cache import LocalCache
+
+KEY = "FilmList: sort: -imdb_rating, size: 50, page: 1, genre_uuid: None"
+
+
+@pytest.fixture(name="redis")
+def redis() -> fakeredis.FakeAsyncRedis:
+    """In-memory Redis fixture."""
+    return fakeredis.FakeAsyncRedis()
+
+
+@pytest.mark.asyncio
+async def test_soft_and_hard_ttl(redis, clock, monkeypatch) -> None:
+    """An entry goes stale at the soft TTL and lives in Redis until the hard TTL."""
+
+    monkeypatch.setattr(random, "random", lambda: 0.0)
+    cache = CacheService(redis, "films", LocalCache(max_bytes=1024, ttl=10))
+    cache.policy = CachePolicy(soft_ttl=60, hard_ttl=300, beta=1.0)
+    started = clock.now
+    await cache.set(KEY, "[]", 0.5)
+
+    entry = await cache.get(KEY, local=False)
+    assert entry.data == b"[]"
+    assert entry.soft_expires_at == started + 60
+    assert entry.delta == 0.5
+    assert await redis.ttl(KEY) == 300
+
+    clock.now = started + 59.999
+    assert not entry.should_refresh(cache.policy.beta)
+    clock.now = started + 60
+    assert entry.should_refresh(cache.policy.beta)
+
+
+def test_entry_dump_parse() -> None:
+    """An entry survives a round trip; a value without a header is stale."""
+
+    entry = CacheEntry.parse(CacheEntry(b'{"id": 1}', 1_700_000_060.0, 0.25).dump())
+    assert (entry.data, entry.soft_expires_at, entry.delta) == (
+        b'{"id": 1}',
+        1_700_000_060.0,
+        0.25,
+    )
+
+    legacy = CacheEntry.parse(b'{"id": 1}')
+    assert legacy.data == b'{"id": 1}'
+    assert legacy.soft_expires_at == 0.0
+
+
+@pytest.mark.parametrize(
+    "left, delta, beta, draw, expected",
+    [
+        (2.0, 2.0, 1.0, 0.63, False),
+        (2.0, 2.0, 1.0, 0.64, True),
+        (2.0, 1.0, 2.0, 0.64, True),
+        (2.0, 2.0, 0.5, 0.64, False),
+        (2.0, 2.0, 0.0, 0.999999, False),
+        (0.0, 0.0, 1.0, 0.0, True),
+    ],
+)
+def test_should_refresh_threshold(clock, monkeypatch, left, delta, beta, draw, expected) -> None:
+    """Early refresh starts when -delta * beta * ln(1 - random) covers the time left."""
+
+    monkeypatch.setattr(random, "random", lambda: draw)
+    entry = CacheEntry(b"", clock.now + left, delta)
+    assert entry.should_refresh(beta) is expected
+
+
+@pytest.mark.parametrize("left", [0.5, 2.0, 4.0])
+def test_should_refresh_probability(clock, monkeypatch, left) -> None:
+    """Refresh probability before the soft TTL is exp(-left / (delta * beta))."""
+
+    monkeypatch.setattr(random, "random", random.Random(left).random)
+    entry = CacheEntry(b"", clock.now + left, delta=2.0)
+    draws = 20000
+    refreshed = sum(entry.should_refresh(1.0) for _ in range(draws))
+    assert refreshed / draws == pytest.approx(math.exp(-left / 2.0), abs=0.015)
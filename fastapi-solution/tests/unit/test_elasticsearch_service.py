@@ -0,0 +1,56 @@
+from typing import Any
+
+import pytest
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig, ObjectApiResponse
+from elasticsearch import ApiError, NotFoundError
+
+from services.elasticsearch_service import ElasticsearchService
+
+META = ApiResponseMeta(
+    status=200,
+    http_version="1.1",
+    headers=HttpHeaders(),
+    duration=0.0,
+    node=NodeConfig("http", "localhost", 9200),
+)
+
+HIT = {"_id": "1", "_source": {"id": "1"}}
+
+
+class StubElasticsearch:
+    """Elasticsearch client that answers msearch with fixed responses."""
+
+    def __init__(self, responses: list[dict[str, Any]]):
+        self.responses = responses
+
+    async def msearch(self, index: str, searches: list[dict]) -> ObjectApiResponse:
+        return ObjectApiResponse({"responses": self.responses}, META)
+
+
+@pytest.mark.asyncio
+async def test_msearch_returns_hits_per_body() -> None:
+    """Each search body gets its own list of hits."""
+
+    service = ElasticsearchService(StubElasticsearch([
+        {"hits": {"hits": [HIT]}, "status": 200},
+        {"hits": {"hits": []}, "status": 200},
+    ]))
+
+    assert await service.msearch("movies", [{}, {}]) == [[HIT], []]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "status, error",
+    [(404, NotFoundError), (500, ApiError)],
+)
+async def test_msearch_raises_on_failed_search(status, error) -> None:
+    """A failed search raises instead of turning into an empty result."""
+
+    service = ElasticsearchService(StubElasticsearch([
+        {"hits": {"hits": [HIT]}, "status": 200},
+        {"error": {"type": "search_phase_execution_exception"}, "status": status},
+    ]))
+
+    with pytest.raises(error):
+        await service.msearch("movies", [{}, {}])
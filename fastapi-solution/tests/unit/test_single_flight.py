@@ -0,0 +1,195 @@
+import asyncio
+
+import pytest
+
+from models.genre import Genre
+from services import abstracts
+
+KEY = "GenreList: size: 50, page: 1"
+
+genres = [
+    Genre(id="3d8d9bf5-0d90-4353-88ba-4ccc5d2c07ff", name="Action", description=None),
+    Genre(id="120a21cf-9097-479e-904a-13dd7198c1dd", name="Drama", description=None),
+]
+
+
+async def settle() -> None:
+    """Let done callbacks of finished tasks run."""
+    await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_query_once(service, cache_service, es_service) -> None:
+    """Concurrent misses of one key make a single Elasticsearch query."""
+
+    es_service.result = genres
+    es_service.gate.clear()
+    callers = [
+        asyncio.ensure_future(service.single_flight(KEY, "genre", es_service.search))
+        for _ in range(10)
+    ]
+    await settle()
+    assert list(abstracts._in_flight) == [KEY]
+
+    es_service.gate.set()
+    results = await asyncio.gather(*callers)
+    await settle()
+
+    assert es_service.calls == 1
+    assert all(result == genres for result in results)
+    assert KEY in cache_service.entries
+    assert cache_service.locks == {}
+    assert abstracts._in_flight == {}
+
+    assert await service.single_flight(KEY, "genre", es_service.search) == genres
+    assert es_service.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fetch_error_reaches_every_waiter(service, cache_service, es_service) -> None:
+    """An error of the shared query is raised to every waiter and clears the key."""
+
+    es_service.error = RuntimeError("elasticsearch is down")
+    es_service.gate.clear()
+    callers = [
+        asyncio.ensure_future(service.single_flight(KEY, "genre", es_service.search))
+        for _ in range(10)
+    ]
+    await settle()
+    es_service.gate.set()
+    results = await asyncio.gather(*callers, return_exceptions=True)
+    await settle()
+
+    assert es_service.calls == 1
+    assert all(result is es_service.error for result in results)
+    assert abstracts._in_flight == {}
+    assert cache_service.locks == {}
+    assert cache_service.entries == {}
+
+    es_service.error = None
+    es_service.result = genres
+    assert await service.single_flight(KEY, "genre", es_service.search) == genres
+    assert es_service.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_keeps_fill(service, cache_service, es_service) -> None:
+    """A cancelled request does not cancel the fill other requests wait for."""
+
+    es_service.result = genres
+    es_service.gate.clear()
+    first = asyncio.ensure_future(service.single_flight(KEY, "genre", es_service.search))
+    second = asyncio.ensure_future(service.single_flight(KEY, "genre", es_service.search))
+    await settle()
+    first.cancel()
+    es_service.gate.set()
+
+    assert await second == genres
+    assert first.cancelled()
+    assert es_service.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_locked_key_waits_for_other_process(service, cache_service, es_service, monkeypatch) -> None:
+    """While another process holds the lock, the key is read from the cache it fills."""
+
+    monkeypatch.setattr(abstracts, "LOCK_POLL_IN_SECONDS", 0.01)
+    cache_service.locks[KEY] = "other process"
+    caller = asyncio.ensure_future(service.single_flight(KEY, "genre", es_service.search))
+    await asyncio.sleep(0.03)
+    assert not caller.done()
+
+    await cache_service.set(KEY, service._dumps(genres, "genre"))
+    del cache_service.locks[KEY]
+
+    assert await caller == genres
+    assert es_service.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_stale_hit_refreshes_in_background(service, cache_service, es_service, clock) -> None:
+    """A stale hit is served at once and refreshed by exactly one background query."""
+
+    await cache_service.set(KEY, service._dumps(genres[:1], "genre"))
+    clock.now += cache_service.policy.soft_ttl + 1
+    es_service.result = genres
+    es_service.gate.clear()
+
+    results = await asyncio.gather(
+        *(service.single_flight(KEY, "genre", es_service.search) for _ in range(5))
+    )
+    await settle()
+
+    assert all(result == genres[:1] for result in results)
+    assert es_service.calls == 1
+    assert list(abstracts._revalidating) == [KEY]
+    assert abstracts._in_flight == {}
+
+    es_service.gate.set()
+    await abstracts._revalidating[KEY]
+    await settle()
+
+    assert abstracts._revalidating == {}
+    assert cache_service.entries[KEY].soft_expires_at == (
+        clock.now + cache_service.policy.soft_ttl
+    )
+    assert await service.single_flight(KEY, "genre", es_service.search) == genres
+    assert es_service.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_fresh_hit_does_not_refresh(service, cache_service, es_service, clock) -> None:
+    """A hit before the soft TTL and outside the early window makes no query."""
+
+    await cache_service.set(KEY, service._dumps(genres, "genre"))
+    cache_service.policy.beta = 0.0
+    clock.now += cache_service.policy.soft_ttl - 1
+
+    assert await service.single_flight(KEY, "genre", es_service.search) == genres
+    await settle()
+
+    assert es_service.calls == 0
+    assert abstracts._revalidating == {}
+
+
+@pytest.mark.asyncio
+async def test_stale_hit_locked_elsewhere(service, cache_service, es_service, clock) -> None:
+    """A stale key already refreshed by another process makes no query here."""
+
+    await cache_service.set(KEY, service._dumps(genres, "genre"))
+    clock.now += cache_service.policy.soft_ttl + 1
+    cache_service.locks[KEY] = "other process"
+
+    assert await service.single_flight(KEY, "genre", es_service.search) == genres
+    await abstracts._revalidating[KEY]
+    await settle()
+
+    assert es_service.calls == 0
+    assert abstracts._revalidating == {}
+
+
+@pytest.mark.asyncio
+async def test_miss_does_not_wait_for_yielded_refresh(
+        service, cache_service, es_service, clock
+) -> None:
+    """A miss during a refresh that yielded to another process waits for that process, not None."""
+
+    await cache_service.set(KEY, service._dumps(genres, "genre"))
+    clock.now += cache_service.policy.soft_ttl + 1
+    cache_service.locks[KEY] = "other process"
+
+    assert await service.single_flight(KEY, "genre", es_service.search) == genres
+    assert list(abstracts._revalidating) == [KEY]
+
+    # The stale entry reaches its hard TTL before the refresh task runs
+    del cache_service.entries[KEY]
+    caller = asyncio.ensure_future(service.single_flight(KEY, "genre", es_service.search))
+    await settle()
+    await settle()
+    assert not caller.done()
+
+    await cache_service.set(KEY, service._dumps(genres, "genre"))
+    del cache_service.locks[KEY]
+
+    assert await caller == genres
+    assert es_service.calls == 0